@@ -20,6 +20,182 @@ RAG_CONFIG = {
     "initial_fetch": int(os.getenv("RAG_INITIAL_LIMIT", "20")),
     "rerank_top_k": int(os.getenv("RERANK_TOP_K", "3")),
     "min_tokens_required": int(os.getenv("MIN_TOKENS_REQUIRED", "100")),
-    "cache_ttl": int(os.getenv("CACHE_TTL_SECONDS", "3600"))
+    "cache_ttl": int(os.getenv("CACHE_TTL_SECONDS", "3600")),
+    "law_search_deadline": float(os.getenv("LAW_SEARCH_DEADLINE_SECONDS", "2.5"))
 }
+
+LAW_COLLECTIONS = ["AgedCareAct", "HomeCareAct", "NDIS", "GeneralAct", "Others"]
  
+
+WEAVIATE_POOL_CONFIG = {
+    "health_check_interval": float(os.getenv("WEAVIATE_HEALTH_CHECK_SECONDS", "30")),
+    "query_timeout": float(os.getenv("WEAVIATE_QUERY_TIMEOUT_SECONDS", "10")),
+    "write_timeout": float(os.getenv("WEAVIATE_WRITE_TIMEOUT_SECONDS", "60"))
+}
+
+CONTEXT_CACHE_CONFIG = {
+    "local_max_entries": int(os.getenv("CONTEXT_CACHE_LOCAL_MAX_ENTRIES", "2048")),
+    "local_ttl": float(os.getenv("CONTEXT_CACHE_LOCAL_TTL_SECONDS", "300")),
+    "early_refresh_beta": float(os.getenv("CONTEXT_CACHE_EARLY_REFRESH_BETA", "1.0"))
+}
+
+SEMANTIC_CACHE_CONFIG = {
+    "enabled": os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true",
+    "similarity_threshold": float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95")),
+    "max_entries_per_scope": int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "20000")),
+    "ttl": int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", os.getenv("CACHE_TTL_SECONDS", "3600"))),
+    # Answers also depend on chat history, so reusing them is opt-in
+    "reuse_answers": os.getenv("SEMANTIC_CACHE_REUSE_ANSWERS", "false").lower() == "true",
+    "answer_ttl": int(os.getenv("SEMANTIC_CACHE_ANSWER_TTL_SECONDS", "600"))
+}
+
+EMBEDDING_CONFIG = {
+    # Must match the text2vec-openai model the collections were created with
+    "model": os.getenv("EMBEDDING_MODEL", "text-embedding-3-small"),
+    "query_cache_size": int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "4096"))
+}
+
+MODEL_CONFIG = {
+    # Load the cross-encoder during startup instead of on the first question
+    "warm_on_startup": os.getenv("MODEL_WARM_ON_STARTUP", "true").lower() == "true"
+}
+
+RERANKER_CONFIG = {
+    "model_name": os.getenv("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2"),
+    "local_path": os.getenv("RERANKER_LOCAL_PATH", "./models/reranker"),
+    # "torch" (sentence-transformers) or "onnx" (ONNX Runtime, CPU)
+    "backend": os.getenv("RERANKER_BACKEND", "torch").lower(),
+    "onnx_path": os.getenv("RERANKER_ONNX_PATH", "./models/reranker-onnx"),
+    "onnx_quantize": os.getenv("RERANKER_ONNX_QUANTIZE", "true").lower() == "true",
+    # 0 = one thread per CPU core
+    "intra_op_threads": int(os.getenv("RERANKER_INTRA_OP_THREADS", "0")),
+    # Tokenization / length bucketing
+    "max_query_tokens": int(os.getenv("RERANKER_MAX_QUERY_TOKENS", "64")),
+    "bucket_size": int(os.getenv("RERANKER_BUCKET_SIZE", "32")),
+    "max_batch_tokens": int(os.getenv("RERANKER_MAX_BATCH_TOKENS", "8192")),
+    "doc_token_cache_size": int(os.getenv("RERANKER_DOC_TOKEN_CACHE_SIZE", "50000"))
+}
+
+RERANK_BATCH_CONFIG = {
+    # Collect pairs from concurrent requests for up to max_wait_ms, then
+    # score them together (the reranker buckets them by token length)
+    "max_batch_pairs": int(os.getenv("RERANK_MAX_BATCH_PAIRS", "128")),
+    "max_wait_ms": float(os.getenv("RERANK_MAX_WAIT_MS", "3"))
+}
+
+EXECUTOR_CONFIG = {
+    "cpu_workers": int(os.getenv("CPU_POOL_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    # The reranker already uses every core per batch; more workers just contend
+    "rerank_workers": int(os.getenv("RERANK_POOL_WORKERS", "1")),
+    "io_workers": int(os.getenv("IO_POOL_WORKERS", "32"))
+}
+
+RERANK_SCORE_CACHE_CONFIG = {
+    "max_entries": int(os.getenv("RERANK_SCORE_CACHE_MAX_ENTRIES", "100000")),
+    # Share scores between workers through one Redis hash per chunk
+    "redis_enabled": os.getenv("RERANK_SCORE_CACHE_REDIS", "false").lower() == "true",
+    "redis_ttl": int(os.getenv("RERANK_SCORE_CACHE_REDIS_TTL_SECONDS", "86400"))
+}
+
+RERANK_GATING_CONFIG = {
+    "enabled": os.getenv("RERANK_GATING_ENABLED", "true").lower() == "true",
+    # Skip the cross-encoder when the k-th vector hit leads the (k+1)-th by this much (cosine)
+    "skip_gap": float(os.getenv("RERANK_GATING_SKIP_GAP", "0.08")),
+    # Rerank only the head when the vector-score distribution is this peaked (normalized entropy)
+    "short_entropy": float(os.getenv("RERANK_GATING_SHORT_ENTROPY", "0.80")),
+    "temperature": float(os.getenv("RERANK_GATING_TEMPERATURE", "0.05")),
+    "short_candidates_factor": int(os.getenv("RERANK_GATING_SHORT_FACTOR", "2")),
+    # Optional JSONL recording of candidate sets for scripts/evaluate_rerank_gating.py
+    "record_path": os.getenv("RERANK_GATING_RECORD_PATH", ""),
+    "record_sample_rate": float(os.getenv("RERANK_GATING_RECORD_SAMPLE_RATE", "1.0"))
+}
+
+LLM_CLIENT_CONFIG = {
+    # One AsyncOpenAI client per worker; these bound its httpx connection pool
+    "max_connections": int(os.getenv("LLM_MAX_CONNECTIONS", "100")),
+    "max_keepalive_connections": int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20")),
+    "keepalive_expiry": float(os.getenv("LLM_KEEPALIVE_EXPIRY_SECONDS", "60")),
+    "connect_timeout": float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5")),
+    "timeout": float(os.getenv("LLM_TIMEOUT_SECONDS", "120")),
+    "max_retries": int(os.getenv("LLM_MAX_RETRIES", "2")),
+    # Needs the `h2` package; falls back to HTTP/1.1 without it
+    "http2": os.getenv("LLM_HTTP2", "true").lower() == "true"
+}
+
+LLM_SCHEDULER_CONFIG = {
+    "enabled": os.getenv("LLM_SCHEDULER_ENABLED", "true").lower() == "true",
+    # Per-model budgets, applied to models without an override below
+    "default_rpm": int(os.getenv("LLM_DEFAULT_RPM", "500")),
+    "default_tpm": int(os.getenv("LLM_DEFAULT_TPM", "200000")),
+    # Overrides as "model=rpm:tpm,...", e.g. "gpt-4o-mini=5000:2000000,gpt-4=500:30000"
+    "model_limits": os.getenv("LLM_MODEL_LIMITS", ""),
+    # Share of each budget (and of the concurrency limit) only chat may use
+    "interactive_reserve": float(os.getenv("LLM_INTERACTIVE_RESERVE", "0.2")),
+    # Completion tokens assumed when a call sets no max_tokens
+    "default_completion_tokens": int(os.getenv("LLM_DEFAULT_COMPLETION_TOKENS", "1000")),
+    # AIMD concurrency control
+    "initial_concurrency": int(os.getenv("LLM_INITIAL_CONCURRENCY", "16")),
+    "min_concurrency": int(os.getenv("LLM_MIN_CONCURRENCY", "2")),
+    "max_concurrency": int(os.getenv("LLM_MAX_CONCURRENCY", "64")),
+    "decrease_factor": float(os.getenv("LLM_CONCURRENCY_DECREASE_FACTOR", "0.5")),
+    # A call slower than this multiple of the model's usual seconds-per-1k-tokens counts as congestion
+    "latency_tolerance": float(os.getenv("LLM_LATENCY_TOLERANCE", "2.0")),
+    "decrease_cooldown": float(os.getenv("LLM_CONCURRENCY_DECREASE_COOLDOWN_SECONDS", "5"))
+}
+
+LLM_CACHE_CONFIG = {
+    "enabled": os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true",
+    # "disk" (per worker host) or "redis" (shared between workers)
+    "backend": os.getenv("LLM_CACHE_BACKEND", "disk"),
+    "ttl": int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+    "disk_path": os.getenv("LLM_CACHE_DISK_PATH", os.path.join(BASE_DIR, "..", "cache", "llm")),
+    "max_disk_mb": int(os.getenv("LLM_CACHE_MAX_DISK_MB", "512")),
+    # Larger responses are not cached
+    "max_entry_kb": int(os.getenv("LLM_CACHE_MAX_ENTRY_KB", "256"))
+}
+
+PROMPT_BUDGET_CONFIG = {
+    "enabled": os.getenv("PROMPT_BUDGET_ENABLED", "true").lower() == "true",
+    # Tokenizer used for counting
+    "model": os.getenv("PROMPT_BUDGET_MODEL", "gpt-4o-mini"),
+    # Whole chat prompt: system + history + context + question
+    "total_tokens": int(os.getenv("PROMPT_BUDGET_TOTAL_TOKENS", "12000")),
+    # Split of what the system prompt and question leave over; unused share flows to the others
+    "history_share": float(os.getenv("PROMPT_BUDGET_HISTORY_SHARE", "0.2")),
+    "org_share": float(os.getenv("PROMPT_BUDGET_ORG_SHARE", "0.45")),
+    "law_share": float(os.getenv("PROMPT_BUDGET_LAW_SHARE", "0.35")),
+    # A trimmed chunk keeps at least this many tokens of extracted sentences (else it is dropped)
+    "min_chunk_tokens": int(os.getenv("PROMPT_BUDGET_MIN_CHUNK_TOKENS", "80"))
+}
+
+SUMMARY_CONFIG = {
+    "model": os.getenv("SUMMARY_MODEL", "gpt-4"),
+    # Map step: document chunk size and how many chunk summaries run at once
+    "chunk_tokens": int(os.getenv("SUMMARY_CHUNK_TOKENS", "3000")),
+    "max_concurrency": int(os.getenv("SUMMARY_MAX_CONCURRENCY", "4")),
+    "chunk_summary_tokens": int(os.getenv("SUMMARY_CHUNK_SUMMARY_TOKENS", "500")),
+    # Reduce step: combined summaries above this are reduced again in groups
+    "reduce_input_tokens": int(os.getenv("SUMMARY_REDUCE_INPUT_TOKENS", "6000")),
+    "final_summary_tokens": int(os.getenv("SUMMARY_FINAL_SUMMARY_TOKENS", "1500"))
+}
+
+SUMMARY_CHUNK_CACHE_CONFIG = {
+    # Chunk summaries by content hash, so a new document version only summarizes changed sections
+    "enabled": os.getenv("SUMMARY_CHUNK_CACHE_ENABLED", "true").lower() == "true",
+    "ttl": int(os.getenv("SUMMARY_CHUNK_CACHE_TTL_SECONDS", str(90 * 24 * 3600))),
+    "disk_path": os.getenv("SUMMARY_CHUNK_CACHE_DISK_PATH", os.path.join(BASE_DIR, "..", "cache", "chunk_summaries")),
+    "max_disk_mb": int(os.getenv("SUMMARY_CHUNK_CACHE_MAX_DISK_MB", "256"))
+}
+
+CATEGORY_CLASSIFIER_CONFIG = {
+    # Pick the document category from embedding similarity to per-category prototypes
+    "enabled": os.getenv("CATEGORY_CLASSIFIER_ENABLED", "true").lower() == "true",
+    "model": os.getenv("CATEGORY_CLASSIFIER_MODEL", os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")),
+    # Softmax temperature over cosine similarities; below min_confidence the LLM decides
+    "temperature": float(os.getenv("CATEGORY_CLASSIFIER_TEMPERATURE", "0.02")),
+    "min_confidence": float(os.getenv("CATEGORY_CLASSIFIER_MIN_CONFIDENCE", "0.6")),
+    # Built by scripts/evaluate_category_classifier.py --build; falls back to the category descriptions
+    "prototypes_path": os.getenv("CATEGORY_PROTOTYPES_PATH", os.path.join(BASE_DIR, "..", "cache", "category_prototypes.json")),
+    # Optional JSONL of LLM-labelled summaries (the evaluation / training set)
+    "record_path": os.getenv("CATEGORY_CLASSIFIER_RECORD_PATH", "")
+}
@@ -0,0 +1,116 @@
+"""
+Named, bounded executors per workload.
+
+Blocking work used to share the event loop's default thread pool, so slow
+HTTP calls (token store, OpenAI SDK) could sit in front of CPU-bound
+reranking. Each workload now gets its own pool:
+
+- "cpu"    process pool for CPU-heavy, picklable work (PDF text extraction)
+- "rerank" thread pool for the cross-encoder; the model lives once per
+           process (see model_registry) and torch / ONNX Runtime release the
+           GIL and use their own intra-op threads
+- "io"     thread pool sized for blocking network I/O
+
+Per pool, in-flight calls, queue depth (calls waiting for a worker), wait
+time and run time are published through app.core.metrics.
+"""
+
+import asyncio
+import functools
+import multiprocessing
+import threading
+import time
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+from app.core.metrics import metrics
+from app.config import EXECUTOR_CONFIG
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _timed_call(submitted_at: float, func: Callable, args: tuple, kwargs: dict):
+    """Runs inside the worker; wall-clock time so it works across processes"""
+    started_at = time.time()
+    return started_at, func(*args, **kwargs)
+
+
+class _Pool:
+    def __init__(self, name: str, factory: Callable[[], Executor], max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._factory = factory
+        self._executor = None
+        self._inflight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._factory()
+                logger.info(f"🧵 Started '{self.name}' pool ({self.max_workers} workers)")
+            return self._executor
+
+    def _track(self, delta: int):
+        with self._lock:
+            self._inflight += delta
+            inflight = self._inflight
+        metrics.set_gauge("executor_inflight", inflight, pool=self.name)
+        metrics.set_gauge("executor_queue_depth", max(inflight - self.max_workers, 0), pool=self.name)
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        submitted_at = time.time()
+        self._track(1)
+        try:
+            started_at, result = await loop.run_in_executor(
+                self.executor,
+                functools.partial(_timed_call, submitted_at, func, args, kwargs)
+            )
+        finally:
+            self._track(-1)
+        finished_at = time.time()
+        metrics.observe("executor_wait_seconds", max(started_at - submitted_at, 0.0), pool=self.name)
+        metrics.observe("executor_run_seconds", finished_at - started_at, pool=self.name)
+        return result
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pools: Dict[str, _Pool] = {
+    "cpu": _Pool(
+        "cpu",
+        # forkserver: don't fork a process that already runs threads
+        lambda: ProcessPoolExecutor(
+            max_workers=EXECUTOR_CONFIG["cpu_workers"],
+            mp_context=multiprocessing.get_context("forkserver")
+        ),
+        EXECUTOR_CONFIG["cpu_workers"]
+    ),
+    "rerank": _Pool(
+        "rerank",
+        lambda: ThreadPoolExecutor(max_workers=EXECUTOR_CONFIG["rerank_workers"], thread_name_prefix="rerank"),
+        EXECUTOR_CONFIG["rerank_workers"]
+    ),
+    "io": _Pool(
+        "io",
+        lambda: ThreadPoolExecutor(max_workers=EXECUTOR_CONFIG["io_workers"], thread_name_prefix="io"),
+        EXECUTOR_CONFIG["io_workers"]
+    ),
+}
+
+
+async def run_in_pool(pool: str, func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking callable on the named pool ("cpu", "rerank" or "io")"""
+    return await _pools[pool].run(func, *args, **kwargs)
+
+
+def shutdown_executors():
+    for pool in _pools.values():
+        pool.shutdown()
@@ -0,0 +1,90 @@
+"""
+Minimal in-process metrics registry.
+
+Counters and latency observations are kept per worker process and exposed
+as JSON through the /metrics route. Labels are passed as keyword arguments
+and folded into the series name, e.g. `law_search_seconds{collection=NDIS}`.
+"""
+
+import threading
+from collections import defaultdict, deque
+from typing import Dict
+
+
+def _series(name: str, labels: Dict) -> str:
+    if not labels:
+        return name
+    label_str = ",".join(f"{k}={v}" for k, v in sorted(labels.items()))
+    return f"{name}{{{label_str}}}"
+
+
+class _Summary:
+    """Running count/sum/min/max plus a bounded window for percentiles"""
+
+    def __init__(self, window: int = 512):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.window = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.window.append(value)
+
+    def percentile(self, q: float) -> float:
+        ordered = sorted(self.window)
+        if not ordered:
+            return 0.0
+        idx = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+        return ordered[idx]
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 6) if self.count else 0.0,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+        self._summaries: Dict[str, _Summary] = {}
+
+    def increment(self, name: str, value: float = 1, **labels):
+        key = _series(name, labels)
+        with self._lock:
+            self._counters[key] += value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        key = _series(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _series(name, labels)
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = self._summaries[key] = _Summary()
+            summary.observe(value)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "summaries": {k: v.to_dict() for k, v in self._summaries.items()},
+            }
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,96 @@
+"""
+Process-wide registry for local ML models.
+
+Each model is registered with a factory and loaded at most once per
+process - lazily on first use, or up front via `warm()` from the app
+lifespan. Load time and the resident-memory growth observed during the
+load are kept per model and published as metrics gauges.
+"""
+
+import os
+import time
+import threading
+import logging
+import resource
+from typing import Any, Callable, Dict
+from app.core.metrics import metrics
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def current_rss_bytes() -> int:
+    """Current resident set size (falls back to peak RSS off Linux)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is in KB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._models: Dict[str, Any] = {}
+        self._stats: Dict[str, Dict] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._registry_lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        with self._registry_lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name: str) -> Any:
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        if name not in self._factories:
+            raise KeyError(f"Model '{name}' is not registered")
+
+        with self._locks[name]:
+            # Another thread may have finished loading while we waited
+            model = self._models.get(name)
+            if model is not None:
+                return model
+
+            logger.info(f"📦 Loading model '{name}'...")
+            rss_before = current_rss_bytes()
+            start = time.perf_counter()
+            model = self._factories[name]()
+            load_seconds = time.perf_counter() - start
+            rss_delta = max(current_rss_bytes() - rss_before, 0)
+
+            self._stats[name] = {
+                "load_seconds": round(load_seconds, 3),
+                "rss_delta_bytes": rss_delta,
+                "loaded_at": time.time()
+            }
+            metrics.set_gauge("model_load_seconds", load_seconds, model=name)
+            metrics.set_gauge("model_rss_delta_bytes", rss_delta, model=name)
+            logger.info(f"✅ Model '{name}' loaded in {load_seconds:.2f}s (+{rss_delta / 1e6:.1f} MB RSS)")
+
+            self._models[name] = model
+            return model
+
+    def warm(self, *names: str):
+        """Load the given models now (all registered models if none given)"""
+        for name in names or list(self._factories):
+            self.get(name)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def stats(self) -> Dict:
+        return {
+            "process_rss_bytes": current_rss_bytes(),
+            "models": {
+                name: {"loaded": name in self._models, **self._stats.get(name, {})}
+                for name in self._factories
+            }
+        }
+
+
+model_registry = ModelRegistry()
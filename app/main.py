@@ -9,22 +9,33 @@ from app.routes.policy_alignment import router as policy_alignment_router
 from app.routes.delete_document import router as delete_document_router
 from app.routes.delete_schema import router as delete_schema_router
 from app.routes.summerizer import router as summarizer_router
+from app.routes.metrics import router as metrics_router
 # from app.routes.remove_aws_file import router as remove_cloud_file_router
 from app.core.error_handler import setup_global_error_handlers
 
 from fastapi.middleware.cors import CORSMiddleware
-from app.services.weaviate_client import get_weaviate_client
+from app.services.weaviate_client import weaviate_manager
+from app.services.llm_gateway import llm_gateway
+from app.core.model_registry import model_registry
+from app.services.rerank_batcher import rerank_batcher
+from app.core.executors import run_in_pool, shutdown_executors
+from app.config import MODEL_CONFIG
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Connect to Weaviate
-    client = get_weaviate_client()
-    if not client.is_connected():
-        client.connect()
+    # Startup: Open the shared Weaviate connection
+    await weaviate_manager.start_async()
+    # One pooled OpenAI client for every LLM / embedding call
+    await llm_gateway.start_async()
+    # Load local models before serving so the first question doesn't pay for it
+    if MODEL_CONFIG["warm_on_startup"]:
+        await run_in_pool("rerank", model_registry.warm)
     yield
     # Shutdown: Cleanup
-    if client.is_connected():
-        client.close()
+    await rerank_batcher.aclose()
+    await llm_gateway.aclose()
+    await weaviate_manager.aclose()
+    shutdown_executors()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -53,6 +64,8 @@ app.include_router(policy_generate_router, prefix="/policy", tags=["Policy Gener
 app.include_router(policy_embedding_router, prefix="/policy", tags=["Law Upload-Delete"])
 app.include_router(policy_alignment_router, prefix="/policy", tags=["Policy Alignment"])
 
+app.include_router(metrics_router, tags=["Monitoring"])
+
 
 @app.get("/")
 def read_root():
@@ -2,7 +2,7 @@
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
-from app.services.bot import ask_doc_bot
+from app.services.bot import ask_doc_bot, ask_doc_bot_stream
 
 router = APIRouter()
 
@@ -28,3 +28,21 @@ async def chatbot(request: ChatRequest):
                 "error_details": str(e)
             }
         )
+
+@router.post("/chatbot/stream")
+async def chatbot_stream(request: ChatRequest):
+    """Same as /chatbot, but streams the answer as Server-Sent Events"""
+    try:
+        organization = "Org_" + request.organization_id
+        return await ask_doc_bot_stream(request.question, organization, request.auth_token)
+
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "status": "error",
+                "message": "An unexpected server error occurred.",
+                "error_code": "INTERNAL_SERVER_ERROR",
+                "error_details": str(e)
+            }
+        )
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException
 from app.services.schema_manager import create_schema
+from app.services.latest_version_index import backfill_latest_flags
 from pydantic import BaseModel
 
 class CreateOrganizationRequest(BaseModel):
@@ -15,3 +16,14 @@ async def create_organization_endpoint(request: CreateOrganizationRequest):
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error Creating Organization: {str(e)}")
+
+
+@router.post("/backfill-latest-versions")
+async def backfill_latest_versions_endpoint(request: CreateOrganizationRequest):
+    """Migrate an existing organization collection to the is_latest index"""
+    try:
+        organization = "Org_" + request.organization_id
+        return await backfill_latest_flags(organization)
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error Backfilling Latest Versions: {str(e)}")
@@ -0,0 +1,24 @@
+from fastapi import APIRouter
+from app.core.metrics import metrics
+from app.core.model_registry import model_registry
+from app.services.llm_scheduler import llm_scheduler
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def metrics_endpoint():
+    """Per-worker counters, gauges and latency summaries"""
+    return metrics.snapshot()
+
+
+@router.get("/metrics/models")
+async def model_metrics_endpoint():
+    """Loaded local models with load time and RSS growth"""
+    return model_registry.stats()
+
+
+@router.get("/metrics/llm")
+async def llm_metrics_endpoint():
+    """LLM scheduler state: concurrency limit, queue and remaining rate budgets"""
+    return llm_scheduler.stats()
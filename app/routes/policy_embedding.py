@@ -114,7 +114,6 @@ def compute_global_next_version(collection) -> str:
 
 @router.post("/admin/upload-law")
 async def upload_law_pdf(law_type: str, file: UploadFile = File(...)):
-    client = None
     try:
         # Extract text from PDF
         text, title = await extract_content_from_uploadpdf(file)
@@ -127,7 +126,7 @@ async def upload_law_pdf(law_type: str, file: UploadFile = File(...)):
         chunks = chunk_text_by_tokens(text, max_tokens=7000)
         print(f"Text split into {len(chunks)} chunks")
 
-        # Connect to Weaviate (REST-safe connection)
+        # Shared Weaviate connection (owned by the app lifespan)
         client = get_weaviate_client()
 
         # ✅ Check if collection exists
@@ -212,10 +211,6 @@ async def upload_law_pdf(law_type: str, file: UploadFile = File(...)):
     except Exception as e:
         print(f"❌ Upload failed: {str(e)}")
         return {"status": "failed", "message": str(e)}
-    
-    finally:
-        if client:
-            client.close()
 
 
 from pydantic import BaseModel
@@ -1,8 +1,11 @@
 from fastapi import APIRouter, Response, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 import asyncio
 from app.services.store_used_token import used_token_store
-from app.services.policy_llm import generate_policy_html
+from app.core.executors import run_in_pool
+from app.services.policy_llm import generate_policy_html, stream_policy_html
+from app.services.answer_stream import sse_event
 from app.utils._clean_html import advanced_html_cleaner
 
 router = APIRouter()
@@ -39,7 +42,8 @@ async def generate_html(request: PolicyGenerationRequest):
         
         # Save token usage (fire and forget)
         asyncio.create_task(
-            asyncio.to_thread(
+            run_in_pool(
+                "io",
                 used_token_store,
                 type='policy_generation',
                 used_tokens=used_tokens,
@@ -72,4 +76,49 @@ async def generate_html(request: PolicyGenerationRequest):
                 "X-Success": "False",
                 "X-Error": str(e)[:100]  # Limit error message length
             }
-        )
\ No newline at end of file
+        )
+
+
+@router.post("/generate-html/stream")
+async def generate_html_stream(request: PolicyGenerationRequest):
+    """
+    Same as /generate-html, but streams the policy as Server-Sent Events:
+    `section` {"index", "html"} per completed top-level section, then
+    `done` {"word_count", "used_tokens"} (or `error` {"message"}).
+    """
+    async def event_stream():
+        try:
+            async for event in stream_policy_html(
+                title=request.title,
+                context=request.context,
+                organization_type=request.organization_type,
+                target_words=request.target_words
+            ):
+                if event["type"] == "section":
+                    yield sse_event("section", {
+                        "index": event["index"],
+                        "html": advanced_html_cleaner(event["html"])
+                    })
+                    continue
+
+                used_tokens = event["used_tokens"]
+                # Save token usage (fire and forget)
+                asyncio.create_task(
+                    run_in_pool(
+                        "io",
+                        used_token_store,
+                        type='policy_generation',
+                        used_tokens=used_tokens,
+                        auth_token=request.auth_token
+                    )
+                )
+                yield sse_event("done", {"word_count": event["word_count"], "used_tokens": used_tokens})
+        except Exception as e:
+            print(f"Error in generate_html_stream: {str(e)}")
+            yield sse_event("error", {"message": str(e)[:200]})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
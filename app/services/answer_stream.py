@@ -0,0 +1,98 @@
+"""
+Helpers for streaming chatbot answers.
+
+The LLM is asked for a JSON object ({"answer": ..., "used_document": ...,
+"sources": ...}). While it streams, `AnswerFieldStream` pulls the decoded
+text of the "answer" string out of the partial JSON so it can be sent to
+the client token by token; the complete JSON is still parsed at the end.
+"""
+
+import json
+import re
+from typing import List
+
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+class AnswerFieldStream:
+    """Incrementally decodes one top-level JSON string field from streamed text"""
+
+    def __init__(self, field: str = "answer"):
+        self._key = re.compile(r'"' + re.escape(field) + r'"\s*:\s*"')
+        self.raw = ""
+        self._pos = 0
+        self._state = "seek"  # seek -> value -> done
+
+    @property
+    def done(self) -> bool:
+        return self._state == "done"
+
+    def feed(self, delta: str) -> str:
+        """Add raw model output; returns newly decoded answer text (may be empty)"""
+        self.raw += delta
+        if self._state == "seek":
+            match = self._key.search(self.raw)
+            if not match:
+                return ""
+            self._pos = match.end()
+            self._state = "value"
+        if self._state != "value":
+            return ""
+
+        out = []
+        buf, i = self.raw, self._pos
+        while i < len(buf):
+            c = buf[i]
+            if c == '"':
+                self._state = "done"
+                i += 1
+                break
+            if c != '\\':
+                out.append(c)
+                i += 1
+                continue
+
+            # Escape sequence - wait for the rest if it's split across chunks
+            if i + 1 >= len(buf):
+                break
+            e = buf[i + 1]
+            if e != 'u':
+                out.append(_ESCAPES.get(e, e))
+                i += 2
+                continue
+            if i + 6 > len(buf):
+                break
+            code = int(buf[i + 2:i + 6], 16)
+            if 0xD800 <= code < 0xDC00:
+                # Surrogate pair (emoji): needs the following \uXXXX too
+                if i + 12 > len(buf):
+                    break
+                if buf[i + 6:i + 8] == '\\u':
+                    low = int(buf[i + 8:i + 12], 16)
+                    out.append(chr(0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)))
+                    i += 12
+                    continue
+            out.append(chr(code))
+            i += 6
+
+        self._pos = i
+        return "".join(out)
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def context_sources(org_context: List, law_context: List) -> List[dict]:
+    """Source descriptors for the chunks that were given to the model"""
+    sources = []
+    for kind, chunks in (("organization", org_context), ("law", law_context)):
+        for chunk in chunks:
+            sources.append({
+                "type": kind,
+                "title": chunk.title,
+                "version": chunk.version,
+                "document_id": chunk.document_id or None
+            })
+    return sources
@@ -1,15 +1,21 @@
 import asyncio
+import time
 import openai
-from fastapi.responses import JSONResponse
-from app.config import OPENAI_API_KEY
-from openai import AsyncOpenAI
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from app.services.llm_gateway import llm_gateway, cached_prompt_tokens
 from app.services.system_prompt_builder import build_system_prompt
 from app.services.fetch_history import fetch_history_async
 from app.services.store_data import save_data_parallel
-from app.services.build_context import build_context_from_weaviate_results
-from app.services.content_formatter import formatted_content
-from app.config import RAG_CONFIG
-from app.services.cross_encoder_model import LocalReranker
+from app.services.build_context import build_context_from_weaviate_results, resolve_context_key
+from app.services.context_cache import context_cache
+from app.services.content_formatter import format_law_context, format_org_context, stable_law_order
+from app.services.context_packer import context_packer, PackedPrompt
+from app.services.retrieved_chunk import RetrievedChunk
+from app.services.answer_stream import AnswerFieldStream, sse_event, context_sources
+from app.core.metrics import metrics
+from typing import Dict, List, Optional, Tuple
+from app.config import RAG_CONFIG, SEMANTIC_CACHE_CONFIG
 import logging
 import json
 
@@ -17,9 +23,6 @@ import json
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize global reranker
-reranker = LocalReranker()
-
 def classify_question_type(question: str) -> str:
     """
     Classify question as LAW, POLICY, or MIXED
@@ -63,82 +66,256 @@ def classify_question_type(question: str) -> str:
     
     return "MIXED"
 
+async def validate_chat_request(
+    question: str,
+    organization: str,
+    auth_token: str
+) -> Optional[JSONResponse]:
+    """Returns an error response, or None if the request may proceed"""
+    if not question or len(question.strip()) < 3:
+        return JSONResponse(
+            status_code=400,
+            content={
+                "status": "error",
+                "message": "Question too short (minimum 3 characters)"
+            }
+        )
+
+    if len(question) > 1000:
+        return JSONResponse(
+            status_code=400,
+            content={
+                "status": "error",
+                "message": "Question too long (maximum 1000 characters)"
+            }
+        )
+
+    if not organization or not auth_token:
+        return JSONResponse(
+            status_code=400,
+            content={
+                "status": "error",
+                "message": "Missing required fields"
+            }
+        )
+
+    # ================= EARLY AUTH & TOKEN CHECK =================
+    from app.services.input_validator import validate_input
+    validation_response = await validate_input(question, organization, auth_token)
+    if validation_response is not True:
+        return validation_response
+    return None
+
+
+async def fetch_chat_inputs(
+    question: str,
+    organization: str,
+    auth_token: str,
+    question_type: str,
+    cache_key: str
+) -> Tuple[Dict, List[RetrievedChunk], List[RetrievedChunk]]:
+    """History and retrieved context, fetched in parallel. Raises if history fails."""
+    logger.info("⏱️ Starting parallel fetch...")
+    fetch_start = asyncio.get_event_loop().time()
+
+    history_task = fetch_history_async(auth_token, limit=10, offset=0)
+    context_task = build_context_from_weaviate_results(
+        organization=organization,
+        query_text=question,
+        question_type=question_type,
+        cache_key=cache_key
+    )
+
+    history_result, context_result = await asyncio.gather(
+        history_task,
+        context_task,
+        return_exceptions=True
+    )
+
+    if isinstance(history_result, Exception):
+        raise history_result
+    if isinstance(context_result, Exception):
+        logger.error(f"Context fetch failed: {context_result}")
+        context_result = {"org_context": [], "law_context": []}
+
+    org_context = context_result.get("org_context", [])
+    law_context = context_result.get("law_context", [])
+
+    fetch_time = asyncio.get_event_loop().time() - fetch_start
+    logger.info(f"✅ Fetch done: {fetch_time:.2f}s | Org: {len(org_context)}, Law: {len(law_context)}")
+    return history_result, org_context, law_context
+
+
+def build_chat_messages(
+    question: str,
+    question_type: str,
+    history_result: Dict,
+    org_context: List[RetrievedChunk],
+    law_context: List[RetrievedChunk]
+) -> Tuple[List[Dict], PackedPrompt]:
+    """Chat messages fitted to the prompt token budget, plus what was packed into them"""
+    logger.debug(f"Remaining tokens: {history_result.get('remaining_tokens')}")
+
+    # Build chat history
+    chat_history = []
+    for h in history_result.get('histories', []):
+        chat_history.append({"role": "user", "content": h['prompt']})
+        chat_history.append({"role": "assistant", "content": h['response']})
+
+    # ================= BUILD PROMPT =================
+    system_prompt = build_system_prompt(question_type)
+
+    packed = context_packer.pack(question, question_type, system_prompt, chat_history, org_context, law_context)
+    packed.law_context = stable_law_order(packed.law_context)
+
+    # Most stable first, so consecutive requests share the longest possible
+    # prefix for OpenAI prompt caching: static system prompt -> law context
+    # -> history -> org context + question
+    messages = [{"role": "system", "content": system_prompt}]
+
+    law_content = format_law_context(question_type, packed.law_context)
+    if law_content:
+        messages.append({"role": "system", "content": law_content})
+
+    messages.extend(packed.history)
+
+    org_content = format_org_context(question_type, packed.org_context)
+    user_content = f"{org_content}QUESTION: {question}"
+    messages.append({"role": "user", "content": user_content})
+    return messages, packed
+
+
+def parse_llm_answer(answer: str, question_type: str, org_context: List[RetrievedChunk]) -> Dict:
+    """Parse the JSON answer and correct the used_document flag"""
+    try:
+        json_answer = json.loads(answer)
+    except json.JSONDecodeError as e:
+        logger.error(f"⚠️ JSON parse failed: {e}")
+        json_answer = {
+            "answer": answer,
+            "used_document": question_type == "POLICY" and bool(org_context),
+            "sources": []
+        }
+
+    # Validate used_document flag for MIXED questions
+    if question_type == "LAW" and json_answer.get('used_document', False):
+        logger.warning("⚠️ Correcting used_document flag for law question")
+        json_answer['used_document'] = False
+
+    if question_type == "MIXED":
+        # For MIXED: only true if org context was actually used
+        if not org_context:
+            json_answer['used_document'] = False
+            logger.info("ℹ️ MIXED question with no org context: used_document=False")
+    return json_answer
+
+
+async def persist_chat(
+    question: str,
+    answer: str,
+    used_tokens: int,
+    document_ids: List[str],
+    auth_token: str,
+    answer_cache_key: Optional[str] = None,
+    sources: Optional[List[Dict]] = None
+) -> float:
+    """
+    Save history, read counts and token usage; returns the time taken.
+    With `answer_cache_key` the answer (and its `sources`) is cached for
+    equivalent questions.
+    """
+    logger.info("💾 Starting background save...")
+    save_start = asyncio.get_event_loop().time()
+
+    readcount_data = {doc_id: 1 for doc_id in document_ids}
+
+    history_data = {
+        "prompt": question,
+        "response": answer,
+        "used_tokens": used_tokens
+    }
+
+    token_data = {"used_tokens": used_tokens}
+
+    if answer_cache_key and SEMANTIC_CACHE_CONFIG["reuse_answers"]:
+        await context_cache.set(
+            answer_cache_key,
+            {"answer": answer, "document_ids": list(readcount_data), "sources": sources or []},
+            SEMANTIC_CACHE_CONFIG["answer_ttl"]
+        )
+
+    try:
+        save_results = await save_data_parallel(
+            history_data, readcount_data, token_data, auth_token
+        )
+
+        save_time = asyncio.get_event_loop().time() - save_start
+        logger.info(f"✅ Save done: {save_time:.2f}s")
+
+        for result in save_results:
+            if isinstance(result, dict) and not result.get('success', False) and not result.get('skipped', False):
+                logger.warning(f"⚠️ {result['type']} save failed")
+
+    except Exception as e:
+        logger.warning(f"⚠️ Background save failed: {e}")
+        save_time = asyncio.get_event_loop().time() - save_start
+    return save_time
+
+
+def used_document_ids(json_answer: Dict, org_context: List[RetrievedChunk]) -> List[str]:
+    if not (json_answer.get('used_document', False) and org_context):
+        return []
+    return list(dict.fromkeys(c.document_id for c in org_context if c.document_id))
+
+
+async def get_cached_answer(answer_cache_key: str) -> Optional[Dict]:
+    if not SEMANTIC_CACHE_CONFIG["reuse_answers"]:
+        return None
+    cached_answer = await context_cache.get(answer_cache_key)
+    if cached_answer:
+        logger.info("♻️ Reusing cached answer for equivalent question")
+    return cached_answer
+
+
 async def ask_doc_bot(
-    question: str, 
-    organization: str, 
+    question: str,
+    organization: str,
     auth_token: str
 ) -> JSONResponse:
     """
     Main chatbot function with all optimizations
     """
     start_time = asyncio.get_event_loop().time()
-    
+
     try:
         # ================= VALIDATION =================
-        if not question or len(question.strip()) < 3:
-            return JSONResponse(
-                status_code=400,
-                content={
-                    "status": "error",
-                    "message": "Question too short (minimum 3 characters)"
-                }
-            )
-        
-        if len(question) > 1000:
-            return JSONResponse(
-                status_code=400,
-                content={
-                    "status": "error",
-                    "message": "Question too long (maximum 1000 characters)"
-                }
-            )
-        
-        if not organization or not auth_token:
-            return JSONResponse(
-                status_code=400,
-                content={
-                    "status": "error",
-                    "message": "Missing required fields"
-                }
-            )
-        
-        # ================= EARLY AUTH & TOKEN CHECK =================
-        from app.services.input_validator import validate_input
-        validation_response = await validate_input(question, organization, auth_token)
-        if validation_response is not True:
-            return validation_response
-        
+        error_response = await validate_chat_request(question, organization, auth_token)
+        if error_response is not None:
+            return error_response
+
         # ================= CLASSIFY QUESTION =================
         question_type = classify_question_type(question)
         logger.info(f"📝 Question type: {question_type}")
-        
+
+        # ================= SEMANTIC CACHE =================
+        cache_key = await resolve_context_key(organization, question, question_type)
+        answer_cache_key = f"answer:{cache_key}"
+
+        cached_answer = await get_cached_answer(answer_cache_key)
+        if cached_answer:
+            await persist_chat(question, cached_answer["answer"], 0, cached_answer.get("document_ids", []), auth_token)
+            return JSONResponse(status_code=200, content={
+                "status": "success",
+                "question": question,
+                "answer": cached_answer["answer"],
+                "used_tokens": 0
+            })
+
         # ================= PARALLEL FETCH =================
-        logger.info("⏱️ Starting parallel fetch...")
-        fetch_start = asyncio.get_event_loop().time()
-        
         try:
-            history_task = fetch_history_async(auth_token, limit=10, offset=0)
-            context_task = build_context_from_weaviate_results(
-                organization=organization,
-                query_text=question,
-                question_type=question_type
+            history_result, org_context, law_context = await fetch_chat_inputs(
+                question, organization, auth_token, question_type, cache_key
             )
-            
-            history_result, context_result = await asyncio.gather(
-                history_task, 
-                context_task,
-                return_exceptions=True
-            )
-            
-            if isinstance(history_result, Exception):
-                raise history_result
-            if isinstance(context_result, Exception):
-                logger.error(f"Context fetch failed: {context_result}")
-                context_result = {"org_context": [], "law_context": []}
-            
-            org_context = context_result.get("org_context", [])
-            law_context = context_result.get("law_context", [])
-            
         except Exception as e:
             logger.error(f"❌ Parallel fetch failed: {e}")
             return JSONResponse(
@@ -149,53 +326,23 @@ async def ask_doc_bot(
                     "error": str(e)
                 }
             )
-        
-        fetch_time = asyncio.get_event_loop().time() - fetch_start
-        logger.info(f"✅ Fetch done: {fetch_time:.2f}s | Org: {len(org_context)}, Law: {len(law_context)}")
-
-        # Check token limit EARLY
-        remaining_tokens = history_result.get('remaining_tokens')
-        print(f"Remaining tokens: {remaining_tokens}")
-        # if remaining_tokens is not None and remaining_tokens < RAG_CONFIG["min_tokens_required"]:
-        #     logger.warning(f"❌ Insufficient tokens: {remaining_tokens}")
-        #     return JSONResponse(
-        #         status_code=400,
-        #         content={
-        #             "status": "error",
-        #             "message": "Insufficient tokens to continue the conversation.",
-        #             "remaining_tokens": remaining_tokens
-        #         }
-        #     )
-        
-        # Build chat history
-        chat_history = []
-        for h in history_result.get('histories', []):
-            chat_history.append({"role": "user", "content": h['prompt']})
-            chat_history.append({"role": "assistant", "content": h['response']})
-        
-        # ================= BUILD PROMPT =================
-        system_prompt = build_system_prompt(question_type)
-        
-        messages = [{"role": "system", "content": system_prompt}]
-        messages.extend(chat_history)
-        
-        formatted_content_str = await formatted_content(question_type, org_context, law_context)
-        
-        user_content = f"{formatted_content_str}QUESTION: {question}"
-        messages.append({"role": "user", "content": user_content})
-        
+
+        messages, packed = build_chat_messages(question, question_type, history_result, org_context, law_context)
+        # Only what made it into the prompt counts as used / cited
+        org_context, law_context = packed.org_context, packed.law_context
+
         # ================= LLM CALL WITH FORCED JSON =================
         logger.info("🤖 Calling LLM...")
         llm_start = asyncio.get_event_loop().time()
 
         try:
-            async with AsyncOpenAI(api_key=OPENAI_API_KEY) as openai_client:
-                response = await openai_client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=messages,
-                    temperature=0.3,
-                    response_format={"type": "json_object"}
-                )
+            response = await llm_gateway.chat_completion(
+                priority="chat",
+                model="gpt-4o-mini",
+                messages=messages,
+                temperature=0.3,
+                response_format={"type": "json_object"}
+            )
         except openai.APIError as e:
             logger.error(f"❌ OpenAI API error: {e}")
             return JSONResponse(
@@ -223,81 +370,38 @@ async def ask_doc_bot(
                     "message": "Failed to generate response"
                 }
             )
-        
+
         llm_time = asyncio.get_event_loop().time() - llm_start
         used_tokens = response.usage.total_tokens
-        
-        logger.info(f"✅ LLM done: {llm_time:.2f}s | Tokens: {used_tokens}")
-        
+        cached_tokens = cached_prompt_tokens(response.usage)
+
+        logger.info(f"✅ LLM done: {llm_time:.2f}s | Tokens: {used_tokens} (prompt {response.usage.prompt_tokens}, cached {cached_tokens})")
+
         # Parse JSON response
         answer = response.choices[0].message.content.strip()
-        
-        try:
-            json_answer = json.loads(answer)
-        except json.JSONDecodeError as e:
-            logger.error(f"⚠️ JSON parse failed: {e}")
-            json_answer = {
-                "answer": answer,
-                "used_document": question_type == "POLICY" and bool(org_context),
-                "sources": []
-            }
-        
-        # Validate used_document flag for MIXED questions
-        if question_type == "LAW" and json_answer.get('used_document', False):
-            logger.warning("⚠️ Correcting used_document flag for law question")
-            json_answer['used_document'] = False
-        
-        if question_type == "MIXED":
-            # For MIXED: only true if org context was actually used
-            if not org_context:
-                json_answer['used_document'] = False
-                logger.info("ℹ️ MIXED question with no org context: used_document=False")
-        
+        json_answer = parse_llm_answer(answer, question_type, org_context)
+
         # ============ PARALLEL SAVE (Background) ============
-        logger.info("💾 Starting background save...")
-        save_start = asyncio.get_event_loop().time()
-        
-        readcount_data = {}
-        if json_answer.get('used_document', False) and org_context:
-            for c in org_context:
-                doc_id = c.properties.get("document_id", "")
-                if doc_id:
-                    readcount_data[doc_id] = 1
-        
-        history_data = {
-            "prompt": question,
-            "response": json_answer['answer'],
-            "used_tokens": used_tokens
-        }
-        
-        token_data = {"used_tokens": used_tokens}
-        
-        try:
-            save_results = await save_data_parallel(
-                history_data, readcount_data, token_data, auth_token
-            )
-            
-            save_time = asyncio.get_event_loop().time() - save_start
-            logger.info(f"✅ Save done: {save_time:.2f}s")
-            
-            for result in save_results:
-                if isinstance(result, dict) and not result.get('success', False) and not result.get('skipped', False):
-                    logger.warning(f"⚠️ {result['type']} save failed")
-        
-        except Exception as e:
-            logger.warning(f"⚠️ Background save failed: {e}")
-            save_time = asyncio.get_event_loop().time() - save_start
-        
+        await persist_chat(
+            question,
+            json_answer['answer'],
+            used_tokens,
+            used_document_ids(json_answer, org_context),
+            auth_token,
+            answer_cache_key,
+            context_sources(org_context, law_context)
+        )
+
         total_time = asyncio.get_event_loop().time() - start_time
         logger.info(f"🎯 Total: {total_time:.2f}s")
-        
+
         return JSONResponse(status_code=200, content={
             "status": "success",
             "question": question,
             "answer": json_answer['answer'],
             "used_tokens": used_tokens
         })
-    
+
     except Exception as e:
         logger.error(f"❌ Unexpected error: {e}")
         return JSONResponse(
@@ -310,6 +414,150 @@ async def ask_doc_bot(
         )
 
 
+async def ask_doc_bot_stream(
+    question: str,
+    organization: str,
+    auth_token: str
+) -> Response:
+    """
+    Streaming variant of ask_doc_bot (Server-Sent Events).
+
+    Events:
+    - `token`: {"text": ...} answer text as it is generated
+    - `done`:  {"answer", "used_tokens", "used_document", "sources"}
+    - `error`: {"message": ...}
+
+    Validation errors are returned as plain JSON before the stream opens.
+    History/token persistence runs after the stream has closed.
+    """
+    start_time = time.perf_counter()
+
+    error_response = await validate_chat_request(question, organization, auth_token)
+    if error_response is not None:
+        return error_response
+
+    question_type = classify_question_type(question)
+    logger.info(f"📝 Question type: {question_type} (streaming)")
+
+    cache_key = await resolve_context_key(organization, question, question_type)
+    answer_cache_key = f"answer:{cache_key}"
+
+    # Filled in while streaming, persisted once the response has been sent
+    result: Dict = {}
+
+    async def persist_after_stream():
+        if "answer" not in result:
+            return
+        await persist_chat(
+            question,
+            result["answer"],
+            result["used_tokens"],
+            result["document_ids"],
+            auth_token,
+            result.get("answer_cache_key"),
+            result.get("sources")
+        )
+
+    async def event_stream():
+        cached_answer = await get_cached_answer(answer_cache_key)
+        if cached_answer:
+            metrics.observe("chatbot_ttft_seconds", time.perf_counter() - start_time, cached="true")
+            result.update(answer=cached_answer["answer"], used_tokens=0, document_ids=cached_answer.get("document_ids", []))
+            yield sse_event("token", {"text": cached_answer["answer"]})
+            yield sse_event("done", {
+                "answer": cached_answer["answer"],
+                "used_tokens": 0,
+                "used_document": bool(result["document_ids"]),
+                "sources": cached_answer.get("sources", [])
+            })
+            return
+
+        try:
+            history_result, org_context, law_context = await fetch_chat_inputs(
+                question, organization, auth_token, question_type, cache_key
+            )
+        except Exception as e:
+            logger.error(f"❌ Parallel fetch failed: {e}")
+            yield sse_event("error", {"message": "Failed to retrieve necessary data"})
+            return
+
+        messages, packed = build_chat_messages(question, question_type, history_result, org_context, law_context)
+        # Only what made it into the prompt counts as used / cited
+        org_context, law_context = packed.org_context, packed.law_context
+
+        logger.info("🤖 Streaming LLM...")
+        parser = AnswerFieldStream("answer")
+        used_tokens = 0
+        cached_tokens = 0
+        first_token_at = None
+
+        try:
+            stream = await llm_gateway.stream_chat_completion(
+                priority="chat",
+                model="gpt-4o-mini",
+                messages=messages,
+                temperature=0.3,
+                response_format={"type": "json_object"}
+            )
+            async for chunk in stream:
+                if chunk.usage is not None:
+                    used_tokens = chunk.usage.total_tokens
+                    cached_tokens = cached_prompt_tokens(chunk.usage)
+                if not chunk.choices:
+                    continue
+                text = parser.feed(chunk.choices[0].delta.content or "")
+                if text:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                        metrics.observe("chatbot_ttft_seconds", first_token_at - start_time, cached="false")
+                        logger.info(f"⚡ First token after {first_token_at - start_time:.2f}s")
+                    yield sse_event("token", {"text": text})
+        except openai.RateLimitError as e:
+            logger.error(f"❌ Rate limit: {e}")
+            yield sse_event("error", {"message": "Too many requests. Please try again later."})
+            return
+        except openai.APIError as e:
+            logger.error(f"❌ OpenAI API error: {e}")
+            yield sse_event("error", {"message": "AI service temporarily unavailable"})
+            return
+        except Exception as e:
+            logger.error(f"❌ LLM stream failed: {e}")
+            yield sse_event("error", {"message": "Failed to generate response"})
+            return
+
+        json_answer = parse_llm_answer(parser.raw.strip(), question_type, org_context)
+        sources = context_sources(org_context, law_context)
+        result.update(
+            answer=json_answer['answer'],
+            used_tokens=used_tokens,
+            document_ids=used_document_ids(json_answer, org_context),
+            answer_cache_key=answer_cache_key,
+            sources=sources
+        )
+
+        # The answer field wasn't valid streaming JSON - send it whole
+        if first_token_at is None and json_answer['answer']:
+            yield sse_event("token", {"text": json_answer['answer']})
+
+        yield sse_event("done", {
+            "answer": json_answer['answer'],
+            "used_tokens": used_tokens,
+            "used_document": bool(json_answer.get('used_document', False)),
+            "sources": sources
+        })
+
+        total_time = time.perf_counter() - start_time
+        metrics.observe("chatbot_stream_seconds", total_time)
+        logger.info(f"🎯 Stream total: {total_time:.2f}s | Tokens: {used_tokens} (cached {cached_tokens})")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(persist_after_stream)
+    )
+
+
 
 
 
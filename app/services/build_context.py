@@ -1,13 +1,21 @@
-from app.services.cross_encoder_model import LocalReranker
+from app.services.cross_encoder_model import make_pairs, apply_scores
+from app.services.rerank_batcher import rerank_batcher
+from app.services.rerank_score_cache import rerank_score_cache, query_fingerprint
+from app.services.rerank_gating import rerank_gate, sort_by_vector_score, record_candidates, log_decision, SKIP
 import asyncio
-from collections import defaultdict
-from app.services.weaviate_client import get_weaviate_client
-from app.services.redis import get_cached_context, set_cached_context
-from weaviate.classes.query import Filter, MetadataQuery
-from app.config import RAG_CONFIG
+from app.services import weaviate_store
+from app.services.context_cache import context_cache
+from app.services.semantic_cache import semantic_cache
+from app.services.embedding_service import embed_query
+from app.services.retrieved_chunk import RetrievedChunk
+from app.services.latest_version_index import latest_filter, ensure_latest_index, keep_latest_versions, mark_not_ready
+from weaviate.classes.query import MetadataQuery
+from app.config import RAG_CONFIG, LAW_COLLECTIONS, SEMANTIC_CACHE_CONFIG, RERANK_GATING_CONFIG
+from app.core.metrics import metrics
 import os
+import time
 import logging
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 import hashlib
 
 
@@ -15,218 +23,318 @@ import hashlib
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize global reranker (loaded once at startup)
-reranker = LocalReranker()
 
-
-def _version_number(v) -> float:
-    """Convert version string to float for sorting"""
-    try:
-        if isinstance(v, str):
-            v = v.lower().strip()
-            if v.startswith("v"):
-                v = v[1:]
-            return float(v)
-        return float(v)
-    except (ValueError, TypeError):
-        return 0.0
-
-
-def pick_latest_per_title(objects) -> List:
-    """Group documents by title and pick latest version"""
-    grouped = defaultdict(list)
-    for obj in objects:
-        title = obj.properties.get("title", "")
-        grouped[title].append(obj)
-
-    latest = []
-    for title, objs in grouped.items():
-        best = max(objs, key=lambda o: _version_number(o.properties.get("version", 0)))
-        latest.append(best)
-    return latest
-
-
-async def rerank_documents_async(query: str, documents: list, top_k: int = 5) -> List:
-    """Async wrapper for reranking"""
+async def rerank_documents_async(
+    query: str,
+    documents: List[RetrievedChunk],
+    top_k: int = 5,
+    source: str = "context"
+) -> List[RetrievedChunk]:
+    """
+    Rerank through the shared micro-batcher (batched with concurrent requests).
+    - the confidence gate may skip the cross-encoder or rerank only the head
+    - only chunks without a cached score for this query go to the model
+    """
     if not documents:
         return []
     
     try:
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            None,
-            reranker.rerank,
-            query,
-            documents,
-            top_k
-        )
+        ranked = sort_by_vector_score(documents)
+        path, n_rerank = rerank_gate.decide([d.vector_score for d in ranked], top_k)
+        log_decision(source, path, len(ranked), n_rerank)
+        if RERANK_GATING_CONFIG["record_path"]:
+            asyncio.create_task(record_candidates(query, source, ranked, top_k, path))
+        
+        if path == SKIP:
+            return ranked[:top_k]
+        documents = ranked[:n_rerank]
+        
+        fingerprint = query_fingerprint(query)
+        scores = await rerank_score_cache.get_many(fingerprint, documents)
+        
+        uncached = [doc for doc, score in zip(documents, scores) if score is None]
+        if uncached:
+            fresh = await rerank_batcher.score(make_pairs(query, uncached))
+            await rerank_score_cache.set_many(fingerprint, uncached, fresh)
+            fresh_iter = iter(fresh)
+            scores = [next(fresh_iter) if score is None else score for score in scores]
+        
+        return apply_scores(documents, scores, top_k)
     except Exception as e:
         logger.error(f"❌ Reranking failed: {e}")
-        return [{"document": doc, "score": 0.0} for doc in documents[:top_k]]
+        return documents[:top_k]
     
+async def get_query_vector(query_text: str) -> Optional[List[float]]:
+    """
+    Embed the question once per request (LRU-cached across requests).
+    Returns None if embedding fails so searches can fall back to near_text.
+    """
+    try:
+        return await embed_query(query_text)
+    except Exception as e:
+        logger.warning(f"⚠️ Query embedding failed, falling back to near_text: {e}")
+        return None
+
+
+async def vector_search(
+    collection_name: str,
+    query_text: str,
+    query_vector: Optional[List[float]],
+    **kwargs
+):
+    """near_vector with the precomputed embedding, or near_text without one"""
+    if query_vector is not None:
+        return await weaviate_store.near_vector(collection_name, query_vector, **kwargs)
+    return await weaviate_store.near_text(collection_name, query_text, **kwargs)
+
+
 async def search_law_collection_async(
-    client, 
     collection_name: str, 
     query_text: str, 
-    limit: int
-) -> List:
-    """Search a single law collection"""
+    query_vector: Optional[List[float]],
+    limit: int,
+    deadline: float
+) -> Tuple[List[RetrievedChunk], bool]:
+    """
+    Search a single law collection under its own deadline.
+    Returns (chunks, timed_out) so callers can tell partial results apart.
+    """
+    start = time.perf_counter()
     try:
-        collection = client.collections.get(collection_name)
-        response = collection.query.near_text(
-            query=query_text,
+        response = await vector_search(
+            collection_name,
+            query_text,
+            query_vector,
             limit=limit,
-            return_metadata=MetadataQuery(score=True)
+            return_metadata=MetadataQuery(distance=True, score=True),
+            timeout=deadline
         )
         
-        if response and response.objects:
-            logger.info(f"⚖️ {collection_name}: {len(response.objects)} results")
-            return response.objects
-        return []
+        objects = response.objects if response and response.objects else []
+        logger.info(f"⚖️ {collection_name}: {len(objects)} results")
+        return [RetrievedChunk.from_weaviate(obj) for obj in objects], False
+    except asyncio.TimeoutError:
+        logger.warning(f"⏱️ {collection_name} missed the {deadline}s deadline")
+        metrics.increment("law_search_timeouts_total", collection=collection_name)
+        return [], True
     except Exception as e:
         logger.warning(f"⚠️ {collection_name} search failed: {e}")
-        return []
+        metrics.increment("law_search_errors_total", collection=collection_name)
+        return [], False
+    finally:
+        metrics.observe("law_search_seconds", time.perf_counter() - start, collection=collection_name)
+
+
+async def search_law_collections(
+    query_text: str,
+    query_vector: Optional[List[float]]
+) -> Tuple[List[RetrievedChunk], bool]:
+    """
+    Fan out across every law collection concurrently.
+    Each collection gets the same deadline; slow ones are cancelled and the
+    rest are returned as partial results. Returns (documents, complete).
+    """
+    limit_per_collection = RAG_CONFIG["initial_fetch"] // len(LAW_COLLECTIONS)
+    deadline = RAG_CONFIG["law_search_deadline"]
+
+    results = await asyncio.gather(*[
+        search_law_collection_async(collection_name, query_text, query_vector, limit_per_collection, deadline)
+        for collection_name in LAW_COLLECTIONS
+    ])
+
+    law_documents = []
+    complete = True
+    for chunks, timed_out in results:
+        law_documents.extend(chunks)
+        complete = complete and not timed_out
+    return law_documents, complete
+
+
+async def get_law_documents(
+    query_text: str,
+    query_vector: Optional[List[float]],
+    question_type: str,
+    query_hash: str
+) -> Tuple[List[RetrievedChunk], bool]:
+    """
+    Law candidates for a question, shared across organizations.
+    Returns (documents, complete); partial fan-outs are served but not cached.
+    """
+    law_cache_key = f"law:v3:{question_type}:{query_hash}"
+
+    async def build_law():
+        logger.info(f"⚖️ Fetching law context for {question_type} question")
+        
+        # Concurrent, deadline-bounded search across law collections
+        law_documents, law_complete = await search_law_collections(query_text, query_vector)
+        logger.info(f"⚖️ Total law docs: {len(law_documents)} (complete={law_complete})")
+        # Completeness travels with the value, so callers joining this build see it too
+        return {"law_docs": law_documents, "complete": law_complete}, law_complete
+
+    cached_law = await context_cache.get_or_build(
+        law_cache_key,
+        build_law,
+        RAG_CONFIG["cache_ttl"] * 2  # Law docs can be cached longer
+    )
+    # Only complete fan-outs are ever stored, so cached entries without the flag are complete
+    return cached_law.get("law_docs", []), cached_law.get("complete", True)
+
+
+async def _build_context(
+    organization: str,
+    query_text: str,
+    question_type: str,
+    query_hash: str
+) -> Tuple[Dict, bool]:
+    """Run retrieval + reranking. Returns (context, cacheable)."""
+    # One embedding serves the org search and every law collection
+    query_vector = await get_query_vector(query_text)
+    
+    # ========== STEP 1: Vector search over latest org versions ==========
+    async def search_organization() -> List[RetrievedChunk]:
+        logger.info(f"🔍 Searching organization: {organization}")
+        limit = RAG_CONFIG["initial_fetch"] // 2
+        if await ensure_latest_index(organization):
+            try:
+                org_vector_response = await vector_search(
+                    organization,
+                    query_text,
+                    query_vector,
+                    filters=latest_filter,
+                    limit=limit,
+                    return_metadata=MetadataQuery(distance=True, score=True)
+                )
+                objects = org_vector_response.objects if org_vector_response else []
+                if objects:
+                    logger.info(f"📄 Organization docs: {len(objects)}")
+                    return [RetrievedChunk.from_weaviate(obj) for obj in objects]
+            except Exception as e:
+                logger.warning(f"⚠️ Latest-version org search failed, retrying unfiltered: {e}")
+                mark_not_ready(organization)
+
+        # No usable is_latest flags (or nothing flagged): search everything and
+        # keep the newest version per document among the hits. Over-fetch, since
+        # older versions take up part of the results.
+        try:
+            org_vector_response = await vector_search(
+                organization,
+                query_text,
+                query_vector,
+                limit=limit * 2,
+                return_metadata=MetadataQuery(distance=True, score=True)
+            )
+            objects = keep_latest_versions(org_vector_response.objects if org_vector_response else [])[:limit]
+            if objects:
+                metrics.increment("org_search_unfiltered_total")
+            logger.info(f"📄 Organization docs (unfiltered): {len(objects)}")
+            return [RetrievedChunk.from_weaviate(obj) for obj in objects]
+        except Exception as e:
+            logger.error(f"❌ Org vector search failed: {e}")
+            return []
 
+    # ========== STEP 2: Conditionally fetch law documents ==========
+    async def search_law() -> Tuple[List[RetrievedChunk], bool]:
+        # For MIXED questions, ALWAYS fetch law context
+        # For LAW questions, fetch law context
+        # For POLICY questions, optionally fetch law for reference
+        if question_type in ["LAW", "MIXED"]:
+            return await get_law_documents(query_text, query_vector, question_type, query_hash)
+        logger.info(f"⏭️ Skipping law context for {question_type} question")
+        return [], True
+
+    org_documents, (law_documents, law_complete) = await asyncio.gather(
+        search_organization(),
+        search_law()
+    )
+
+    # ========== STEP 3: Rerank organization documents ==========
+    org_context = []
+    if org_documents:
+        org_context = await rerank_documents_async(
+            query=query_text,
+            documents=org_documents,
+            top_k=RAG_CONFIG["rerank_top_k"],
+            source="org"
+        )
+    
+    # ========== STEP 4: Rerank law documents ==========
+    law_context = []
+    if law_documents:
+        law_context = await rerank_documents_async(
+            query=query_text,
+            documents=law_documents,
+            top_k=RAG_CONFIG["rerank_top_k"],
+            source="law"
+        )
+    
+    result = {
+        "org_context": org_context,
+        "law_context": law_context
+    }
+    
+    logger.info(f"✅ Context built for {organization}: {len(org_context)} org + {len(law_context)} law")
+    # Only cache the organization-specific result when law search was complete
+    return result, law_complete
+
+
+async def resolve_context_key(organization: str, query_text: str, question_type: str) -> str:
+    """
+    Context cache key for a question.
+    Reuses the key of a recent, semantically equivalent question in the same
+    organization/question_type when its context is still cached; otherwise
+    returns the exact-text key and registers the question for later matches.
+    """
+    query_hash = hashlib.md5(query_text.encode()).hexdigest()
+    cache_key = f"context:v3:{organization}:{question_type}:{query_hash}"
+
+    if not SEMANTIC_CACHE_CONFIG["enabled"]:
+        return cache_key
+
+    embedding = await get_query_vector(query_text)
+    if embedding is None:
+        return cache_key
+
+    similar_key = semantic_cache.lookup(organization, question_type, embedding)
+    if similar_key == cache_key:
+        return cache_key
+    if similar_key and await context_cache.get(similar_key) is not None:
+        return similar_key
+
+    semantic_cache.add(organization, question_type, embedding, cache_key)
+    return cache_key
 
 
 async def build_context_from_weaviate_results(
     organization: str, 
     query_text: str,
-    question_type: str
+    question_type: str,
+    cache_key: Optional[str] = None
 ) -> Dict:
     """
     Build context from Weaviate with optimizations:
     - Only fetch law docs when needed
     - Parallel law collection searches
-    - Redis caching with organization isolation
+    - Two-tier (in-process + Redis) caching with organization isolation
     
     CACHE STRATEGY:
     - Organization-specific cache keys prevent data leakage
     - Law context can be shared across orgs (same legal documents)
     - Org context is always organization-specific
+    - Concurrent identical questions share one build (single-flight)
+    - Paraphrased questions share an entry via the semantic cache
     """
-    # Generate organization-specific cache key
     query_hash = hashlib.md5(query_text.encode()).hexdigest()
-    cache_key = f"context:v2:{organization}:{question_type}:{query_hash}"
-    
-    # Try cache first
-    cached = await get_cached_context(cache_key)
-    if cached:
-        logger.info(f"✅ Cache hit for {organization}")
-        return cached
-    
-    client = get_weaviate_client()
     
     try:
-        if not client.is_connected():
-            client.connect()
-
-        # ========== STEP 1: Fetch organization documents ==========
-        logger.info(f"🔍 Searching organization: {organization}")
-        
-        try:
-            org_collection = client.collections.get(organization)
-            org_results = org_collection.query.fetch_objects()
-            org_latest = pick_latest_per_title(org_results.objects)
-            logger.info(f"📄 Organization docs: {len(org_latest)}")
-        except Exception as e:
-            logger.warning(f"⚠️ Organization {organization} not found: {e}")
-            org_latest = []
-        
-        # ========== STEP 2: Conditionally fetch law documents ==========
-        law_documents = []
-        
-        # For MIXED questions, ALWAYS fetch law context
-        # For LAW questions, fetch law context
-        # For POLICY questions, optionally fetch law for reference
-        if question_type in ["LAW", "MIXED"]:
-            # Try to get law context from shared cache first
-            law_cache_key = f"law:v2:{question_type}:{query_hash}"
-            cached_law = await get_cached_context(law_cache_key)
-            
-            if cached_law:
-                logger.info(f"✅ Law cache hit (shared across orgs)")
-                law_documents = cached_law.get("law_docs", [])
-            else:
-                logger.info(f"⚖️ Fetching law context for {question_type} question")
-                
-                law_collections = ["AgedCareAct", "HomeCareAct", "NDIS", "GeneralAct", "Others"]
-                limit_per_collection = RAG_CONFIG["initial_fetch"] // len(law_collections)
-                
-                # Parallel search across law collections
-                search_tasks = [
-                    search_law_collection_async(
-                        client, 
-                        collection_name, 
-                        query_text, 
-                        limit_per_collection
-                    )
-                    for collection_name in law_collections
-                ]
-                
-                law_results = await asyncio.gather(*search_tasks, return_exceptions=True)
-                
-                for result in law_results:
-                    if isinstance(result, list):
-                        law_documents.extend(result)
-                
-                logger.info(f"⚖️ Total law docs: {len(law_documents)}")
-                
-                # Cache law context separately (can be shared across organizations)
-                await set_cached_context(
-                    law_cache_key, 
-                    {"law_docs": law_documents}, 
-                    RAG_CONFIG["cache_ttl"] * 2  # Law docs can be cached longer
-                )
-        else:
-            logger.info(f"⏭️ Skipping law context for {question_type} question")
-
-        # ========== STEP 3: Vector search in organization ==========
-        org_context = []
-        if org_latest:
-            try:
-                org_vector_response = org_collection.query.near_text(
-                    query=query_text,
-                    filters=Filter.by_id().contains_any([str(obj.uuid) for obj in org_latest]),
-                    limit=RAG_CONFIG["initial_fetch"] // 2,
-                    return_metadata=MetadataQuery(score=True)
-                )
-                
-                if org_vector_response and org_vector_response.objects:
-                    org_reranked = await rerank_documents_async(
-                        query=query_text,
-                        documents=org_vector_response.objects,
-                        top_k=RAG_CONFIG["rerank_top_k"]
-                    )
-                    org_context = [item['document'] for item in org_reranked]
-            except Exception as e:
-                logger.error(f"❌ Org vector search failed: {e}")
-        
-        # ========== STEP 4: Rerank law documents ==========
-        law_context = []
-        if law_documents:
-            law_reranked = await rerank_documents_async(
-                query=query_text,
-                documents=law_documents,
-                top_k=RAG_CONFIG["rerank_top_k"]
-            )
-            law_context = [item['document'] for item in law_reranked]
-        
-        result = {
-            "org_context": org_context,
-            "law_context": law_context
-        }
-        
-        # Cache the organization-specific result
-        await set_cached_context(cache_key, result, RAG_CONFIG["cache_ttl"])
-        
-        logger.info(f"✅ Context built for {organization}: {len(org_context)} org + {len(law_context)} law")
-        return result
+        if cache_key is None:
+            cache_key = await resolve_context_key(organization, query_text, question_type)
 
+        return await context_cache.get_or_build(
+            cache_key,
+            lambda: _build_context(organization, query_text, question_type, query_hash),
+            RAG_CONFIG["cache_ttl"]
+        )
     except Exception as e:
         logger.error(f"❌ Context build failed: {e}")
         # Return empty context instead of raising
         return {"org_context": [], "law_context": []}
-    finally:
-        if client.is_connected():
-            client.close()
@@ -0,0 +1,266 @@
+"""
+Local document-category classifier.
+
+`classify_category` used to send every document summary to gpt-4 just to
+pick one of the fixed categories. The summary is now embedded once and
+compared (cosine) with one prototype vector per category; a softmax over
+the similarities gives a confidence, and only summaries below
+`min_confidence` still go to the LLM.
+
+Prototypes:
+- by default, the embedding of each category's description below
+- after `python -m scripts.evaluate_category_classifier labels.jsonl --save`,
+  the centroid of the description and the historical LLM-labelled summaries
+  of that category, stored at `prototypes_path` (`--build` only evaluates
+  prototypes built from a training split; it doesn't write the file)
+
+LLM decisions are appended to `record_path` (when set), which is the
+labelled set the build / evaluation script works from.
+"""
+
+import os
+import json
+import asyncio
+import hashlib
+import logging
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+from app.services.llm_gateway import llm_gateway
+from app.core.metrics import metrics
+from app.core.executors import run_in_pool
+from app.config import CATEGORY_CLASSIFIER_CONFIG
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Keys must match `classification.categories`; "others" has no prototype
+# (anything that matches no category well is left to the LLM)
+CATEGORY_DESCRIPTIONS = {
+    "governance_leadership": "Governance and leadership: board and executive responsibilities, organisational structure, delegations of authority, strategic planning, accountability and compliance oversight.",
+    "risk_management_quality_improvement": "Risk management and quality improvement: risk registers, risk assessment and controls, quality management systems, quality indicators and improvement plans.",
+    "human_resources_workforce_management": "Human resources and workforce management: recruitment, screening checks, employment conditions, rostering, performance management, staff conduct and grievances.",
+    "competency_training": "Competency and training: staff induction, mandatory training, skills and competency assessment, professional development and training records.",
+    "clinical_care_support_services": "Clinical care and support services: nursing and personal care, clinical assessment, wound, pain, continence, nutrition and falls care, daily living support.",
+    "care_planning_agreements": "Care planning and agreements: care and support plans, assessment and review of needs, service and home care agreements, consent and participant goals.",
+    "work_health_safety_whs": "Work health and safety (WHS): workplace hazards, manual handling, safe work practices, PPE, WHS consultation, injury prevention and return to work.",
+    "incident_management_reporting": "Incident management and reporting: identifying, recording, investigating and reporting incidents, serious incident response scheme (SIRS), reportable incidents.",
+    "infection_prevention_control": "Infection prevention and control: hand hygiene, standard and transmission-based precautions, outbreak management, cleaning, vaccination and antimicrobial stewardship.",
+    "medication_management": "Medication management: prescribing, administration, storage and disposal of medicines, medication charts, errors, psychotropics and pharmacy reviews.",
+    "behavior_support_restrictive_practices": "Behaviour support and restrictive practices: behaviours of concern, behaviour support plans, chemical, physical and environmental restraint, authorisation and reduction.",
+    "emergency_disaster_management": "Emergency and disaster management: fire, evacuation, business continuity, severe weather, pandemic preparedness and emergency response plans.",
+    "financial_management_procurement": "Financial management and procurement: budgets, fees and charges, accounts, purchasing, contracts with suppliers, asset management and financial controls.",
+    "privacy_confidentiality_information_governance": "Privacy, confidentiality and information governance: personal information handling, consent to share information, records management, data security and breaches.",
+    "resident_participant_rights_safeguarding": "Resident and participant rights and safeguarding: dignity, choice and independence, advocacy, decision-making, abuse and neglect prevention.",
+    "feedback_complaints_management": "Feedback and complaints management: receiving, recording and resolving complaints and compliments, open disclosure, escalation to the commission.",
+    "diversity_inclusion_cultural_safety": "Diversity, inclusion and cultural safety: culturally and linguistically diverse people, Aboriginal and Torres Strait Islander people, LGBTIQ+ inclusion, interpreters.",
+    "safeguarding_children_vulnerable_persons": "Safeguarding children and vulnerable persons: child safe standards, working with children checks, mandatory reporting of harm to children and at-risk adults.",
+    "continuous_improvement_audit_evidence": "Continuous improvement and audit evidence: internal audits, continuous improvement register, accreditation and certification evidence, self-assessment against standards.",
+    "operational_registers_logs": "Operational registers and logs: maintenance, equipment, cleaning, temperature, visitor and key registers, checklists and operational logs.",
+}
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def _descriptions_version() -> str:
+    blob = json.dumps(CATEGORY_DESCRIPTIONS, sort_keys=True)
+    return hashlib.sha256(blob.encode()).hexdigest()[:16]
+
+
+def softmax_confidence(similarities: np.ndarray, temperature: float) -> np.ndarray:
+    """Row-wise softmax of cosine similarities (one row per summary)"""
+    logits = (similarities - similarities.max(axis=-1, keepdims=True)) / temperature
+    probs = np.exp(logits)
+    return probs / probs.sum(axis=-1, keepdims=True)
+
+
+def _append_record(path: str, record: dict):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class CategoryClassifier:
+    def __init__(
+        self,
+        enabled: bool = True,
+        model: str = "text-embedding-3-small",
+        temperature: float = 0.02,
+        min_confidence: float = 0.6,
+        prototypes_path: str = "",
+        record_path: str = ""
+    ):
+        self.enabled = enabled
+        self.model = model
+        self.temperature = temperature
+        self.min_confidence = min_confidence
+        self.prototypes_path = prototypes_path
+        self.record_path = record_path
+        self.labels: List[str] = []
+        self._prototypes: Optional[np.ndarray] = None
+        self._lock = asyncio.Lock()
+
+    # ================= EMBEDDINGS =================
+
+    async def embed(self, texts: Sequence[str], priority: str = "summarization", batch_size: int = 100) -> Tuple[np.ndarray, int]:
+        """Unit-length embeddings (one row per text) and the tokens used"""
+        rows, used_tokens = [], 0
+        for start in range(0, len(texts), batch_size):
+            response = await llm_gateway.create_embedding(
+                priority=priority,
+                model=self.model,
+                input=list(texts[start:start + batch_size])
+            )
+            rows.extend(item.embedding for item in response.data)
+            used_tokens += response.usage.total_tokens if response.usage else 0
+        return _normalize(np.asarray(rows, dtype=np.float32)), used_tokens
+
+    # ================= PROTOTYPES =================
+
+    async def build_prototypes(self, examples: Sequence[Tuple[str, str]] = ()) -> Dict:
+        """
+        One unit vector per category: the mean of its description embedding
+        and the embeddings of its labelled example summaries.
+        """
+        labels = list(CATEGORY_DESCRIPTIONS)
+        descriptions, used_tokens = await self.embed([CATEGORY_DESCRIPTIONS[l] for l in labels], priority="ingestion")
+        sums = descriptions.astype(np.float64).copy()
+        counts = np.ones(len(labels))
+
+        known = [(summary, category) for summary, category in examples if category in CATEGORY_DESCRIPTIONS]
+        if known:
+            vectors, tokens = await self.embed([summary for summary, _ in known], priority="ingestion")
+            used_tokens += tokens
+            for vector, (_, category) in zip(vectors, known):
+                index = labels.index(category)
+                sums[index] += vector
+                counts[index] += 1
+
+        prototypes = _normalize(sums / counts[:, None])
+        logger.info(f"🧭 Built {len(labels)} category prototypes from {len(known)} labelled example(s), {used_tokens} tokens")
+        return {
+            "model": self.model,
+            "descriptions_version": _descriptions_version(),
+            "labels": labels,
+            "examples": {label: int(count) - 1 for label, count in zip(labels, counts)},
+            "prototypes": prototypes.tolist(),
+        }
+
+    def use_prototypes(self, data: Dict):
+        self.labels = list(data["labels"])
+        self._prototypes = _normalize(np.asarray(data["prototypes"], dtype=np.float32))
+
+    def save_prototypes(self, data: Dict, path: Optional[str] = None):
+        path = path or self.prototypes_path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        logger.info(f"💾 Category prototypes saved to {path}")
+
+    def _load_prototypes(self) -> Optional[Dict]:
+        if not self.prototypes_path or not os.path.exists(self.prototypes_path):
+            return None
+        with open(self.prototypes_path, encoding="utf-8") as f:
+            data = json.load(f)
+        # Vectors from another embedding model are not comparable
+        if data.get("model") != self.model:
+            logger.warning(f"⚠️ Category prototypes were built with {data.get('model')}, not {self.model} - rebuilding")
+            return None
+        # Added / removed categories: the stored set can't be scored against the current one
+        if set(data.get("labels", [])) != set(CATEGORY_DESCRIPTIONS):
+            logger.warning(
+                "⚠️ Category prototypes don't match the current categories - rebuilding from descriptions "
+                "(re-run scripts/evaluate_category_classifier.py --save to include labelled examples)"
+            )
+            return None
+        if data.get("descriptions_version") != _descriptions_version():
+            if not any(data.get("examples", {}).values()):
+                logger.info("🔄 Category descriptions changed - rebuilding prototypes")
+                return None
+            # Built mostly from labelled examples: still usable, but no longer matches the descriptions
+            logger.warning(
+                "⚠️ Category prototypes were built from older descriptions - "
+                "re-run scripts/evaluate_category_classifier.py --save to refresh them"
+            )
+        return data
+
+    async def ensure_prototypes(self):
+        if self._prototypes is not None:
+            return
+        async with self._lock:
+            if self._prototypes is not None:
+                return
+            data = await run_in_pool("io", self._load_prototypes)
+            if data is None:
+                data = await self.build_prototypes()
+                if self.prototypes_path:
+                    await run_in_pool("io", self.save_prototypes, data)
+            self.use_prototypes(data)
+
+    # ================= CLASSIFY =================
+
+    def score(self, vectors: np.ndarray, temperature: Optional[float] = None) -> List[Dict]:
+        """Best category, confidence and margin for each (unit-length) summary embedding"""
+        similarities = vectors @ self._prototypes.T
+        probs = softmax_confidence(similarities, temperature or self.temperature)
+        results = []
+        for sims, row in zip(similarities, probs):
+            order = np.argsort(-row)
+            results.append({
+                "category": self.labels[order[0]],
+                "confidence": float(row[order[0]]),
+                "similarity": float(sims[order[0]]),
+                "margin": float(sims[order[0]] - sims[order[1]]) if len(order) > 1 else 1.0,
+            })
+        return results
+
+    async def classify(self, summary: str) -> Optional[Dict]:
+        """
+        Local prediction with `used_tokens` (embedding tokens) and `confident`,
+        or None when disabled / unavailable (the caller falls back to the LLM).
+        """
+        if not self.enabled or not summary or not summary.strip():
+            return None
+        try:
+            await self.ensure_prototypes()
+            vectors, used_tokens = await self.embed([summary])
+        except Exception as e:
+            logger.warning(f"⚠️ Local category classification failed: {e}")
+            metrics.increment("category_classifier_errors_total")
+            return None
+
+        result = self.score(vectors)[0]
+        result["used_tokens"] = used_tokens
+        result["confident"] = result["confidence"] >= self.min_confidence
+        metrics.observe("category_classifier_confidence", result["confidence"])
+        logger.info(
+            f"🏷️ Local category {result['category']} (confidence {result['confidence']:.2f}, "
+            f"margin {result['margin']:.3f}) -> {'local' if result['confident'] else 'LLM fallback'}"
+        )
+        return result
+
+    async def record(self, summary: str, llm_category: str, local: Optional[Dict]):
+        """Append an LLM-labelled summary to `record_path` for later evaluation / prototype builds"""
+        if not self.record_path:
+            return
+        record = {
+            "summary": summary,
+            "category": llm_category,
+            "local_category": local["category"] if local else None,
+            "local_confidence": local["confidence"] if local else None,
+        }
+        try:
+            await run_in_pool("io", _append_record, self.record_path, record)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not record category label: {e}")
+
+
+category_classifier = CategoryClassifier(
+    enabled=CATEGORY_CLASSIFIER_CONFIG["enabled"],
+    model=CATEGORY_CLASSIFIER_CONFIG["model"],
+    temperature=CATEGORY_CLASSIFIER_CONFIG["temperature"],
+    min_confidence=CATEGORY_CLASSIFIER_CONFIG["min_confidence"],
+    prototypes_path=CATEGORY_CLASSIFIER_CONFIG["prototypes_path"],
+    record_path=CATEGORY_CLASSIFIER_CONFIG["record_path"],
+)
@@ -1,7 +1,12 @@
 import os
-from app.config import OPENAI_API_KEY
-from openai import AsyncOpenAI, OpenAI
+from app.services.llm_gateway import llm_gateway
+from app.services.category_classifier import category_classifier, CATEGORY_DESCRIPTIONS
+from app.core.metrics import metrics
 import json
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 categories = [
     {"name": "Governance & Leadership", "value": "governance_leadership"},
@@ -27,6 +32,11 @@ categories = [
     {"name": "Others", "value": "others"}
 ]
 
+# Every category except "others" needs a local classifier prototype
+_missing_descriptions = {c["value"] for c in categories} - {"others"} - set(CATEGORY_DESCRIPTIONS)
+if _missing_descriptions:
+    logger.warning(f"⚠️ No CATEGORY_DESCRIPTIONS for {sorted(_missing_descriptions)} - the local classifier can't predict them")
+
 # Document types we expect (you can extend this)
 document_types = [
     "policy",
@@ -35,6 +45,31 @@ document_types = [
     "standard"
 ]
 async def classify_category(docs_summary: str):
+    """
+    Category of a document summary. The local embedding classifier answers
+    when it is confident; otherwise (or when it is unavailable) gpt-4 decides.
+    """
+    local = await category_classifier.classify(docs_summary)
+    if local and local["confident"]:
+        metrics.increment("category_classifications_total", source="local")
+        return {
+            "category": local["category"],
+            "used_tokens": local["used_tokens"],
+            "confidence": local["confidence"],
+            "source": "local"
+        }
+
+    metrics.increment("category_classifications_total", source="llm")
+    response = await classify_category_llm(docs_summary)
+    if local:
+        response["used_tokens"] += local["used_tokens"]
+    if "error" not in response:
+        await category_classifier.record(docs_summary, response["category"], local)
+    response["source"] = "llm"
+    return response
+
+
+async def classify_category_llm(docs_summary: str):
     prompt = f"""
 You are an assistant that classifies aged-care organization documents.
 
@@ -46,16 +81,17 @@ Document text:
 {docs_summary}
 """
     try:
-        async with AsyncOpenAI(api_key=OPENAI_API_KEY) as client:
-            response = await client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You classify aged-care documents into category."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=300,
-                temperature=0
-            )
+        response = await llm_gateway.chat_completion(
+            priority="summarization",
+            cache=True,
+            model="gpt-4",
+            messages=[
+                {"role": "system", "content": "You classify aged-care documents into category."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=300,
+            temperature=0
+        )
 
         raw_content = response.choices[0].message.content.strip()
         print("Raw docs category classification response:", raw_content)
@@ -92,16 +128,16 @@ Output strictly as JSON:
 """
 
     try:
-        async with AsyncOpenAI(api_key=OPENAI_API_KEY) as openai_client:
-            response = await openai_client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that maps staff queries to document categories and types."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=100,
-                temperature=0
-            )
+        response = await llm_gateway.chat_completion(
+            priority="chat",
+            model="gpt-4",
+            messages=[
+                {"role": "system", "content": "You are a helpful assistant that maps staff queries to document categories and types."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=100,
+            temperature=0
+        )
         result = json.loads(response.choices[0].message.content.strip())
         # correct json if necessary
 
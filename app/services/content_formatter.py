@@ -1,47 +1,69 @@
+from typing import List
+from app.services.retrieved_chunk import RetrievedChunk
 
 
-async def formatted_content(question_type, org_context, law_context) -> str:
-    # Format context based on question type
+def stable_law_order(law_context: List[RetrievedChunk]) -> List[RetrievedChunk]:
+    """Law chunks in a fixed order, so the same set always renders to the same bytes"""
+    return sorted(law_context, key=lambda doc: (doc.title or "", doc.uuid))
+
+
+def format_law_context(question_type: str, law_context: List[RetrievedChunk]) -> str:
     formatted_content = ""
-    
+
+    if question_type == "LAW":
+        if law_context:
+            formatted_content += "AUSTRALIAN LAW CONTEXT:\n"
+            for i, doc in enumerate(law_context, 1):
+                title = doc.title or 'Unknown'
+                data = doc.data
+                formatted_content += f"[Law-{i}] {title}\n{data}\n\n"
+
+    elif question_type == "MIXED":
+        if law_context:
+            formatted_content += "=== AUSTRALIAN LAW CONTEXT ===\n"
+            for i, doc in enumerate(law_context, 1):
+                title = doc.title or 'Unknown'
+                data = doc.data
+                formatted_content += f"[Law-{i}] {title}\n{data}\n\n"
+        else:
+            formatted_content += "=== NO LAW CONTEXT ===\n"
+            formatted_content += "NOTE: No specific legal documents found. Use general legal knowledge.\n\n"
+
+    return formatted_content
+
+
+def format_org_context(question_type: str, org_context: List[RetrievedChunk]) -> str:
+    formatted_content = ""
+
     if question_type == "POLICY":
         if org_context:
             formatted_content += "ORGANIZATION CONTEXT:\n"
             for i, doc in enumerate(org_context, 1):
-                title = doc.properties.get('title', 'Unknown')
-                data = doc.properties.get('data', '')
+                title = doc.title or 'Unknown'
+                data = doc.data
                 formatted_content += f"[Org-{i}] {title}\n{data}\n\n"
         else:
             formatted_content += "NO ORGANIZATION CONTEXT AVAILABLE\n"
             formatted_content += "NOTE: No organizational documents have been uploaded yet. Provide general guidance with a disclaimer.\n\n"
-    
-    elif question_type == "LAW":
-        if law_context:
-            formatted_content += "AUSTRALIAN LAW CONTEXT:\n"
-            for i, doc in enumerate(law_context, 1):
-                title = doc.properties.get('title', 'Unknown')
-                data = doc.properties.get('data', '')
-                formatted_content += f"[Law-{i}] {title}\n{data}\n\n"
-    
+
     elif question_type == "MIXED":
         if org_context:
             formatted_content += "=== ORGANIZATION CONTEXT ===\n"
             for i, doc in enumerate(org_context, 1):
-                title = doc.properties.get('title', 'Unknown')
-                data = doc.properties.get('data', '')
+                title = doc.title or 'Unknown'
+                data = doc.data
                 formatted_content += f"[Org-{i}] {title}\n{data}\n\n"
         else:
             formatted_content += "=== NO ORGANIZATION CONTEXT ===\n"
             formatted_content += "NOTE: No organizational policies uploaded yet for this scenario.\n\n"
-        
-        if law_context:
-            formatted_content += "=== AUSTRALIAN LAW CONTEXT ===\n"
-            for i, doc in enumerate(law_context, 1):
-                title = doc.properties.get('title', 'Unknown')
-                data = doc.properties.get('data', '')
-                formatted_content += f"[Law-{i}] {title}\n{data}\n\n"
-        else:
-            formatted_content += "=== NO LAW CONTEXT ===\n"
-            formatted_content += "NOTE: No specific legal documents found. Use general legal knowledge.\n\n"
-    
+
     return formatted_content
+
+
+async def formatted_content(
+    question_type: str,
+    org_context: List[RetrievedChunk],
+    law_context: List[RetrievedChunk]
+) -> str:
+    # Format context based on question type (org context first, then law)
+    return format_org_context(question_type, org_context) + format_law_context(question_type, law_context)
@@ -0,0 +1,169 @@
+"""
+Two-tier context cache: bounded in-process LRU/TTL in front of Redis.
+
+- Local tier answers repeat lookups without a network round trip.
+- Concurrent misses for the same key are coalesced into a single build
+  (single-flight), so a burst of identical questions runs one Weaviate
+  search + rerank instead of one per request.
+- Entries are refreshed early and probabilistically (XFetch), so hot keys
+  are rebuilt in the background shortly before they expire instead of
+  stampeding when they do.
+"""
+
+import asyncio
+import math
+import random
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from app.services.redis import get_cached_context, set_cached_context
+from app.core.metrics import metrics
+from app.config import CONTEXT_CACHE_CONFIG
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# A builder returns (value, cacheable). Partial results come back with
+# cacheable=False so they are served but never stored.
+Builder = Callable[[], Awaitable[Tuple[Any, bool]]]
+
+
+class _Entry:
+    """
+    `expires_at` is the real (Redis) expiry that early refresh works against;
+    `local_until` is when the local copy is dropped in favour of Redis.
+    """
+    __slots__ = ("value", "expires_at", "delta", "local_until")
+
+    def __init__(self, value: Any, expires_at: float, delta: float, local_until: Optional[float] = None):
+        self.value = value
+        self.expires_at = expires_at
+        self.delta = delta
+        self.local_until = expires_at if local_until is None else local_until
+
+
+class LayeredContextCache:
+    def __init__(self, max_entries: int = 2048, local_ttl: float = 300.0, beta: float = 1.0):
+        self.max_entries = max_entries
+        self.local_ttl = local_ttl
+        self.beta = beta
+        self._local: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._refreshing: set = set()
+
+    # ================= PUBLIC API =================
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = await self._lookup(key)
+        return entry.value if entry else None
+
+    async def set(self, key: str, value: Any, ttl: int, delta: float = 0.0):
+        """Write to both tiers. `delta` is how long the value took to build."""
+        expires_at = time.time() + ttl
+        self._store_local(key, _Entry(value, expires_at, delta))
+        await set_cached_context(
+            key,
+            {"value": value, "expires_at": expires_at, "delta": delta},
+            ttl
+        )
+
+    async def get_or_build(self, key: str, builder: Builder, ttl: int) -> Any:
+        entry = await self._lookup(key)
+        if entry is not None:
+            if self._should_refresh_early(entry):
+                self._schedule_refresh(key, builder, ttl)
+            return entry.value
+
+        metrics.increment("context_cache_misses_total")
+        return await self._single_flight(key, builder, ttl)
+
+    def invalidate_local(self, key: Optional[str] = None):
+        if key is None:
+            self._local.clear()
+        else:
+            self._local.pop(key, None)
+
+    # ================= INTERNALS =================
+
+    async def _lookup(self, key: str) -> Optional[_Entry]:
+        now = time.time()
+
+        entry = self._local.get(key)
+        if entry is not None:
+            if entry.local_until > now:
+                self._local.move_to_end(key)
+                metrics.increment("context_cache_hits_total", tier="local")
+                return entry
+            self._local.pop(key, None)
+
+        cached = await get_cached_context(key)
+        if cached and cached.get("expires_at", 0) > now:
+            entry = _Entry(cached["value"], cached["expires_at"], cached.get("delta", 0.0))
+            self._store_local(key, entry)
+            metrics.increment("context_cache_hits_total", tier="redis")
+            return entry
+        return None
+
+    def _store_local(self, key: str, entry: _Entry):
+        # The local copy never outlives local_ttl, so other workers' writes
+        # to Redis become visible within that window
+        local_entry = _Entry(
+            entry.value,
+            entry.expires_at,
+            entry.delta,
+            local_until=min(entry.expires_at, time.time() + self.local_ttl)
+        )
+        self._local[key] = local_entry
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    def _should_refresh_early(self, entry: _Entry) -> bool:
+        """XFetch: refresh with probability rising as expiry approaches"""
+        if entry.delta <= 0:
+            return False
+        jitter = entry.delta * self.beta * -math.log(max(random.random(), 1e-12))
+        return time.time() + jitter >= entry.expires_at
+
+    def _schedule_refresh(self, key: str, builder: Builder, ttl: int):
+        if key in self._refreshing or key in self._inflight:
+            return
+        self._refreshing.add(key)
+        metrics.increment("context_cache_early_refresh_total")
+
+        async def refresh():
+            try:
+                await self._single_flight(key, builder, ttl)
+            except Exception as e:
+                logger.warning(f"⚠️ Early refresh failed for {key[:30]}...: {e}")
+            finally:
+                self._refreshing.discard(key)
+
+        asyncio.create_task(refresh())
+
+    async def _single_flight(self, key: str, builder: Builder, ttl: int) -> Any:
+        task = self._inflight.get(key)
+        if task is not None:
+            metrics.increment("context_cache_coalesced_total")
+        else:
+            # The build runs in its own task so a caller that disconnects
+            # doesn't cancel the work other waiters are sharing
+            task = asyncio.ensure_future(self._build(key, builder, ttl))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _build(self, key: str, builder: Builder, ttl: int) -> Any:
+        start = time.perf_counter()
+        value, cacheable = await builder()
+        if cacheable:
+            await self.set(key, value, ttl, delta=time.perf_counter() - start)
+        return value
+
+
+context_cache = LayeredContextCache(
+    max_entries=CONTEXT_CACHE_CONFIG["local_max_entries"],
+    local_ttl=CONTEXT_CACHE_CONFIG["local_ttl"],
+    beta=CONTEXT_CACHE_CONFIG["early_refresh_beta"],
+)
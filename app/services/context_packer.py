@@ -0,0 +1,265 @@
+"""
+Token-budgeted packing of the chatbot prompt.
+
+The prompt used to carry every reranked chunk in full (up to ~7000
+characters each) plus ten turns of history, so its size - and with it
+latency and cost - swung from a few hundred to many thousand tokens.
+
+`context_packer.pack` fits a request into `total_tokens` (tiktoken counts):
+
+1. the system prompt and the question are always kept
+2. what's left is split between history, org context and law context by
+   their shares; a section that needs less than its share passes the
+   surplus to the others (POLICY questions carry no law context, LAW
+   questions no org context)
+3. history keeps the most recent turns that fit; whatever it leaves
+   unused is re-split between the context sections
+4. context chunks are kept in rank order; on overflow they are removed
+   from the bottom up - the lowest-ranked chunk is cut down to the
+   sentences that best match the question when that covers the overflow
+   (keeping at least `min_chunk_tokens`), otherwise it is dropped and the
+   next one up is tried
+
+The returned breakdown (tokens per section, trimmed / dropped counts) is
+logged and recorded as metrics for every request.
+"""
+
+import re
+import logging
+from typing import Dict, List
+from app.services.retrieved_chunk import RetrievedChunk
+from app.services.llm_scheduler import count_tokens
+from app.core.metrics import metrics
+from app.config import PROMPT_BUDGET_CONFIG
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?;:])\s+|\n+")
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "the", "and", "for", "are", "what", "how", "does", "with", "that", "this", "our",
+    "can", "who", "when", "which", "about", "from", "have", "has", "should", "must", "you"
+}
+# "[Org-1] Title\n" plus section headers / notes added by content_formatter
+_CHUNK_OVERHEAD_TOKENS = 8
+_SECTION_OVERHEAD_TOKENS = 24
+# Role / framing tokens per chat message
+_MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class PackedPrompt:
+    __slots__ = ("history", "org_context", "law_context", "breakdown")
+
+    def __init__(self, history: List[Dict], org_context: List[RetrievedChunk], law_context: List[RetrievedChunk], breakdown: Dict):
+        self.history = history
+        self.org_context = org_context
+        self.law_context = law_context
+        self.breakdown = breakdown
+
+
+def _terms(text: str) -> set:
+    return {w for w in _WORD.findall(text.lower()) if len(w) > 2 and w not in _STOPWORDS}
+
+
+def _with_data(chunk: RetrievedChunk, data: str) -> RetrievedChunk:
+    values = list(chunk.to_tuple())
+    values[RetrievedChunk.__slots__.index("data")] = data
+    return RetrievedChunk.from_tuple(values)
+
+
+def _allocate(available: int, needs: Dict[str, int], shares: Dict[str, float]) -> Dict[str, int]:
+    """Split `available` by shares; surplus of sections needing less goes to the rest"""
+    budgets = {name: 0 for name in needs}
+    open_sections = {name for name, need in needs.items() if need > 0}
+    remaining = available
+    while open_sections and remaining > 0:
+        total_share = sum(shares[name] for name in open_sections) or 1.0
+        offers = {name: int(remaining * shares[name] / total_share) for name in open_sections}
+        satisfied = {name for name in open_sections if needs[name] - budgets[name] <= offers[name]}
+        if not satisfied:
+            for name in open_sections:
+                budgets[name] += offers[name]
+            break
+        for name in satisfied:
+            remaining -= needs[name] - budgets[name]
+            budgets[name] = needs[name]
+        open_sections -= satisfied
+    return budgets
+
+
+class ContextPacker:
+    def __init__(
+        self,
+        enabled: bool = True,
+        model: str = "gpt-4o-mini",
+        total_tokens: int = 12000,
+        history_share: float = 0.2,
+        org_share: float = 0.45,
+        law_share: float = 0.35,
+        min_chunk_tokens: int = 80
+    ):
+        self.enabled = enabled
+        self.model = model
+        self.total_tokens = total_tokens
+        self.shares = {"history": history_share, "org_context": org_share, "law_context": law_share}
+        self.min_chunk_tokens = min_chunk_tokens
+
+    def count(self, text: str) -> int:
+        return count_tokens(text, self.model)
+
+    def pack(
+        self,
+        question: str,
+        question_type: str,
+        system_prompt: str,
+        history: List[Dict],
+        org_context: List[RetrievedChunk],
+        law_context: List[RetrievedChunk]
+    ) -> PackedPrompt:
+        # content_formatter only renders the context that matches the question type
+        if question_type == "POLICY":
+            law_context = []
+        elif question_type == "LAW":
+            org_context = []
+
+        fixed = {
+            "system": self.count(system_prompt) + _MESSAGE_OVERHEAD_TOKENS,
+            "question": self.count(question) + _MESSAGE_OVERHEAD_TOKENS + _SECTION_OVERHEAD_TOKENS,
+        }
+        history_tokens = [self.count(m["content"]) + _MESSAGE_OVERHEAD_TOKENS for m in history]
+        org_tokens = [self._chunk_tokens(c) for c in org_context]
+        law_tokens = [self._chunk_tokens(c) for c in law_context]
+
+        needs = {"history": sum(history_tokens), "org_context": sum(org_tokens), "law_context": sum(law_tokens)}
+        available = max(self.total_tokens - sum(fixed.values()), 0)
+        budgets = _allocate(available, needs, self.shares) if self.enabled else dict(needs)
+
+        packed_history, dropped_turns, history_used = self._pack_history(history, history_tokens, budgets["history"])
+        if self.enabled and history_used < budgets["history"]:
+            # Whole turns rarely fill the history share exactly; give the rest to the context
+            needs["history"] = 0
+            budgets.update(_allocate(available - history_used, needs, self.shares))
+        packed_org, org_stats = self._pack_chunks(question, org_context, org_tokens, budgets["org_context"])
+        packed_law, law_stats = self._pack_chunks(question, law_context, law_tokens, budgets["law_context"])
+
+        breakdown = {
+            "system": fixed["system"],
+            "history": history_used,
+            "org_context": org_stats["tokens"],
+            "law_context": law_stats["tokens"],
+            "question": fixed["question"],
+        }
+        breakdown["total"] = sum(breakdown.values())
+        breakdown.update(
+            budget=self.total_tokens,
+            unpacked_total=sum(fixed.values()) + sum(history_tokens) + sum(org_tokens) + sum(law_tokens),
+            dropped_turns=dropped_turns,
+            trimmed_chunks=org_stats["trimmed"] + law_stats["trimmed"],
+            dropped_chunks=org_stats["dropped"] + law_stats["dropped"],
+        )
+        self._report(question_type, breakdown)
+        return PackedPrompt(packed_history, packed_org, packed_law, breakdown)
+
+    # ================= INTERNALS =================
+
+    def _chunk_tokens(self, chunk: RetrievedChunk) -> int:
+        return self.count(chunk.data) + self.count(chunk.title or "Unknown") + _CHUNK_OVERHEAD_TOKENS
+
+    def _pack_history(self, history: List[Dict], tokens: List[int], budget: int):
+        """Most recent user/assistant pairs that fit"""
+        kept_from = len(history)
+        used = 0
+        # Walk back one exchange (2 messages) at a time so pairs stay together
+        while kept_from > 0:
+            start = max(kept_from - 2, 0)
+            cost = sum(tokens[start:kept_from])
+            if used + cost > budget:
+                break
+            used += cost
+            kept_from = start
+        return history[kept_from:], (kept_from + 1) // 2, used
+
+    def _pack_chunks(self, question: str, chunks: List[RetrievedChunk], tokens: List[int], budget: int):
+        stats = {"tokens": 0, "trimmed": 0, "dropped": 0}
+        if not chunks:
+            return [], stats
+
+        sizes = list(tokens)
+        texts = [c.data for c in chunks]
+        overflow = sum(sizes) - budget
+        query_terms = _terms(question)
+
+        # Work up from the lowest-ranked chunk: cut it down to its best-matching
+        # sentences if that covers the overflow, otherwise drop it and move up.
+        # Higher-ranked chunks are only touched once everything below is gone
+        # (the top-ranked chunk is always kept, trimmed if need be).
+        keep = len(chunks)
+        for i in range(len(chunks) - 1, -1, -1):
+            if overflow <= 0:
+                break
+            header = sizes[i] - self.count(texts[i])
+            target = sizes[i] - header - overflow
+            if target >= self.min_chunk_tokens or i == 0:
+                texts[i] = self._extract(texts[i], query_terms, max(target, self.min_chunk_tokens))
+                new_size = self.count(texts[i]) + header
+                overflow -= sizes[i] - new_size
+                sizes[i] = new_size
+                stats["trimmed"] += 1
+                break
+            keep = i
+            overflow -= sizes[i]
+            stats["dropped"] += 1
+
+        packed = [
+            chunk if text == chunk.data else _with_data(chunk, text)
+            for chunk, text in zip(chunks[:keep], texts[:keep])
+        ]
+        stats["tokens"] = sum(sizes[:keep])
+        return packed, stats
+
+    def _extract(self, text: str, query_terms: set, budget: int) -> str:
+        """Sentences that best match the question, in document order, within `budget` tokens"""
+        sentences = [s.strip() for s in _SENTENCE_SPLIT.split(text) if s and s.strip()]
+        if not sentences:
+            return ""
+        ranked = sorted(
+            range(len(sentences)),
+            key=lambda i: (len(query_terms & _terms(sentences[i])), -i),
+            reverse=True
+        )
+        chosen, used = [], 0
+        for i in ranked:
+            cost = self.count(sentences[i]) + 1
+            if used + cost > budget:
+                continue
+            chosen.append(i)
+            used += cost
+        if not chosen:
+            # First sentence alone is too long: hard-cut it by characters
+            return sentences[ranked[0]][:budget * 4]
+        return " ".join(sentences[i] for i in sorted(chosen))
+
+    def _report(self, question_type: str, breakdown: Dict):
+        for section in ("system", "history", "org_context", "law_context", "question", "total"):
+            metrics.observe("prompt_tokens", breakdown[section], section=section)
+        metrics.increment("prompt_chunks_trimmed_total", breakdown["trimmed_chunks"])
+        metrics.increment("prompt_chunks_dropped_total", breakdown["dropped_chunks"])
+        logger.info(
+            f"📦 Prompt [{question_type}]: {breakdown['total']}/{breakdown['budget']} tokens "
+            f"(was {breakdown['unpacked_total']}) | system {breakdown['system']}, history {breakdown['history']}, "
+            f"org {breakdown['org_context']}, law {breakdown['law_context']}, question {breakdown['question']} | "
+            f"trimmed {breakdown['trimmed_chunks']}, dropped {breakdown['dropped_chunks']} chunk(s), "
+            f"{breakdown['dropped_turns']} turn(s)"
+        )
+
+
+context_packer = ContextPacker(
+    enabled=PROMPT_BUDGET_CONFIG["enabled"],
+    model=PROMPT_BUDGET_CONFIG["model"],
+    total_tokens=PROMPT_BUDGET_CONFIG["total_tokens"],
+    history_share=PROMPT_BUDGET_CONFIG["history_share"],
+    org_share=PROMPT_BUDGET_CONFIG["org_share"],
+    law_share=PROMPT_BUDGET_CONFIG["law_share"],
+    min_chunk_tokens=PROMPT_BUDGET_CONFIG["min_chunk_tokens"],
+)
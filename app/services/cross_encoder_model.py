@@ -1,63 +1,378 @@
 from sentence_transformers import CrossEncoder
+from app.core.model_registry import model_registry
+from app.config import RERANKER_CONFIG
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+import threading
+import inspect
+import shutil
+import fcntl
+import json
 import os
 
+
+def make_pairs(query: str, documents: list) -> list:
+    """
+    (query, text, cache_key) pairs for RetrievedChunk documents.
+    The text is truncated by the tokenizer, not by characters; cache_key
+    lets the document's token ids be reused (chunk text never changes).
+    """
+    return [(query, f"{doc.title}. {doc.data}", (doc.uuid, doc.version)) for doc in documents]
+
+
+def apply_scores(documents: list, scores, top_k: int) -> list:
+    """Set `rerank_score` on each chunk and return the top_k by score"""
+    for doc, score in zip(documents, scores):
+        doc.rerank_score = float(score)
+    
+    # Sort by score (descending) and return top_k
+    reranked = sorted(documents, key=lambda d: d.rerank_score, reverse=True)[:top_k]
+    
+    print(f"✅ Reranked {len(documents)} → {len(reranked)} documents")
+    for i, doc in enumerate(reranked):
+        print(f"   {i+1}. {doc.title or 'Untitled'} (score: {doc.rerank_score:.4f})")
+    
+    return reranked
+
+
+def _activation_name(cross_encoder) -> str:
+    """Score activation CrossEncoder.predict applies ("sigmoid" or "identity")"""
+    activation_fn = getattr(cross_encoder, "activation_fn", None) or getattr(cross_encoder, "activation_fct", None)
+    return "sigmoid" if type(activation_fn).__name__ == "Sigmoid" else "identity"
+
+
+class _TokenCache:
+    """Thread-safe LRU of token id lists"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._items: "OrderedDict[object, List[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_encode(self, key, encode: Callable[[], List[int]]) -> List[int]:
+        with self._lock:
+            ids = self._items.get(key)
+            if ids is not None:
+                self._items.move_to_end(key)
+                return ids
+        ids = encode()
+        with self._lock:
+            self._items[key] = ids
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+        return ids
+
+
 # ============ GLOBAL RERANKER MODEL ============
 class LocalReranker:
     """Local cross-encoder reranker using sentence-transformers"""
     
     def __init__(self, model_name='cross-encoder/ms-marco-MiniLM-L-6-v2'):
-        local_path = "./models/reranker"
+        local_path = RERANKER_CONFIG["local_path"]
         if os.path.exists(local_path):
             print(f"📦 Found local reranker at {local_path}")
-            self.model = CrossEncoder(local_path, trust_remote_code=True)
+            # safetensors weights are memory-mapped instead of unpickled;
+            # older local copies saved as pytorch_model.bin still load
+            use_safetensors = os.path.exists(os.path.join(local_path, "model.safetensors"))
+            self.model = CrossEncoder(
+                local_path,
+                trust_remote_code=True,
+                model_kwargs={"use_safetensors": use_safetensors}
+            )
+            if not use_safetensors:
+                self.model.save(local_path, safe_serialization=True)
+                print("💾 Local reranker re-saved as safetensors.")
         else:
             print(f"🌐 Downloading model from Hugging Face: {model_name}")
-            self.model = CrossEncoder(model_name, trust_remote_code=True)
-            self.model.save(local_path)
+            self.model = CrossEncoder(
+                model_name,
+                trust_remote_code=True,
+                model_kwargs={"use_safetensors": True}
+            )
+            self.model.save(local_path, safe_serialization=True)
             print("💾 Model saved locally for future runs.")
-    
+
+        tokenizer = self.model.tokenizer
+        self._init_tokenization(
+            tokenizer,
+            self.model.max_length or tokenizer.model_max_length,
+            _activation_name(self.model)
+        )
+        forward_params = inspect.signature(self.model.model.forward).parameters
+        self.input_names = {n for n in ("input_ids", "attention_mask", "token_type_ids") if n in forward_params}
+
+    # ================= TOKENIZATION =================
+
+    def _init_tokenization(self, tokenizer, max_length: int, activation: str):
+        self.tokenizer = tokenizer
+        self.max_length = min(int(max_length), 512)
+        self.activation = activation
+        self.special_tokens = tokenizer.num_special_tokens_to_add(pair=True)
+        self.pad_token_id = tokenizer.pad_token_id or 0
+        self.doc_tokens = _TokenCache(RERANKER_CONFIG["doc_token_cache_size"])
+        self.query_tokens = _TokenCache(1024)
+
+    def _encode(self, text: str, limit: int) -> List[int]:
+        return self.tokenizer(text, add_special_tokens=False, truncation=True, max_length=limit)["input_ids"]
+
+    def encode_pair(self, pair) -> Tuple[List[int], List[int]]:
+        """
+        (input_ids, token_type_ids) for a (query, text[, cache_key]) pair.
+        The query is capped at max_query_tokens; the document fills the rest
+        of the model's max sequence length.
+        """
+        query, text = pair[0], pair[1]
+        cache_key = pair[2] if len(pair) > 2 else None
+        budget = self.max_length - self.special_tokens
+
+        q_ids = self.query_tokens.get_or_encode(
+            query, lambda: self._encode(query, RERANKER_CONFIG["max_query_tokens"])
+        )
+        if cache_key is not None:
+            d_ids = self.doc_tokens.get_or_encode(cache_key, lambda: self._encode(text, budget))
+        else:
+            d_ids = self._encode(text, budget)
+        d_ids = d_ids[:budget - len(q_ids)]
+
+        return (
+            self.tokenizer.build_inputs_with_special_tokens(q_ids, d_ids),
+            self.tokenizer.create_token_type_ids_from_sequences(q_ids, d_ids)
+        )
+
+    def _buckets(self, lengths: List[int]):
+        """
+        Index groups of similar length: sorted shortest-first, each capped at
+        bucket_size rows and max_batch_tokens padded tokens
+        """
+        bucket_size = RERANKER_CONFIG["bucket_size"]
+        max_tokens = RERANKER_CONFIG["max_batch_tokens"]
+        bucket = []
+        for i in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+            # Sorted ascending, so lengths[i] is the padded length if i joins
+            if bucket and (len(bucket) >= bucket_size or (len(bucket) + 1) * lengths[i] > max_tokens):
+                yield bucket
+                bucket = []
+            bucket.append(i)
+        if bucket:
+            yield bucket
+
+    # ================= INFERENCE =================
+
+    def _forward(self, feed: dict) -> np.ndarray:
+        """Raw logits for one padded batch"""
+        import torch
+
+        hf_model = self.model.model
+        with torch.inference_mode():
+            output = hf_model(**{
+                name: torch.from_numpy(value).to(hf_model.device)
+                for name, value in feed.items() if name in self.input_names
+            })
+        return output.logits[:, 0].float().cpu().numpy()
+
+    def score_pairs(self, pairs: list) -> np.ndarray:
+        """Relevance score for each (query, text[, cache_key]) pair"""
+        encoded = [self.encode_pair(pair) for pair in pairs]
+        scores = np.empty(len(encoded), dtype=np.float32)
+
+        for idx in self._buckets([len(ids) for ids, _ in encoded]):
+            width = max(len(encoded[i][0]) for i in idx)
+            input_ids = np.full((len(idx), width), self.pad_token_id, dtype=np.int64)
+            token_type_ids = np.zeros((len(idx), width), dtype=np.int64)
+            attention_mask = np.zeros((len(idx), width), dtype=np.int64)
+            for row, i in enumerate(idx):
+                ids, types = encoded[i]
+                input_ids[row, :len(ids)] = ids
+                token_type_ids[row, :len(types)] = types
+                attention_mask[row, :len(ids)] = 1
+
+            scores[idx] = self._forward({
+                "input_ids": input_ids,
+                "attention_mask": attention_mask,
+                "token_type_ids": token_type_ids
+            })
+
+        if self.activation == "sigmoid":
+            scores = 1.0 / (1.0 + np.exp(-scores))
+        return scores.astype(np.float32)
+
     def rerank(self, query: str, documents: list, top_k: int = 5):
         """
-        Rerank documents using cross-encoder
-        Returns top_k most relevant documents with scores
+        Rerank RetrievedChunk documents using cross-encoder
+        Returns top_k most relevant chunks with `rerank_score` set
         """
         if not documents:
             return []
         
         try:
-            # Prepare query-document pairs
-            pairs = []
-            for doc in documents:
-                title = doc.properties.get('title', '')
-                content = doc.properties.get('content', '')
-                summary = doc.properties.get('summary', '')
-                # Combine fields (limit length for performance)
-                text = f"{title}. {summary} {content}"[:1000]
-                pairs.append([query, text])
-            
-            # Score all pairs
-            scores = self.model.predict(pairs)
-            
-            # Combine documents with scores
-            doc_scores = list(zip(documents, scores))
-            
-            # Sort by score (descending)
-            doc_scores.sort(key=lambda x: x[1], reverse=True)
-            
-            # Return top_k
-            reranked = doc_scores[:top_k]
-            
-            print(f"✅ Reranked {len(documents)} → {len(reranked)} documents")
-            for i, (doc, score) in enumerate(reranked):
-                title = doc.properties.get('title', 'Untitled')
-                print(f"   {i+1}. {title} (score: {score:.4f})")
-            
-            return [
-                {'document': doc, 'relevance_score': float(score)}
-                for doc, score in reranked
-            ]
+            scores = self.score_pairs(make_pairs(query, documents))
+            return apply_scores(documents, scores, top_k)
             
         except Exception as e:
             print(f"⚠️ Reranking failed: {e}")
             # Fallback: return original documents
-            return [{'document': doc, 'relevance_score': None} for doc in documents[:top_k]]
\ No newline at end of file
+            return documents[:top_k]
+
+
+# ============ ONNX RUNTIME BACKEND ============
+class OnnxReranker(LocalReranker):
+    """
+    Same cross-encoder exported to ONNX and run with ONNX Runtime.
+    The export (and optional dynamic int8 quantization) happens once and is
+    stored next to the PyTorch copy; later loads need no torch weights.
+    Workers starting together take a file lock, so only one of them exports;
+    the export is built in a temporary directory and moved into place, and is
+    redone when `reranker.json` names another model or quantize setting.
+    """
+
+    def __init__(
+        self,
+        model_name='cross-encoder/ms-marco-MiniLM-L-6-v2',
+        quantize: bool = True,
+        intra_op_threads: int = 0
+    ):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        export_path = os.path.abspath(RERANKER_CONFIG["onnx_path"])
+        model_file = os.path.join(export_path, "model_int8.onnx" if quantize else "model.onnx")
+        meta = self._read_export(export_path, model_name, quantize)
+        if meta is None:
+            meta = self._ensure_export(model_name, export_path, quantize)
+
+        self._init_tokenization(
+            AutoTokenizer.from_pretrained(export_path),
+            meta["max_length"],
+            meta["activation"]
+        )
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads or os.cpu_count() or 1
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            model_file,
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        print(f"⚡ ONNX reranker ready ({os.path.basename(model_file)}, {options.intra_op_num_threads} threads)")
+
+    @staticmethod
+    def _read_export(export_path: str, model_name: str, quantize: bool) -> Optional[dict]:
+        """Metadata of a complete export of `model_name` with this quantize setting, else None"""
+        try:
+            with open(os.path.join(export_path, "reranker.json")) as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if meta.get("model_name") != model_name or meta.get("quantize") != quantize:
+            print(
+                f"⚠️ ONNX export at {export_path} is for {meta.get('model_name')} "
+                f"(quantize={meta.get('quantize')}), need {model_name} (quantize={quantize})"
+            )
+            return None
+        model_file = os.path.join(export_path, "model_int8.onnx" if quantize else "model.onnx")
+        return meta if os.path.exists(model_file) else None
+
+    @classmethod
+    def _ensure_export(cls, model_name: str, export_path: str, quantize: bool) -> dict:
+        """Export under an inter-process lock into a temp dir, then swap it into place"""
+        parent = os.path.dirname(export_path)
+        os.makedirs(parent, exist_ok=True)
+        with open(f"{export_path}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # Another worker may have finished the export while we waited
+                meta = cls._read_export(export_path, model_name, quantize)
+                if meta is not None:
+                    return meta
+
+                tmp_path = f"{export_path}.tmp-{os.getpid()}"
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                cls._export(model_name, tmp_path, quantize)
+
+                # A directory can't be replaced while non-empty: move the old one aside first
+                old_path = f"{export_path}.old-{os.getpid()}"
+                if os.path.exists(export_path):
+                    os.replace(export_path, old_path)
+                os.replace(tmp_path, export_path)
+                shutil.rmtree(old_path, ignore_errors=True)
+                print("💾 ONNX reranker exported.")
+                return cls._read_export(export_path, model_name, quantize)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _export(model_name: str, export_path: str, quantize: bool):
+        """Export the PyTorch cross-encoder to ONNX (+ int8) into `export_path`"""
+        import torch
+
+        print(f"🛠️ Exporting reranker to ONNX ({model_name}, quantize={quantize})")
+        os.makedirs(export_path, exist_ok=True)
+        cross_encoder = LocalReranker(model_name).model
+        hf_model = cross_encoder.model.eval()
+        tokenizer = cross_encoder.tokenizer
+
+        # Keep the score activation so ONNX scores match CrossEncoder.predict
+        activation = _activation_name(cross_encoder)
+        max_length = cross_encoder.max_length or tokenizer.model_max_length
+
+        sample = tokenizer([["query", "document text"]], padding=True, truncation=True, return_tensors="pt")
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["logits"] = {0: "batch"}
+
+        fp32_file = os.path.join(export_path, "model.onnx")
+        with torch.no_grad():
+            torch.onnx.export(
+                hf_model,
+                tuple(sample[name] for name in input_names),
+                fp32_file,
+                input_names=input_names,
+                output_names=["logits"],
+                dynamic_axes=dynamic_axes,
+                opset_version=17
+            )
+
+        if quantize:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            quantize_dynamic(fp32_file, os.path.join(export_path, "model_int8.onnx"), weight_type=QuantType.QInt8)
+
+        tokenizer.save_pretrained(export_path)
+        # Written last: its presence marks the export as complete
+        with open(os.path.join(export_path, "reranker.json"), "w") as f:
+            json.dump({
+                "activation": activation,
+                "max_length": max_length,
+                "model_name": model_name,
+                "quantize": quantize
+            }, f)
+
+    def _forward(self, feed: dict) -> np.ndarray:
+        feed = {name: value for name, value in feed.items() if name in self.input_names}
+        return self.session.run(["logits"], feed)[0][:, 0]
+
+
+def create_reranker() -> LocalReranker:
+    """Build the configured backend; falls back to PyTorch if ONNX can't load"""
+    if RERANKER_CONFIG["backend"] == "onnx":
+        try:
+            return OnnxReranker(
+                RERANKER_CONFIG["model_name"],
+                quantize=RERANKER_CONFIG["onnx_quantize"],
+                intra_op_threads=RERANKER_CONFIG["intra_op_threads"]
+            )
+        except Exception as e:
+            print(f"⚠️ ONNX reranker unavailable, using PyTorch: {e}")
+    return LocalReranker(RERANKER_CONFIG["model_name"])
+
+
+# One shared, lazily-loaded instance per process
+model_registry.register("reranker", create_reranker)
+
+
+def get_reranker() -> LocalReranker:
+    return model_registry.get("reranker")
@@ -1,10 +1,10 @@
-from app.config import OPENAI_API_KEY
-from openai import OpenAI
+from app.config import EMBEDDING_CONFIG
+from app.core.metrics import metrics
+from app.services.llm_gateway import llm_gateway
+from collections import OrderedDict
 import asyncio
 import numpy as np
 
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
-
 async def embed_text_openai(text: str) -> list:
     """
     Generate an embedding vector for the given text using OpenAI's embedding API.
@@ -21,14 +21,43 @@ async def embed_text_openai(text: str) -> list:
         return chunks
 
     chunks = split_text(text, max_tokens=2000)
-    loop = asyncio.get_event_loop()
-    def sync_embed_batch(texts):
-        responses = openai_client.embeddings.create(
-            model="text-embedding-3-small",
-            input=texts
-        )
-        return [item.embedding for item in responses.data]
-    embeddings = await loop.run_in_executor(None, sync_embed_batch, chunks)
+    responses = await llm_gateway.create_embedding(
+        priority="ingestion",
+        model="text-embedding-3-small",
+        input=chunks
+    )
+    embeddings = [item.embedding for item in responses.data]
     embedding_matrix = np.array(embeddings)
     avg_embedding = np.mean(embedding_matrix, axis=0)
     return avg_embedding.tolist()
+
+
+# LRU of recent query embeddings (question text -> vector)
+_query_embedding_cache: "OrderedDict[str, list]" = OrderedDict()
+
+
+async def embed_query(text: str) -> list:
+    """
+    Embed a short query (a chatbot question) in a single request.
+    Recent queries are served from an in-process LRU cache.
+    Returns a list of floats (embedding vector).
+    """
+    key = text.strip()
+    cached = _query_embedding_cache.get(key)
+    if cached is not None:
+        _query_embedding_cache.move_to_end(key)
+        metrics.increment("query_embedding_cache_hits_total")
+        return cached
+
+    metrics.increment("query_embedding_cache_misses_total")
+    response = await llm_gateway.create_embedding(
+        priority="chat",
+        model=EMBEDDING_CONFIG["model"],
+        input=key
+    )
+    embedding = response.data[0].embedding
+
+    _query_embedding_cache[key] = embedding
+    while len(_query_embedding_cache) > EMBEDDING_CONFIG["query_cache_size"]:
+        _query_embedding_cache.popitem(last=False)
+    return embedding
@@ -1,6 +1,8 @@
 import pdfplumber
 import os
+from io import BytesIO
 from fastapi import UploadFile
+from app.core.executors import run_in_pool
 import re
 
 def clean_ocr_noise(text):
@@ -23,19 +25,29 @@ def clean_ocr_noise(text):
     return text
 
 
-async def extract_content_from_pdf(file_path: str):
+def extract_pdf_text(source) -> str:
+    """
+    Extract and clean text from a PDF path or file-like object.
+    Sync and picklable so it can run on the "cpu" process pool.
+    """
+    if isinstance(source, bytes):
+        source = BytesIO(source)
     text = ""
+    with pdfplumber.open(source) as pdf:
+        for page in pdf.pages:
+            page_text = page.extract_text()
+            if page_text:
+                text += page_text + "\n"
+    return clean_ocr_noise(text)
+
+
+async def extract_content_from_pdf(file_path: str):
     title = os.path.basename(file_path)
     print(f"Summarizing the {title}...........")
 
     try:
-        # Open PDF with pdfplumber
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-        clean_text = clean_ocr_noise(text)
+        # Open PDF with pdfplumber (off the event loop, in a worker process)
+        clean_text = await run_in_pool("cpu", extract_pdf_text, file_path)
         return clean_text, title
 
     except Exception as e:
@@ -47,22 +59,14 @@ async def extract_content_from_uploadpdf(file: UploadFile):
     Extract text content from an uploaded PDF file.
     Works directly with FastAPI's UploadFile.
     """
-    text = ""
     title = file.filename
 
     try:
         # Read file bytes
         file_bytes = await file.read()
 
-        # Use pdfplumber to read from memory
-        from io import BytesIO
-        with pdfplumber.open(BytesIO(file_bytes)) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-
-        clean_text = clean_ocr_noise(text)
+        # Use pdfplumber to read from memory (in a worker process)
+        clean_text = await run_in_pool("cpu", extract_pdf_text, file_bytes)
         return clean_text, title
 
     except Exception as e:
@@ -0,0 +1,182 @@
+"""
+Server-side "latest version" index for organization collections.
+
+Every chunk carries an indexed `is_latest` BOOL. All chunks of the highest
+`version_number` of a document are flagged True, so retrieval is one
+filtered vector query (`is_latest == True`) instead of fetching every
+object and picking versions in Python.
+
+- ingestion and deletion call `refresh_latest_flags` for the touched document
+- `backfill_latest_flags` migrates an existing collection; retrieval calls
+  `ensure_latest_index` first, which backfills a collection lacking the
+  property once, on first use (e.g. one restored from an old backup)
+- `keep_latest_versions` is the in-Python fallback for an unfiltered search
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, List
+from weaviate.classes.config import Property, DataType
+from weaviate.classes.query import Filter
+from app.services import weaviate_store
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LATEST_PROPERTY = "is_latest"
+PAGE_SIZE = 500
+UPDATE_CONCURRENCY = 16
+
+latest_filter = Filter.by_property(LATEST_PROPERTY).equal(True)
+
+# Collections this worker has confirmed (or made) searchable with latest_filter
+_ready_collections: set = set()
+_preparing: Dict[str, asyncio.Task] = {}
+
+
+async def _fetch_all(collection_name: str, filters=None) -> List:
+    """
+    Page through matching objects (version bookkeeping properties only).
+    Unfiltered scans use the uuid cursor, which isn't capped by the
+    server's maximum offset; filtered ones (a single document) use offsets.
+    """
+    objects = []
+    page = {"offset": 0} if filters is not None else {}
+    while True:
+        response = await weaviate_store.fetch_objects(
+            collection_name,
+            filters=filters,
+            limit=PAGE_SIZE,
+            return_properties=["document_id", "title", "version_number", LATEST_PROPERTY],
+            **page
+        )
+        objects.extend(response.objects)
+        if len(response.objects) < PAGE_SIZE:
+            return objects
+        if filters is not None:
+            page["offset"] += PAGE_SIZE
+        else:
+            page["after"] = response.objects[-1].uuid
+
+
+def _version_of(obj) -> int:
+    try:
+        return int(obj.properties.get("version_number") or 0)
+    except (ValueError, TypeError):
+        return 0
+
+
+def _group_by_document(objects: List):
+    """Chunks grouped per document and the highest version seen for each"""
+    groups = defaultdict(list)
+    for obj in objects:
+        key = obj.properties.get("document_id") or obj.properties.get("title") or ""
+        groups[key].append(obj)
+    latest_version = {key: max(_version_of(o) for o in objs) for key, objs in groups.items()}
+    return groups, latest_version
+
+
+def keep_latest_versions(objects: List) -> List:
+    """Objects of the highest version per document among `objects`, in their original order"""
+    groups, latest_version = _group_by_document(objects)
+    return [
+        obj for obj in objects
+        if _version_of(obj) == latest_version[obj.properties.get("document_id") or obj.properties.get("title") or ""]
+    ]
+
+
+async def _apply_flags(collection_name: str, objects: List) -> int:
+    """Flag the highest version of each group of chunks; returns updates made"""
+    groups, latest_version = _group_by_document(objects)
+
+    semaphore = asyncio.Semaphore(UPDATE_CONCURRENCY)
+
+    async def set_flag(obj, value: bool):
+        async with semaphore:
+            await weaviate_store.update(collection_name, obj.uuid, {LATEST_PROPERTY: value})
+
+    updates = []
+    for key, objs in groups.items():
+        for obj in objs:
+            is_latest = _version_of(obj) == latest_version[key]
+            if obj.properties.get(LATEST_PROPERTY) is not is_latest:
+                updates.append(set_flag(obj, is_latest))
+
+    await asyncio.gather(*updates)
+    return len(updates)
+
+
+async def refresh_latest_flags(collection_name: str, document_id: str) -> int:
+    """Recompute `is_latest` for every chunk of one document"""
+    objects = await _fetch_all(
+        collection_name,
+        filters=Filter.by_property("document_id").equal(str(document_id))
+    )
+    updated = await _apply_flags(collection_name, objects)
+    if updated:
+        logger.info(f"🏷️ {collection_name}/{document_id}: updated is_latest on {updated} chunk(s)")
+    return updated
+
+
+async def ensure_latest_property(collection_name: str) -> bool:
+    """Add the `is_latest` property to an existing collection. Returns True if added."""
+    config = await weaviate_store.get_collection_config(collection_name)
+    if any(prop.name == LATEST_PROPERTY for prop in config.properties):
+        return False
+    await weaviate_store.add_property(
+        collection_name,
+        Property(name=LATEST_PROPERTY, data_type=DataType.BOOL, index_filterable=True)
+    )
+    logger.info(f"➕ Added {LATEST_PROPERTY} property to {collection_name}")
+    return True
+
+
+async def backfill_latest_flags(collection_name: str) -> Dict:
+    """Migration: add the property if needed and flag every document's latest version"""
+    added = await ensure_latest_property(collection_name)
+    objects = await _fetch_all(collection_name)
+    updated = await _apply_flags(collection_name, objects)
+    logger.info(f"✅ Backfilled {collection_name}: {updated}/{len(objects)} chunk(s) updated")
+    return {
+        "status": "success",
+        "collection": collection_name,
+        "property_added": added,
+        "objects_scanned": len(objects),
+        "objects_updated": updated
+    }
+
+
+async def _prepare(collection_name: str) -> bool:
+    config = await weaviate_store.get_collection_config(collection_name)
+    if not any(prop.name == LATEST_PROPERTY for prop in config.properties):
+        logger.warning(f"⚠️ {collection_name} has no {LATEST_PROPERTY} property - backfilling before first search")
+        await backfill_latest_flags(collection_name)
+    _ready_collections.add(collection_name)
+    return True
+
+
+async def ensure_latest_index(collection_name: str) -> bool:
+    """
+    Whether `collection_name` can be searched with `latest_filter`. The first
+    call per worker checks the schema and backfills the collection if the
+    property is missing; concurrent callers share that one check. Returns
+    False if it fails, so the caller can fall back to an unfiltered search.
+    """
+    if collection_name in _ready_collections:
+        return True
+    task = _preparing.get(collection_name)
+    if task is None:
+        task = asyncio.ensure_future(_prepare(collection_name))
+        _preparing[collection_name] = task
+        task.add_done_callback(lambda _: _preparing.pop(collection_name, None))
+    try:
+        return await asyncio.shield(task)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not prepare {LATEST_PROPERTY} index for {collection_name}: {e}")
+        return False
+
+
+def mark_not_ready(collection_name: str):
+    """Re-check the collection on next use (e.g. after a filtered query failed)"""
+    _ready_collections.discard(collection_name)
@@ -1,17 +1,12 @@
-from app.services.weaviate_client import get_weaviate_client
+from app.services import weaviate_store
 from weaviate.classes.query import Filter
 from app.config import GLOBAL_ORG
+from app.services.rerank_score_cache import rerank_score_cache
 
 
 
 async def delete_weaviate_law(version: str, filename: str):
-    client = get_weaviate_client()
     try:
-        if not client.is_connected():
-            client.connect()
-
-        collection = client.collections.use(GLOBAL_ORG)
-
         # Build combined filter
         metadata_filter = (
             Filter.by_property("title").equal(filename) &
@@ -21,12 +16,17 @@ async def delete_weaviate_law(version: str, filename: str):
         print("meta filter-----------", metadata_filter)
 
         # Perform deletion and capture result
-        delete_result = collection.data.delete_many(where=metadata_filter)
+        delete_result = await weaviate_store.delete_many(GLOBAL_ORG, metadata_filter, verbose=True)
         print("delete_result-----------", delete_result)
 
         # Depending on SDK, result may look like {'matches': x, 'limit': y, 'objects_deleted': z}
         deleted_count = getattr(delete_result, "objects_deleted", None) or getattr(delete_result, "matches", 0)
 
+        # Deleted chunks must not be served cached rerank scores
+        await rerank_score_cache.invalidate(
+            obj.uuid for obj in (getattr(delete_result, "objects", None) or [])
+        )
+
         if deleted_count > 0:
             return {
                 "status": "success",
@@ -42,6 +42,3 @@ async def delete_weaviate_law(version: str, filename: str):
         print(f"Error during deletion: {e}")
         return {"status": "error", "message": str(e)}
     
-    finally:
-        if client.is_connected():
-            client.close()
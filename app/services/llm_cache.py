@@ -0,0 +1,192 @@
+"""
+Content-addressed cache for deterministic LLM calls.
+
+Classification, document summaries and alignment summaries are re-run on
+identical input whenever a document is re-uploaded, re-summarized or
+re-aligned. Call sites opt in with `llm_gateway.chat_completion(cache=True)`;
+the response is stored under sha256(model, messages, parameters) and a hit
+skips the scheduler and the API entirely. Cached responses report zero
+token usage, so nothing is billed to the user for them.
+
+Backends:
+- "disk":  one zlib-compressed JSON file per key under `disk_path`, with a
+           total size limit (least recently used files are evicted first)
+- "redis": `{name}:{key}` (`llm:{key}` for llm_cache) with a TTL, shared
+           between workers
+
+Other LLM-derived results (e.g. chunk summaries in summarize_pdf) use
+their own named instance of the same cache.
+"""
+
+import os
+import json
+import time
+import zlib
+import hashlib
+import logging
+from typing import Dict, Optional
+from app.services.redis import get_redis_client
+from app.core.metrics import metrics
+from app.core.executors import run_in_pool
+from app.config import LLM_CACHE_CONFIG
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bump to invalidate every stored entry (e.g. after changing the payload format)
+_KEY_VERSION = "v1"
+# Request options that don't change the response
+_IGNORED_PARAMS = {"timeout", "stream_options", "extra_headers"}
+
+
+def cache_key(params: Dict) -> str:
+    material = {k: v for k, v in params.items() if k not in _IGNORED_PARAMS}
+    blob = json.dumps(material, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(f"{_KEY_VERSION}|{blob}".encode()).hexdigest()
+
+
+class DiskBackend:
+    """Blocking file store; run its methods on the io pool"""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes
+        self._total_bytes: Optional[int] = None
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], f"{key}.json.z")
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._file(key)
+        try:
+            with open(path, "rb") as f:
+                blob = f.read()
+        except FileNotFoundError:
+            return None
+        expires_at = float(blob[:20].decode())
+        if expires_at < time.time():
+            self._remove(path)
+            return None
+        # Touch so eviction keeps recently used entries
+        os.utime(path)
+        return blob[20:]
+
+    def set(self, key: str, payload: bytes, ttl: int):
+        path = self._file(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        blob = f"{time.time() + ttl:<20.3f}".encode() + payload
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, path)
+
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, _, size in self._scan())
+        else:
+            self._total_bytes += len(blob)
+        if self._total_bytes > self.max_bytes:
+            self._evict()
+
+    def _scan(self):
+        for root, _, files in os.walk(self.path):
+            for name in files:
+                full = os.path.join(root, name)
+                try:
+                    stat = os.stat(full)
+                except FileNotFoundError:
+                    continue
+                yield full, stat.st_mtime, stat.st_size
+
+    def _evict(self):
+        """Drop least recently used files until the store is at 90% of its limit"""
+        entries = sorted(self._scan(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+        target = self.max_bytes * 0.9
+        removed = 0
+        for path, _, size in entries:
+            if total <= target:
+                break
+            self._remove(path)
+            total -= size
+            removed += 1
+        self._total_bytes = total
+        metrics.increment("llm_cache_evictions_total", removed)
+        logger.info(f"🧹 LLM cache evicted {removed} file(s), {total / 1e6:.1f} MB left")
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class LLMResponseCache:
+    def __init__(
+        self,
+        enabled: bool = True,
+        backend: str = "disk",
+        ttl: int = 7 * 24 * 3600,
+        disk_path: str = "./cache/llm",
+        max_disk_mb: int = 512,
+        max_entry_kb: int = 256,
+        name: str = "llm"
+    ):
+        self.enabled = enabled
+        self.name = name
+        self.backend = backend
+        self.ttl = ttl
+        self.max_entry_bytes = max_entry_kb * 1024
+        self._disk = DiskBackend(disk_path, max_disk_mb * 1024 * 1024) if backend == "disk" else None
+
+    async def get(self, key: str) -> Optional[Dict]:
+        """Stored response dict (with the original `usage`), or None"""
+        if not self.enabled:
+            return None
+        start = time.perf_counter()
+        try:
+            if self._disk is not None:
+                payload = await run_in_pool("io", self._disk.get, key)
+            else:
+                redis_conn = await get_redis_client()
+                payload = await redis_conn.get(f"{self.name}:{key}") if redis_conn is not None else None
+            value = json.loads(zlib.decompress(payload)) if payload else None
+        except Exception as e:
+            logger.warning(f"⚠️ LLM cache read failed: {e}")
+            value = None
+
+        metrics.observe("llm_cache_lookup_seconds", time.perf_counter() - start, backend=self.backend, cache=self.name)
+        if value is None:
+            metrics.increment("llm_cache_misses_total", backend=self.backend, cache=self.name)
+            return None
+        metrics.increment("llm_cache_hits_total", backend=self.backend, cache=self.name)
+        usage = value.get("usage") or {}
+        metrics.increment("llm_cache_tokens_saved_total", usage.get("total_tokens", 0), cache=self.name)
+        return value
+
+    async def set(self, key: str, value: Dict):
+        if not self.enabled:
+            return
+        payload = zlib.compress(json.dumps(value, ensure_ascii=False).encode())
+        if len(payload) > self.max_entry_bytes:
+            metrics.increment("llm_cache_skipped_total", reason="too_large", cache=self.name)
+            return
+        try:
+            if self._disk is not None:
+                await run_in_pool("io", self._disk.set, key, payload, self.ttl)
+            else:
+                redis_conn = await get_redis_client()
+                if redis_conn is not None:
+                    await redis_conn.setex(f"{self.name}:{key}", self.ttl, payload)
+        except Exception as e:
+            logger.warning(f"⚠️ LLM cache write failed: {e}")
+
+
+llm_cache = LLMResponseCache(
+    enabled=LLM_CACHE_CONFIG["enabled"],
+    backend=LLM_CACHE_CONFIG["backend"],
+    ttl=LLM_CACHE_CONFIG["ttl"],
+    disk_path=LLM_CACHE_CONFIG["disk_path"],
+    max_disk_mb=LLM_CACHE_CONFIG["max_disk_mb"],
+    max_entry_kb=LLM_CACHE_CONFIG["max_entry_kb"],
+)
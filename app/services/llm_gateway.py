@@ -0,0 +1,195 @@
+"""
+Application-scoped gateway for every OpenAI call.
+
+Building an `AsyncOpenAI` (or sync `OpenAI`) per request throws away the
+underlying connection pool, so each call paid a fresh TCP + TLS handshake.
+The gateway owns one `AsyncOpenAI` per worker on top of a tuned
+`httpx.AsyncClient` (bounded pool, keep-alive, HTTP/2 when `h2` is
+installed). It is opened and closed by the FastAPI lifespan; call sites use
+the module-level `llm_gateway` and never close it themselves.
+
+Every call first takes a slot from `llm_scheduler` (rate budgets,
+priorities, adaptive concurrency), tagged with the caller's `priority`.
+"""
+
+import time
+import logging
+import importlib.util
+from typing import Optional
+import httpx
+from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletion
+from app.core.metrics import metrics
+from app.services.llm_scheduler import llm_scheduler
+from app.services.llm_cache import llm_cache, cache_key
+from app.config import OPENAI_API_KEY, LLM_CLIENT_CONFIG
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class LLMGateway:
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 60.0,
+        connect_timeout: float = 5.0,
+        timeout: float = 120.0,
+        max_retries: int = 2,
+        http2: bool = True
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        if http2 and not self.http2:
+            logger.warning("⚠️ h2 is not installed - LLM client falls back to HTTP/1.1")
+        self._client: Optional[AsyncOpenAI] = None
+
+    async def start_async(self):
+        """Build the shared client eagerly (called from the FastAPI lifespan)"""
+        _ = self.client
+        logger.info(f"✅ LLM gateway started (http2={self.http2}, max_connections={self.max_connections})")
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """The shared AsyncOpenAI client. Do NOT close it - the app lifespan owns it."""
+        if self._client is None:
+            http_client = httpx.AsyncClient(
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout)
+            )
+            self._client = AsyncOpenAI(
+                api_key=OPENAI_API_KEY,
+                http_client=http_client,
+                max_retries=self.max_retries
+            )
+        return self._client
+
+    async def aclose(self):
+        """Close the client and its connection pool (called on FastAPI shutdown)"""
+        if self._client is not None:
+            try:
+                await self._client.close()
+            except Exception as e:
+                logger.warning(f"⚠️ LLM client close failed: {e}")
+            self._client = None
+            logger.info("🔌 LLM gateway closed")
+
+    # ================= CALLS =================
+    # `priority` is one of llm_scheduler.PRIORITIES ("chat", "generation", ...)
+
+    async def chat_completion(self, priority: str = "background", cache: bool = False, **kwargs):
+        """
+        `chat.completions.create` on the shared client (same keyword arguments).
+        With cache=True identical requests are answered from llm_cache with
+        zero token usage - only use it for deterministic / idempotent calls.
+        """
+        model = kwargs.get("model")
+        key = cache_key(kwargs) if cache else None
+        if key is not None:
+            cached = await llm_cache.get(key)
+            if cached is not None:
+                cached["usage"] = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+                return ChatCompletion.model_validate(cached)
+
+        tokens = await llm_scheduler.estimate(model, messages=kwargs.get("messages"), max_tokens=kwargs.get("max_tokens"))
+        async with llm_scheduler.slot(model, tokens, priority) as ticket:
+            start = time.perf_counter()
+            try:
+                response = await self.client.chat.completions.create(**kwargs)
+            except Exception:
+                metrics.increment("llm_errors_total", kind="chat", model=model)
+                raise
+            ticket.used_tokens = response.usage.total_tokens if response.usage else None
+        self._record("chat", model, start, response.usage)
+        if key is not None and response.choices and response.choices[0].finish_reason == "stop":
+            await llm_cache.set(key, response.model_dump(mode="json"))
+        return response
+
+    async def stream_chat_completion(self, priority: str = "background", **kwargs):
+        """
+        Streaming `chat.completions.create`; returns an async iterator of chunks.
+        Usage is requested so the last chunk carries token counts. The
+        scheduler slot is held until the stream is exhausted or closed.
+        """
+        model = kwargs.get("model")
+        kwargs.setdefault("stream_options", {"include_usage": True})
+        tokens = await llm_scheduler.estimate(model, messages=kwargs.get("messages"), max_tokens=kwargs.get("max_tokens"))
+
+        async def chunks():
+            async with llm_scheduler.slot(model, tokens, priority) as ticket:
+                start = time.perf_counter()
+                usage = None
+                try:
+                    stream = await self.client.chat.completions.create(stream=True, **kwargs)
+                    async for chunk in stream:
+                        if chunk.usage is not None:
+                            usage = chunk.usage
+                            ticket.used_tokens = usage.total_tokens
+                        yield chunk
+                except Exception:
+                    metrics.increment("llm_errors_total", kind="chat_stream", model=model)
+                    raise
+            self._record("chat_stream", model, start, usage)
+
+        return chunks()
+
+    async def create_embedding(self, priority: str = "background", **kwargs):
+        """`embeddings.create` on the shared client (same keyword arguments)"""
+        model = kwargs.get("model")
+        tokens = await llm_scheduler.estimate(model, input=kwargs.get("input"))
+        async with llm_scheduler.slot(model, tokens, priority) as ticket:
+            start = time.perf_counter()
+            try:
+                response = await self.client.embeddings.create(**kwargs)
+            except Exception:
+                metrics.increment("llm_errors_total", kind="embedding", model=model)
+                raise
+            ticket.used_tokens = response.usage.total_tokens if response.usage else None
+        self._record("embedding", model, start, response.usage)
+        return response
+
+    def _record(self, kind: str, model: Optional[str], start: float, usage):
+        elapsed = time.perf_counter() - start
+        metrics.increment("llm_requests_total", kind=kind, model=model)
+        metrics.observe("llm_request_seconds", elapsed, kind=kind, model=model)
+        if usage is None:
+            return
+        metrics.increment("llm_tokens_total", usage.total_tokens, kind=kind, model=model)
+        if kind == "embedding":
+            return
+
+        # OpenAI prompt caching: how much of each prompt was served from the prefix cache
+        cached = cached_prompt_tokens(usage)
+        metrics.increment("llm_prompt_tokens_total", usage.prompt_tokens, model=model)
+        metrics.increment("llm_cached_prompt_tokens_total", cached, model=model)
+        if usage.prompt_tokens:
+            metrics.observe("llm_prompt_cache_ratio", cached / usage.prompt_tokens, model=model)
+        metrics.observe("llm_prefix_cache_request_seconds", elapsed, model=model, prefix_cache="hit" if cached else "miss")
+
+
+def cached_prompt_tokens(usage) -> int:
+    """`usage.prompt_tokens_details.cached_tokens`, or 0 when not reported"""
+    details = getattr(usage, "prompt_tokens_details", None)
+    return getattr(details, "cached_tokens", None) or 0
+
+
+llm_gateway = LLMGateway(
+    max_connections=LLM_CLIENT_CONFIG["max_connections"],
+    max_keepalive_connections=LLM_CLIENT_CONFIG["max_keepalive_connections"],
+    keepalive_expiry=LLM_CLIENT_CONFIG["keepalive_expiry"],
+    connect_timeout=LLM_CLIENT_CONFIG["connect_timeout"],
+    timeout=LLM_CLIENT_CONFIG["timeout"],
+    max_retries=LLM_CLIENT_CONFIG["max_retries"],
+    http2=LLM_CLIENT_CONFIG["http2"],
+)
@@ -0,0 +1,363 @@
+"""
+Process-wide scheduler for OpenAI calls.
+
+Every call made through `llm_gateway` first takes a slot here:
+
+- tokens are estimated up front with tiktoken (prompt + max_tokens) and
+  reserved from per-model RPM / TPM token buckets; the reservation is
+  settled against the real `usage` when the call returns
+- waiting calls are served by priority: interactive chat first, then
+  policy generation, alignment / summarization, and bulk ingestion last.
+  A share of every budget (`interactive_reserve`) is only available to chat,
+  so a bulk summarization can't spend the minute's TPM that chat needs
+- the number of concurrent calls follows AIMD: +1 per window of successful
+  calls, multiplied by `decrease_factor` on a 429 or when a call is much
+  slower (per 1k tokens) than the model's running average
+"""
+
+import json
+import time
+import asyncio
+import itertools
+import logging
+import tiktoken
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+from app.core.metrics import metrics
+from app.core.executors import run_in_pool
+from app.config import LLM_SCHEDULER_CONFIG
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Lower value is served first
+PRIORITIES = {
+    "chat": 0,
+    "generation": 1,
+    "alignment": 2,
+    "summarization": 2,
+    "ingestion": 3,
+    "background": 3,
+}
+INTERACTIVE = 0
+
+# Texts longer than this are tokenized on the io pool instead of the event loop
+_INLINE_TOKENIZE_CHARS = 50000
+
+_encodings: Dict[str, "tiktoken.Encoding"] = {}
+
+
+def _encoding(model: Optional[str]):
+    encoding = _encodings.get(model)
+    if encoding is None:
+        try:
+            encoding = tiktoken.encoding_for_model(model or "")
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        _encodings[model] = encoding
+    return encoding
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    try:
+        return len(_encoding(model).encode(text, disallowed_special=()))
+    except Exception:
+        # Rough estimation: 1 token ≈ 4 characters
+        return len(text) // 4 + 1
+
+
+def _message_text(message: Dict) -> str:
+    content = message.get("content") or ""
+    return content if isinstance(content, str) else json.dumps(content)
+
+
+def estimate_request_tokens(
+    model: Optional[str],
+    messages: Optional[List[Dict]] = None,
+    input=None,
+    max_tokens: Optional[int] = None,
+    default_completion_tokens: int = 1000
+) -> int:
+    """Tokens a request will count against TPM: prompt + completion budget"""
+    if input is not None:
+        texts = [input] if isinstance(input, str) else input
+        # Embedding input may also be pre-tokenized (lists of ints)
+        return sum(count_tokens(t, model) if isinstance(t, str) else len(t) for t in texts)
+
+    # ~4 tokens of framing per message, 3 to prime the reply
+    prompt_tokens = 3 + sum(4 + count_tokens(_message_text(m), model) for m in messages or [])
+    return prompt_tokens + (max_tokens or default_completion_tokens)
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, per_second: float):
+        self.capacity = capacity
+        self.rate = per_second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, reserve: float = 0.0) -> float:
+        """Seconds until `amount` can be taken while leaving `reserve` behind (0 = now)"""
+        self._refill(time.monotonic())
+        # A request bigger than the bucket would never fit; let it run into debt instead
+        amount = min(amount, self.capacity - reserve)
+        deficit = amount + reserve - self.tokens
+        return 0.0 if deficit <= 0 else deficit / self.rate
+
+    def take(self, amount: float):
+        self.tokens -= amount
+
+    def give_back(self, amount: float):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def drain(self):
+        self.tokens = min(self.tokens, 0.0)
+
+
+class _ModelBudget:
+    __slots__ = ("rpm", "tpm")
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = TokenBucket(rpm, rpm / 60)
+        self.tpm = TokenBucket(tpm, tpm / 60)
+
+
+def parse_model_limits(spec: str) -> Dict[str, tuple]:
+    """"gpt-4o-mini=5000:2000000,gpt-4=500:30000" -> {model: (rpm, tpm)}"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        try:
+            model, values = item.split("=", 1)
+            rpm, tpm = values.split(":", 1)
+            limits[model.strip()] = (int(rpm), int(tpm))
+        except ValueError:
+            logger.warning(f"⚠️ Ignoring malformed LLM_MODEL_LIMITS entry: {item!r}")
+    return limits
+
+
+class Ticket:
+    """A granted slot; set `used_tokens` from the response usage before release"""
+    __slots__ = ("model", "tokens", "priority", "level", "future", "enqueued_at", "started_at", "used_tokens")
+
+    def __init__(self, model: Optional[str], tokens: int, priority: str, level: int):
+        self.model = model
+        self.tokens = tokens
+        self.priority = priority
+        self.level = level
+        self.future: Optional[asyncio.Future] = None
+        self.enqueued_at = time.perf_counter()
+        self.started_at = self.enqueued_at
+        self.used_tokens: Optional[int] = None
+
+
+def _is_rate_limit(exc: BaseException) -> bool:
+    return getattr(exc, "status_code", None) == 429
+
+
+class LLMScheduler:
+    def __init__(
+        self,
+        enabled: bool = True,
+        default_rpm: int = 500,
+        default_tpm: int = 200000,
+        model_limits: Optional[Dict[str, tuple]] = None,
+        interactive_reserve: float = 0.2,
+        default_completion_tokens: int = 1000,
+        initial_concurrency: int = 16,
+        min_concurrency: int = 2,
+        max_concurrency: int = 64,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 2.0,
+        decrease_cooldown: float = 5.0
+    ):
+        self.enabled = enabled
+        self.default_rpm = default_rpm
+        self.default_tpm = default_tpm
+        self.model_limits = model_limits or {}
+        self.interactive_reserve = interactive_reserve
+        self.default_completion_tokens = default_completion_tokens
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.decrease_cooldown = decrease_cooldown
+        self.limit = float(initial_concurrency)
+
+        self._budgets: Dict[Optional[str], _ModelBudget] = {}
+        self._waiting: List[tuple] = []
+        self._seq = itertools.count()
+        self._inflight = 0
+        # model -> running average of seconds per 1k tokens
+        self._latency: Dict[Optional[str], float] = {}
+        self._last_decrease = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    # ================= PUBLIC API =================
+
+    async def estimate(self, model: Optional[str], messages=None, input=None, max_tokens: Optional[int] = None) -> int:
+        size = sum(len(_message_text(m)) for m in messages or [])
+        if input is not None:
+            size += len(input) if isinstance(input, str) else sum(len(t) for t in input)
+        args = (model, messages, input, max_tokens, self.default_completion_tokens)
+        if size > _INLINE_TOKENIZE_CHARS:
+            return await run_in_pool("io", estimate_request_tokens, *args)
+        return estimate_request_tokens(*args)
+
+    @asynccontextmanager
+    async def slot(self, model: Optional[str], tokens: int, priority: str = "background"):
+        """Wait for budget and a concurrency slot; released (and settled) on exit"""
+        ticket = await self.acquire(model, tokens, priority)
+        try:
+            yield ticket
+        except BaseException as e:
+            self.release(ticket, rate_limited=_is_rate_limit(e))
+            raise
+        self.release(ticket)
+
+    async def acquire(self, model: Optional[str], tokens: int, priority: str = "background") -> Ticket:
+        ticket = Ticket(model, tokens, priority, PRIORITIES.get(priority, PRIORITIES["background"]))
+        if not self.enabled:
+            return ticket
+
+        ticket.future = asyncio.get_running_loop().create_future()
+        self._waiting.append((ticket.level, next(self._seq), ticket))
+        self._dispatch()
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            # Granted just before the cancellation landed: hand the slot back
+            if ticket.future.done() and not ticket.future.cancelled():
+                self.release(ticket)
+            raise
+
+        ticket.started_at = time.perf_counter()
+        wait = ticket.started_at - ticket.enqueued_at
+        metrics.observe("llm_scheduler_wait_seconds", wait, priority=priority)
+        if wait > 1.0:
+            logger.info(f"⏳ LLM call [{priority}] waited {wait:.2f}s for budget")
+        return ticket
+
+    def release(self, ticket: Ticket, rate_limited: bool = False):
+        if not self.enabled or ticket.future is None:
+            return
+        self._inflight -= 1
+        budget = self._budget(ticket.model)
+
+        if rate_limited:
+            metrics.increment("llm_rate_limited_total", model=ticket.model, priority=ticket.priority)
+            # Our view of the budget was too optimistic; start from empty
+            budget.rpm.drain()
+            budget.tpm.drain()
+            self._decrease("rate_limit")
+        elif ticket.used_tokens is not None:
+            budget.tpm.give_back(ticket.tokens - ticket.used_tokens)
+            self._on_success(ticket)
+
+        self._dispatch()
+
+    def stats(self) -> Dict:
+        return {
+            "concurrency_limit": round(self.limit, 2),
+            "inflight": self._inflight,
+            "waiting": len(self._waiting),
+            "budgets": {
+                str(model): {"rpm_available": round(b.rpm.tokens, 1), "tpm_available": round(b.tpm.tokens)}
+                for model, b in self._budgets.items()
+            },
+            "seconds_per_1k_tokens": {str(m): round(v, 3) for m, v in self._latency.items()},
+        }
+
+    # ================= INTERNALS =================
+
+    def _budget(self, model: Optional[str]) -> _ModelBudget:
+        budget = self._budgets.get(model)
+        if budget is None:
+            rpm, tpm = self.model_limits.get(model, (self.default_rpm, self.default_tpm))
+            budget = self._budgets[model] = _ModelBudget(rpm, tpm)
+        return budget
+
+    def _on_success(self, ticket: Ticket):
+        elapsed = time.perf_counter() - ticket.started_at
+        per_1k = elapsed / max(ticket.used_tokens, 1) * 1000
+        baseline = self._latency.get(ticket.model)
+        self._latency[ticket.model] = per_1k if baseline is None else 0.9 * baseline + 0.1 * per_1k
+
+        if baseline is not None and per_1k > self.latency_tolerance * baseline:
+            self._decrease("latency")
+        else:
+            # Additive increase: about +1 per `limit` successful calls
+            self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+
+    def _decrease(self, reason: str):
+        now = time.monotonic()
+        if now - self._last_decrease < self.decrease_cooldown:
+            return
+        self._last_decrease = now
+        previous = self.limit
+        self.limit = max(self.min_concurrency, self.limit * self.decrease_factor)
+        metrics.increment("llm_concurrency_decrease_total", reason=reason)
+        logger.warning(f"📉 LLM concurrency {previous:.1f} -> {self.limit:.1f} ({reason})")
+
+    def _dispatch(self):
+        """Grant every waiter that fits, in priority order; re-arm a timer for the rest"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        waiting, blocked_models, next_wake = [], set(), None
+        for entry in sorted(self._waiting, key=lambda e: (e[0], e[1])):
+            ticket = entry[2]
+            if ticket.future.done():
+                continue  # cancelled while queued
+
+            interactive = ticket.level == INTERACTIVE
+            reserve = 0.0 if interactive else self.interactive_reserve
+            slots = max(1, int(self.limit * (1 - reserve)))
+            if self._inflight >= slots or ticket.model in blocked_models:
+                waiting.append(entry)
+                continue
+
+            budget = self._budget(ticket.model)
+            wait = max(
+                budget.rpm.wait_time(1, reserve * budget.rpm.capacity),
+                budget.tpm.wait_time(ticket.tokens, reserve * budget.tpm.capacity)
+            )
+            if wait > 0:
+                # Lower-priority calls for the same model must not jump ahead
+                blocked_models.add(ticket.model)
+                next_wake = wait if next_wake is None else min(next_wake, wait)
+                waiting.append(entry)
+                continue
+
+            budget.rpm.take(1)
+            budget.tpm.take(ticket.tokens)
+            self._inflight += 1
+            ticket.future.set_result(None)
+
+        self._waiting = waiting
+        if next_wake is not None:
+            self._timer = asyncio.get_running_loop().call_later(next_wake, self._dispatch)
+
+        metrics.set_gauge("llm_scheduler_inflight", self._inflight)
+        metrics.set_gauge("llm_scheduler_waiting", len(self._waiting))
+        metrics.set_gauge("llm_scheduler_concurrency_limit", round(self.limit, 2))
+
+
+llm_scheduler = LLMScheduler(
+    enabled=LLM_SCHEDULER_CONFIG["enabled"],
+    default_rpm=LLM_SCHEDULER_CONFIG["default_rpm"],
+    default_tpm=LLM_SCHEDULER_CONFIG["default_tpm"],
+    model_limits=parse_model_limits(LLM_SCHEDULER_CONFIG["model_limits"]),
+    interactive_reserve=LLM_SCHEDULER_CONFIG["interactive_reserve"],
+    default_completion_tokens=LLM_SCHEDULER_CONFIG["default_completion_tokens"],
+    initial_concurrency=LLM_SCHEDULER_CONFIG["initial_concurrency"],
+    min_concurrency=LLM_SCHEDULER_CONFIG["min_concurrency"],
+    max_concurrency=LLM_SCHEDULER_CONFIG["max_concurrency"],
+    decrease_factor=LLM_SCHEDULER_CONFIG["decrease_factor"],
+    latency_tolerance=LLM_SCHEDULER_CONFIG["latency_tolerance"],
+    decrease_cooldown=LLM_SCHEDULER_CONFIG["decrease_cooldown"],
+)
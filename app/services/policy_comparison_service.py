@@ -1,4 +1,3 @@
-from openai import OpenAI
 import logging
 from typing import List, Dict
 import json
@@ -7,18 +6,18 @@ from fastapi import HTTPException, UploadFile
 from app.services.extract_content import extract_content_from_uploadpdf
 from functools import lru_cache
 import asyncio
+from app.core.executors import run_in_pool
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 from app.services.weaviate_client import get_weaviate_client
-from app.config import OPENAI_API_KEY
+from app.services.llm_gateway import llm_gateway
 
 # Create a sync wrapper for async compatibility
 def run_in_executor(func, *args):
-    """Run sync function in thread pool"""
-    loop = asyncio.get_event_loop()
-    return loop.run_in_executor(None, func, *args)
+    """Run sync function in the I/O thread pool"""
+    return run_in_pool("io", func, *args)
 
 
 def cosine_similarity(vector_a, vector_b):
@@ -36,17 +35,12 @@ def fetch_weaviate_policies_cached(collection_name: str, cache_key: str = "defau
     """Cache করা Weaviate policies fetch"""
     try:
         client = get_weaviate_client()
-        if not client.is_connected():
-            client.connect()
         collection = client.collections.get(collection_name)
         response = collection.query.fetch_objects(limit=1000)
         return response.objects
     except Exception as e:
         logger.error(f"Weaviate fetch error: {str(e)}")
         return []
-    finally:
-        if client.is_connected():
-            client.close()
 
 
 def fetch_weaviate_policies(collection_name: str):
@@ -71,7 +65,7 @@ def chunk_text(text: str, max_chunk_size: int = 8000, overlap: int = 300) -> Lis
     return chunks
 
 
-async def summarize_large_text(openai_client: OpenAI, text: str, title: str) -> str:
+async def summarize_large_text(text: str, title: str) -> str:
     """Optimized summarization with parallel chunk processing"""
     if not text:
         return ""
@@ -80,8 +74,9 @@ async def summarize_large_text(openai_client: OpenAI, text: str, title: str) ->
     
     if len(chunks) == 1:
         try:
-            resp = await asyncio.to_thread(
-                openai_client.chat.completions.create,
+            resp = await llm_gateway.chat_completion(
+                priority="alignment",
+                cache=True,
                 model="gpt-4o-mini",
                 messages=[
                     {"role": "system", "content": "Concise policy summary in 6-8 bullets."},
@@ -98,8 +93,9 @@ async def summarize_large_text(openai_client: OpenAI, text: str, title: str) ->
     # Multiple chunks - parallel processing
     async def summarize_chunk(idx: int, chunk: str) -> str:
         try:
-            resp = await asyncio.to_thread(
-                openai_client.chat.completions.create,
+            resp = await llm_gateway.chat_completion(
+                priority="alignment",
+                cache=True,
                 model="gpt-4o-mini",
                 messages=[
                     {"role": "system", "content": "Extract key points in 4-5 bullets."},
@@ -122,8 +118,9 @@ async def summarize_large_text(openai_client: OpenAI, text: str, title: str) ->
     
     # Final compression if needed
     try:
-        resp = await asyncio.to_thread(
-            openai_client.chat.completions.create,
+        resp = await llm_gateway.chat_completion(
+            priority="alignment",
+            cache=True,
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": "Combine into 6-8 key bullets."},
@@ -186,12 +183,10 @@ async def extract_pdf_content(file: UploadFile):
 
 async def cosine_similarity_test(file: UploadFile, organization_type: str):
     """Optimized cosine similarity with async execution against org and general policies"""
-    openai_client = OpenAI(api_key=OPENAI_API_KEY)
-    
     # Parallel execution for both org and general policies
     pdf_task = extract_pdf_content(file)
-    org_policies_task = asyncio.to_thread(fetch_weaviate_policies, organization_type)
-    general_policies_task = asyncio.to_thread(fetch_weaviate_policies, 'GeneralLaw')
+    org_policies_task = run_in_pool("io", fetch_weaviate_policies, organization_type)
+    general_policies_task = run_in_pool("io", fetch_weaviate_policies, 'GeneralLaw')
     
     (full_text, _title), org_policies, general_policies = await asyncio.gather(
         pdf_task, org_policies_task, general_policies_task
@@ -212,8 +207,8 @@ async def cosine_similarity_test(file: UploadFile, organization_type: str):
         else:
             embedding_text = full_text
             
-        embedding_response = await asyncio.to_thread(
-            openai_client.embeddings.create,
+        embedding_response = await llm_gateway.create_embedding(
+            priority="alignment",
             model="text-embedding-3-small",
             input=embedding_text
         )
@@ -248,16 +243,14 @@ async def cosine_similarity_test(file: UploadFile, organization_type: str):
 
 async def combined_alignment_analysis(text: str, title: str, organization_type: str) -> Dict[str, object]:
     """Ultra-fast parallel analysis with optimized OpenAI calls"""
-    openai_client = OpenAI(api_key=OPENAI_API_KEY)
-    
     # Step 1: Fetch Weaviate data (PDF text already provided)
     weaviate_full_text = await fetch_weaviate_full_text(organization_type)
 
     
     # Step 2: Parallel summarization (text already extracted)
     pdf_summary, weaviate_summary = await asyncio.gather(
-        summarize_large_text(openai_client, text, title),
-        summarize_large_text(openai_client, weaviate_full_text, "Main Laws")
+        summarize_large_text(text, title),
+        summarize_large_text(weaviate_full_text, "Main Laws")
     )
     
     # Step 3: Single optimized LLM call for everything
@@ -275,8 +268,8 @@ async def combined_alignment_analysis(text: str, title: str, organization_type:
     )
     
     try:
-        resp = await asyncio.to_thread(
-            openai_client.chat.completions.create,
+        resp = await llm_gateway.chat_completion(
+            priority="alignment",
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": "You are a precise policy analyst. Return only valid JSON."},
@@ -329,15 +322,13 @@ async def combined_alignment_analysis(text: str, title: str, organization_type:
 
 async def summarize_pdf_and_policies(text: str, title: str, organization_type: str) -> Dict[str, str]:
     """Fast parallel summarization of PDF and policies"""
-    openai_client = OpenAI(api_key=OPENAI_API_KEY)
-    
     # Fetch Weaviate data (PDF text already provided)
-    weaviate_full_text = await asyncio.to_thread(fetch_weaviate_full_text, organization_type)
+    weaviate_full_text = await run_in_pool("io", fetch_weaviate_full_text, organization_type)
     
     # Parallel summarization
     pdf_summary, weaviate_summary = await asyncio.gather(
-        summarize_large_text(openai_client, text, title),
-        summarize_large_text(openai_client, weaviate_full_text, "Main Policies")
+        summarize_large_text(text, title),
+        summarize_large_text(weaviate_full_text, "Main Policies")
     )
     
     return {
@@ -347,7 +338,7 @@ async def summarize_pdf_and_policies(text: str, title: str, organization_type: s
 
 
 # Legacy sync functions kept for backwards compatibility
-async def compare_summaries_with_llm(openai_client: OpenAI, pdf_summary: str, weaviate_summary: str) -> Dict[str, str]:
+async def compare_summaries_with_llm(pdf_summary: str, weaviate_summary: str) -> Dict[str, str]:
     """Legacy function - use combined_alignment_analysis instead"""
     prompt = (
         "Compare two summaries (A: PDF, B: Policies).\n"
@@ -357,8 +348,8 @@ async def compare_summaries_with_llm(openai_client: OpenAI, pdf_summary: str, we
         "Return JSON: {{\"alignment_status\": \"ALIGNED|NOT_ALIGNED\", \"reasoning\": \"...\"}}"
     )
     try:
-        resp = await asyncio.to_thread(
-            openai_client.chat.completions.create,
+        resp = await llm_gateway.chat_completion(
+            priority="alignment",
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": "Return strict JSON only."},
@@ -378,15 +369,15 @@ async def compare_summaries_with_llm(openai_client: OpenAI, pdf_summary: str, we
         return {"alignment_status": "UNKNOWN", "reasoning": "Comparison failed."}
 
 
-async def detect_conflicts_or_differences(openai_client: OpenAI, pdf_summary: str, weaviate_summary: str) -> Dict[str, object]:
+async def detect_conflicts_or_differences(pdf_summary: str, weaviate_summary: str) -> Dict[str, object]:
     """Legacy function - use combined_alignment_analysis instead"""
     prompt = (
         f"Analyze summaries for conflicts:\nPDF: {pdf_summary}\nPolicies: {weaviate_summary}\n"
         f"Return JSON: {{\"direct_conflict\": true/false, \"conflicts\": [...], \"differences\": [...]}}"
     )
     try:
-        resp = await asyncio.to_thread(
-            openai_client.chat.completions.create,
+        resp = await llm_gateway.chat_completion(
+            priority="alignment",
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": "Return strict JSON."},
@@ -408,15 +399,15 @@ async def detect_conflicts_or_differences(openai_client: OpenAI, pdf_summary: st
         return {"direct_conflict": False, "conflicts": [], "differences": [], "note": "Failed."}
 
 
-async def generate_contradiction_paragraph(openai_client: OpenAI, pdf_summary: str, weaviate_summary: str) -> str:
+async def generate_contradiction_paragraph(pdf_summary: str, weaviate_summary: str) -> str:
     """Legacy function - use combined_alignment_analysis instead"""
     prompt = (
         f"ONE paragraph (4-6 sentences) on contradictions between:\n"
         f"PDF: {pdf_summary}\nPolicies: {weaviate_summary}"
     )
     try:
-        resp = await asyncio.to_thread(
-            openai_client.chat.completions.create,
+        resp = await llm_gateway.chat_completion(
+            priority="alignment",
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": "Single paragraph only."},
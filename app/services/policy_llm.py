@@ -3,14 +3,11 @@ Updated policy_llm.py with inline styles and error handling fixes
 """
 
 import json
-from app.config import OPENAI_API_KEY
 from app.services.policy_vector_service import PolicyVectorService
-from openai import OpenAI
+from app.services.llm_gateway import llm_gateway
 import re
 import asyncio
-from typing import Dict, List, Optional
-
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
+from typing import AsyncIterator, Dict, List, Optional
 
 # Constants
 GPT4_TURBO_MODEL = "gpt-4-turbo-2024-04-09"
@@ -18,6 +15,9 @@ MAX_OUTPUT_TOKENS = 4096
 MAX_CONTEXT_TOKENS = 120000
 WORDS_PER_PAGE = 250
 TOKENS_PER_WORD = 1.33
+CONTAINER_STYLE = 'font-family: Georgia, Times New Roman, serif; line-height: 1.8; color: #333; max-width: 900px; margin: 0 auto; padding: 20px;'
+# A level 1/2 markdown heading starts a new streamed section
+SECTION_HEADING = re.compile(r'^#{1,2}\s')
 
 
 def estimate_token_count(text: str) -> int:
@@ -99,9 +99,9 @@ def select_relevant_law_content(law_content: str, query: str, max_chars: int = 8
     return result if result else law_content[:max_chars] + "..."
 
 
-def convert_markdown_to_inline_html(markdown_content: str) -> str:
+def render_markdown_section(markdown_content: str) -> str:
     """
-    Convert markdown to HTML with inline styles (no embedded <style> tags)
+    Convert markdown to HTML with inline styles, without the container div
     """
     import markdown
     
@@ -147,35 +147,41 @@ def convert_markdown_to_inline_html(markdown_content: str) -> str:
             html_content
         )
     
+    return html_content
+
+
+def convert_markdown_to_inline_html(markdown_content: str) -> str:
+    """
+    Convert markdown to HTML with inline styles (no embedded <style> tags)
+    """
+    html_content = render_markdown_section(markdown_content)
+
     # Wrap in container div with inline styles
-    container_style = 'font-family: Georgia, Times New Roman, serif; line-height: 1.8; color: #333; max-width: 900px; margin: 0 auto; padding: 20px;'
-    
-    return f'<div style="{container_style}">{html_content}</div>'
+    return f'<div style="{CONTAINER_STYLE}">{html_content}</div>'
 
 
-async def generate_policy_html(title: str, context: str, organization_type: str, target_words: int = 3000) -> dict:
+async def build_policy_html_messages(title: str, context: str, organization_type: str, target_words: int = 3000) -> List[Dict]:
     """
-    Generate policy content in HTML format with inline styling (no embedded CSS)
+    Chat messages for generate_policy_html / stream_policy_html (fetches the legal framework)
     """
+    # Get legal framework
+    query = f"{title} {context}"
+    super_admin_law_content = "Standard regulatory framework"
+    
     try:
-        # Get legal framework
-        query = f"{title} {context}"
-        super_admin_law_content = "Standard regulatory framework"
-        
-        try:
-            vector_service = PolicyVectorService(organization_type)
-            full_law_content = await vector_service.get_super_admin_laws_for_generation(
-                query=query, limit=5
-            )
-            # Select most relevant law content based on query
-            super_admin_law_content = select_relevant_law_content(
-                full_law_content, query, 6000
-            ) if full_law_content else "Standard regulatory framework"
-            print(f"Retrieved law content: {len(full_law_content)} characters, using: {len(super_admin_law_content)} characters")
-        except Exception as e:
-            print(f"Vector service error (using fallback): {e}")
-        
-        prompt = f"""
+        vector_service = PolicyVectorService(organization_type)
+        full_law_content = await vector_service.get_super_admin_laws_for_generation(
+            query=query, limit=5
+        )
+        # Select most relevant law content based on query
+        super_admin_law_content = select_relevant_law_content(
+            full_law_content, query, 6000
+        ) if full_law_content else "Standard regulatory framework"
+        print(f"Retrieved law content: {len(full_law_content)} characters, using: {len(super_admin_law_content)} characters")
+    except Exception as e:
+        print(f"Vector service error (using fallback): {e}")
+    
+    prompt = f"""
 You are a professional policy writer. Create a comprehensive policy document with the following structure:
 
 1. **Executive Summary** (2-3 paragraphs)
@@ -203,13 +209,24 @@ Legal Framework: {super_admin_law_content[:2000] if super_admin_law_content else
 
 Generate the complete policy document in markdown format that fully aligns with the above legal framework.
 """
-        
-        response = openai_client.chat.completions.create(
+
+    return [
+        {"role": "system", "content": "You are an expert policy writer. Generate comprehensive, professional policy documents in markdown format with proper structure, bullet points, and formatting."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+async def generate_policy_html(title: str, context: str, organization_type: str, target_words: int = 3000) -> dict:
+    """
+    Generate policy content in HTML format with inline styling (no embedded CSS)
+    """
+    try:
+        messages = await build_policy_html_messages(title, context, organization_type, target_words)
+
+        response = await llm_gateway.chat_completion(
+            priority="generation",
             model=GPT4_TURBO_MODEL,
-            messages=[
-                {"role": "system", "content": "You are an expert policy writer. Generate comprehensive, professional policy documents in markdown format with proper structure, bullet points, and formatting."},
-                {"role": "user", "content": prompt}
-            ],
+            messages=messages,
             temperature=0.1,
             max_tokens=4000
         )
@@ -244,6 +261,57 @@ Generate the complete policy document in markdown format that fully aligns with
         }
 
 
+async def stream_policy_html(title: str, context: str, organization_type: str, target_words: int = 3000) -> AsyncIterator[dict]:
+    """
+    Streaming variant of generate_policy_html.
+
+    Yields {"type": "section", "index", "html"} each time a top-level section
+    (a `#`/`##` heading and its body) is complete, then a final
+    {"type": "done", "word_count", "used_tokens"}. Sections are rendered with
+    the same inline styles; the client wraps them in CONTAINER_STYLE.
+    """
+    messages = await build_policy_html_messages(title, context, organization_type, target_words)
+
+    stream = await llm_gateway.stream_chat_completion(
+        priority="generation",
+        model=GPT4_TURBO_MODEL,
+        messages=messages,
+        temperature=0.1,
+        max_tokens=4000
+    )
+
+    used_tokens = 0
+    pending = ""          # text after the last complete line
+    section: List[str] = []
+    all_lines: List[str] = []
+    index = 0
+
+    async for chunk in stream:
+        if chunk.usage is not None:
+            used_tokens = chunk.usage.total_tokens
+        if not chunk.choices:
+            continue
+        pending += chunk.choices[0].delta.content or ""
+        *complete, pending = pending.split("\n")
+        for line in complete:
+            all_lines.append(line)
+            if SECTION_HEADING.match(line) and "".join(section).strip():
+                yield {"type": "section", "index": index, "html": render_markdown_section("\n".join(section))}
+                index += 1
+                section = []
+            section.append(line)
+
+    if pending:
+        all_lines.append(pending)
+        section.append(pending)
+    if "".join(section).strip():
+        yield {"type": "section", "index": index, "html": render_markdown_section("\n".join(section))}
+
+    word_count = estimate_word_count("\n".join(all_lines))
+    print(f"Streamed policy generation complete! Word count: {word_count}")
+    yield {"type": "done", "word_count": word_count, "used_tokens": used_tokens}
+
+
 async def generate_policy_with_vector_laws(organization_type: str, title: str, context: str, 
                                          version: str = None, target_words: int = 7500, 
                                          approach: str = "single-step") -> dict:
@@ -306,7 +374,8 @@ Legal Framework: {super_admin_law_content}
 Generate the complete policy document in markdown format that fully aligns with the above legal framework.
 """
         
-        response = openai_client.chat.completions.create(
+        response = await llm_gateway.chat_completion(
+            priority="generation",
             model=GPT4_TURBO_MODEL,
             messages=[
                 {"role": "system", "content": "You are an expert policy writer. Generate comprehensive, professional policy documents in markdown format."},
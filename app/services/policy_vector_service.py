@@ -4,7 +4,7 @@ Fixed Policy Vector Service with proper error handling and fallback mechanisms
 
 from typing import List, Dict, Optional
 from weaviate.classes.query import Filter, MetadataQuery
-from app.services.weaviate_client import get_weaviate_client
+from app.services import weaviate_store
 from weaviate.classes.config import Property, DataType, Configure, VectorDistances
 
 
@@ -12,7 +12,6 @@ class PolicyVectorService:
     """Service for retrieving super admin laws from PolicyEmbeddings collection."""
     
     def __init__(self, organization_type: str):
-        self.client = get_weaviate_client()
         self.COLLECTION_NAME = organization_type
     
     async def ensure_collection_schema(self):
@@ -20,16 +19,13 @@ class PolicyVectorService:
         Ensure collection exists and is configured properly.
         """
         try:
-            if not self.client.is_connected():
-                self.client.connect()
-            
-            collections = self.client.collections.list_all()
+            collections = await weaviate_store.list_collections()
             
             if self.COLLECTION_NAME not in collections:
                 print(f"Creating collection {self.COLLECTION_NAME} with vectorizer...")
                 # Create collection with vectorizer
-                self.client.collections.create(
-                    name=self.COLLECTION_NAME,
+                await weaviate_store.create_collection(
+                    self.COLLECTION_NAME,
                     vectorizer_config=Configure.Vectorizer.text2vec_openai(
                         model="text-embedding-3-small",
                         vectorize_collection_name=False
@@ -52,9 +48,6 @@ class PolicyVectorService:
                 
         except Exception as e:
             print(f"Error ensuring collection schema: {str(e)}")
-        finally:
-            if self.client.is_connected():
-                self.client.close()
 
     async def get_super_admin_laws_for_generation(
         self, 
@@ -77,11 +70,6 @@ class PolicyVectorService:
         await self.ensure_collection_schema()
         
         try:
-            if not self.client.is_connected():
-                self.client.connect()
-
-            collection = self.client.collections.get(self.COLLECTION_NAME)
-
             # Build filters
             filters = None
             if version:
@@ -91,15 +79,17 @@ class PolicyVectorService:
             try:
                 print(f"Attempting vector search for query: {query[:50]}...")
                 if filters:
-                    response = collection.query.near_text(
-                        query=query,
+                    response = await weaviate_store.near_text(
+                        self.COLLECTION_NAME,
+                        query,
                         filters=filters,
                         limit=limit,
                         return_metadata=MetadataQuery(score=True)
                     )
                 else:
-                    response = collection.query.near_text(
-                        query=query,
+                    response = await weaviate_store.near_text(
+                        self.COLLECTION_NAME,
+                        query,
                         limit=limit,
                         return_metadata=MetadataQuery(score=True)
                     )
@@ -110,12 +100,13 @@ class PolicyVectorService:
                 print("Falling back to regular fetch...")
                 # Fallback to regular fetch
                 if filters:
-                    response = collection.query.fetch_objects(
+                    response = await weaviate_store.fetch_objects(
+                        self.COLLECTION_NAME,
                         filters=filters,
                         limit=limit
                     )
                 else:
-                    response = collection.query.fetch_objects(limit=limit)
+                    response = await weaviate_store.fetch_objects(self.COLLECTION_NAME, limit=limit)
                 print(f"Regular fetch successful: {len(response.objects)} results")
             
             if not response.objects:
@@ -157,9 +148,6 @@ Content:
             traceback.print_exc()
             return f"Error retrieving laws: {str(e)}"
             
-        finally:
-            if self.client.is_connected():
-                self.client.close()
     
     async def get_all_laws_from_latest_version(self) -> str:
         """
@@ -168,13 +156,8 @@ Content:
         await self.ensure_collection_schema()
         
         try:
-            if not self.client.is_connected():
-                self.client.connect()
-            
-            collection = self.client.collections.get(self.COLLECTION_NAME)
-            
             # Get all objects to find the latest version
-            all_results = collection.query.fetch_objects(limit=1000)
+            all_results = await weaviate_store.fetch_objects(self.COLLECTION_NAME, limit=1000)
             
             if not all_results.objects:
                 return "No laws found in collection."
@@ -193,7 +176,8 @@ Content:
             print(f"Found latest version: {latest_version}")
             
             # Get all laws from the latest version
-            latest_results = collection.query.fetch_objects(
+            latest_results = await weaviate_store.fetch_objects(
+                self.COLLECTION_NAME,
                 filters=Filter.by_property("version").equal(latest_version),
                 limit=1000
             )
@@ -225,22 +209,14 @@ Content:
             traceback.print_exc()
             return f"Error retrieving laws: {str(e)}"
             
-        finally:
-            if self.client.is_connected():
-                self.client.close()
 
     async def get_available_versions(self) -> List[str]:
         """Get all available versions from collection."""
         await self.ensure_collection_schema()
         
         try:
-            if not self.client.is_connected():
-                self.client.connect()
-            
-            collection = self.client.collections.get(self.COLLECTION_NAME)
-            
             # Get all objects to extract versions
-            results = collection.query.fetch_objects(limit=1000)
+            results = await weaviate_store.fetch_objects(self.COLLECTION_NAME, limit=1000)
             
             versions = set()
             for obj in results.objects:
@@ -257,9 +233,6 @@ Content:
             print(f"Error getting available versions: {str(e)}")
             return []
             
-        finally:
-            if self.client.is_connected():
-                self.client.close()
     
     async def search_laws(
         self, 
@@ -271,11 +244,6 @@ Content:
         await self.ensure_collection_schema()
         
         try:
-            if not self.client.is_connected():
-                self.client.connect()
-
-            collection = self.client.collections.get(self.COLLECTION_NAME)
-
             # Build filters
             filters = None
             if version:
@@ -284,15 +252,17 @@ Content:
             # Try vector search first
             try:
                 if filters:
-                    response = collection.query.near_text(
-                        query=query,
+                    response = await weaviate_store.near_text(
+                        self.COLLECTION_NAME,
+                        query,
                         filters=filters,
                         limit=limit,
                         return_metadata=MetadataQuery(score=True)
                     )
                 else:
-                    response = collection.query.near_text(
-                        query=query,
+                    response = await weaviate_store.near_text(
+                        self.COLLECTION_NAME,
+                        query,
                         limit=limit,
                         return_metadata=MetadataQuery(score=True)
                     )
@@ -300,12 +270,13 @@ Content:
                 print(f"Vector search failed, using regular search: {vector_error}")
                 # Fallback to regular fetch
                 if filters:
-                    response = collection.query.fetch_objects(
+                    response = await weaviate_store.fetch_objects(
+                        self.COLLECTION_NAME,
                         filters=filters,
                         limit=limit
                     )
                 else:
-                    response = collection.query.fetch_objects(limit=limit)
+                    response = await weaviate_store.fetch_objects(self.COLLECTION_NAME, limit=limit)
             
             laws = []
             for obj in response.objects:
@@ -332,7 +303,4 @@ Content:
             import traceback
             traceback.print_exc()
             return []
-            
-        finally:
-            if self.client.is_connected():
-                self.client.close()
\ No newline at end of file
+            
\ No newline at end of file
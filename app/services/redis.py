@@ -1,8 +1,8 @@
 import redis.asyncio as redis
-import json
 import os
 from typing import Optional, Dict
 import logging
+from app.services.retrieved_chunk import packb, unpackb
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -18,8 +18,7 @@ async def get_redis_client() -> redis.Redis:
         try:
             redis_client = await redis.from_url(
                 os.getenv("REDIS_URL", "redis://localhost:6379"),
-                encoding="utf-8",
-                decode_responses=True
+                decode_responses=False  # Cached payloads are msgpack bytes
             )
             await redis_client.ping()
             logger.info("✅ Redis connected")
@@ -38,7 +37,7 @@ async def get_cached_context(cache_key: str) -> Optional[Dict]:
         cached_data = await redis_conn.get(cache_key)
         if cached_data:
             logger.info(f"✅ Cache hit: {cache_key[:20]}...")
-            return json.loads(cached_data)
+            return unpackb(cached_data)
     except Exception as e:
         logger.warning(f"⚠️ Cache read failed: {e}")
     return None
@@ -54,7 +53,7 @@ async def set_cached_context(cache_key: str, data: Dict, ttl: int = 3600):
         await redis_conn.setex(
             cache_key,
             ttl,
-            json.dumps(data)
+            packb(data)
         )
         logger.info(f"✅ Cached: {cache_key[:20]}...")
     except Exception as e:
@@ -0,0 +1,130 @@
+"""
+Cross-request micro-batching for the reranker.
+
+Concurrent chatbot requests each need ~10-20 query/document pairs scored.
+Instead of each one sending its own small `predict` to a thread, callers
+enqueue their pairs here; a single worker collects pairs for up to
+`max_wait_ms` (or until `max_batch_pairs`), scores them in one call (the
+reranker buckets them by token length so padding stays small), and hands
+each caller back its own scores.
+
+Only one batch runs at a time, so the model gets every core instead of
+several small batches fighting for them.
+"""
+
+import asyncio
+import time
+import logging
+import numpy as np
+from typing import List, Optional
+from app.services.cross_encoder_model import get_reranker
+from app.core.metrics import metrics
+from app.core.executors import run_in_pool
+from app.config import RERANK_BATCH_CONFIG
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class _Pending:
+    __slots__ = ("pairs", "future", "enqueued_at")
+
+    def __init__(self, pairs: List, future: asyncio.Future):
+        self.pairs = pairs
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+def _score(pairs: List) -> np.ndarray:
+    return get_reranker().score_pairs(pairs)
+
+
+class RerankBatcher:
+    def __init__(self, max_batch_pairs: int = 128, max_wait_ms: float = 3.0):
+        self.max_batch_pairs = max_batch_pairs
+        self.max_wait = max_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def score(self, pairs: List) -> np.ndarray:
+        """Scores for `pairs`, computed alongside other callers' pairs"""
+        if not pairs:
+            return np.empty(0, dtype=np.float32)
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_Pending(pairs, future))
+        return await future
+
+    async def aclose(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+            self._queue = None
+
+    # ================= INTERNALS =================
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def _collect(self) -> List[_Pending]:
+        batch = [await self._queue.get()]
+        size = len(batch[0].pairs)
+
+        def drain():
+            nonlocal size
+            while size < self.max_batch_pairs and not self._queue.empty():
+                item = self._queue.get_nowait()
+                batch.append(item)
+                size += len(item.pairs)
+
+        drain()
+        # Give concurrent requests a short window to join the batch
+        if size < self.max_batch_pairs and self.max_wait > 0:
+            await asyncio.sleep(self.max_wait)
+            drain()
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            # Callers that went away (client disconnect) don't need scoring
+            batch = [p for p in batch if not p.future.done()]
+            if not batch:
+                continue
+
+            pairs = [pair for pending in batch for pair in pending.pairs]
+            now = time.perf_counter()
+            for pending in batch:
+                metrics.observe("rerank_queue_wait_seconds", now - pending.enqueued_at)
+            metrics.observe("rerank_batch_pairs", len(pairs))
+            metrics.observe("rerank_batch_requests", len(batch))
+
+            try:
+                scores = await run_in_pool("rerank", _score, pairs)
+            except Exception as e:
+                logger.error(f"❌ Rerank batch of {len(pairs)} pairs failed: {e}")
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+                continue
+            finally:
+                metrics.observe("rerank_batch_seconds", time.perf_counter() - now)
+
+            offset = 0
+            for pending in batch:
+                n = len(pending.pairs)
+                if not pending.future.done():
+                    pending.future.set_result(scores[offset:offset + n])
+                offset += n
+
+
+rerank_batcher = RerankBatcher(
+    max_batch_pairs=RERANK_BATCH_CONFIG["max_batch_pairs"],
+    max_wait_ms=RERANK_BATCH_CONFIG["max_wait_ms"],
+)
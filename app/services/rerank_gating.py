@@ -0,0 +1,120 @@
+"""
+Confidence gating for the cross-encoder.
+
+Before reranking, the vector scores of the candidates decide how much
+cross-encoder work is worth doing:
+
+- "skip"  the k-th candidate leads the (k+1)-th by at least `skip_gap`,
+          so the top-k set is already clear; keep vector order
+- "short" the score distribution is peaked (low normalized entropy), so
+          only the head (`short_candidates_factor * top_k`) is reranked
+- "full"  otherwise, rerank every candidate
+
+Candidate sets can be recorded to JSONL for the offline harness in
+scripts/evaluate_rerank_gating.py, which replays them to measure latency
+saved against top-k overlap with full reranking.
+"""
+
+import json
+import random
+import time
+import logging
+import numpy as np
+from typing import List, Optional, Sequence, Tuple
+from app.core.metrics import metrics
+from app.core.executors import run_in_pool
+from app.config import RERANK_GATING_CONFIG
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SKIP, SHORT, FULL = "skip", "short", "full"
+
+
+class RerankGate:
+    def __init__(
+        self,
+        enabled: bool = True,
+        skip_gap: float = 0.08,
+        short_entropy: float = 0.80,
+        temperature: float = 0.05,
+        short_candidates_factor: int = 2
+    ):
+        self.enabled = enabled
+        self.skip_gap = skip_gap
+        self.short_entropy = short_entropy
+        self.temperature = temperature
+        self.short_candidates_factor = short_candidates_factor
+
+    def decide(self, vector_scores: Sequence[Optional[float]], top_k: int) -> Tuple[str, int]:
+        """
+        Returns (path, n_to_rerank) for candidates already sorted by vector
+        score (descending). n_to_rerank is 0 for "skip".
+        """
+        n = len(vector_scores)
+        if not self.enabled or n <= top_k or any(s is None for s in vector_scores):
+            return FULL, n
+
+        scores = np.asarray(vector_scores, dtype=np.float64)
+        if scores[top_k - 1] - scores[top_k] >= self.skip_gap:
+            return SKIP, 0
+
+        logits = (scores - scores.max()) / self.temperature
+        probs = np.exp(logits)
+        probs /= probs.sum()
+        entropy = float(-(probs * np.log(probs + 1e-12)).sum() / np.log(n))
+        short_n = self.short_candidates_factor * top_k
+        if entropy <= self.short_entropy and short_n < n:
+            return SHORT, short_n
+
+        return FULL, n
+
+
+def sort_by_vector_score(documents: List) -> List:
+    return sorted(
+        documents,
+        key=lambda d: d.vector_score if d.vector_score is not None else float("-inf"),
+        reverse=True
+    )
+
+
+def _append_record(path: str, record: dict):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+async def record_candidates(query: str, source: str, documents: List, top_k: int, gate_path: str):
+    """Append a candidate set for offline evaluation (best effort)"""
+    record_path = RERANK_GATING_CONFIG["record_path"]
+    if not record_path or random.random() > RERANK_GATING_CONFIG["record_sample_rate"]:
+        return
+    record = {
+        "ts": time.time(),
+        "query": query,
+        "source": source,
+        "top_k": top_k,
+        "path": gate_path,
+        "candidates": [
+            {"uuid": d.uuid, "title": d.title, "data": d.data, "version": d.version, "vector_score": d.vector_score}
+            for d in documents
+        ]
+    }
+    try:
+        await run_in_pool("io", _append_record, record_path, record)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not record rerank candidates: {e}")
+
+
+def log_decision(source: str, path: str, n_candidates: int, n_reranked: int):
+    metrics.increment("rerank_gate_total", path=path, source=source)
+    metrics.increment("rerank_gate_pairs_saved_total", n_candidates - n_reranked, source=source)
+    logger.info(f"🚦 Rerank gate [{source}]: {path} ({n_reranked}/{n_candidates} candidates reranked)")
+
+
+rerank_gate = RerankGate(
+    enabled=RERANK_GATING_CONFIG["enabled"],
+    skip_gap=RERANK_GATING_CONFIG["skip_gap"],
+    short_entropy=RERANK_GATING_CONFIG["short_entropy"],
+    temperature=RERANK_GATING_CONFIG["temperature"],
+    short_candidates_factor=RERANK_GATING_CONFIG["short_candidates_factor"],
+)
@@ -0,0 +1,141 @@
+"""
+Cross-encoder score cache.
+
+A rerank score depends only on the query text, the chunk text and the
+model, so it is cached under (query fingerprint, chunk uuid, chunk version).
+Common questions then only send chunks they haven't been scored against
+to the model.
+
+- in-process: bounded LRU
+- optional Redis backing: one hash per chunk (`rerank:{uuid}`), fields
+  `{fingerprint}:{version}`, so deleting a chunk drops all its scores with
+  a single DEL
+"""
+
+import hashlib
+import re
+import struct
+import logging
+from collections import OrderedDict, defaultdict
+from typing import Iterable, List, Optional, Tuple
+from app.services.redis import get_redis_client
+from app.core.metrics import metrics
+from app.config import RERANK_SCORE_CACHE_CONFIG, RERANKER_CONFIG
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_Key = Tuple[str, str, str]
+
+
+def query_fingerprint(query: str) -> str:
+    """Normalized query + active model/backend (scores differ between backends)"""
+    normalized = re.sub(r"\s+", " ", query.strip().lower())
+    model = f"{RERANKER_CONFIG['model_name']}|{RERANKER_CONFIG['backend']}|{RERANKER_CONFIG['onnx_quantize']}"
+    return hashlib.sha1(f"{model}|{normalized}".encode()).hexdigest()[:20]
+
+
+class RerankScoreCache:
+    def __init__(self, max_entries: int = 100000, redis_enabled: bool = False, redis_ttl: int = 86400):
+        self.max_entries = max_entries
+        self.redis_enabled = redis_enabled
+        self.redis_ttl = redis_ttl
+        self._local: "OrderedDict[_Key, float]" = OrderedDict()
+        # uuid -> cached keys, for invalidation
+        self._by_uuid = defaultdict(set)
+
+    # ================= PUBLIC API =================
+
+    async def get_many(self, fingerprint: str, chunks: List) -> List[Optional[float]]:
+        """Cached score per chunk (None where not cached)"""
+        scores: List[Optional[float]] = []
+        for chunk in chunks:
+            key = (fingerprint, chunk.uuid, chunk.version)
+            score = self._local.get(key)
+            if score is not None:
+                self._local.move_to_end(key)
+            scores.append(score)
+
+        missing = [i for i, s in enumerate(scores) if s is None]
+        if missing and self.redis_enabled:
+            for i, score in zip(missing, await self._redis_get(fingerprint, [chunks[i] for i in missing])):
+                if score is not None:
+                    scores[i] = score
+                    self._store_local((fingerprint, chunks[i].uuid, chunks[i].version), score)
+
+        hits = len(chunks) - sum(1 for s in scores if s is None)
+        metrics.increment("rerank_score_cache_hits_total", hits)
+        metrics.increment("rerank_score_cache_misses_total", len(chunks) - hits)
+        return scores
+
+    async def set_many(self, fingerprint: str, chunks: List, scores: Iterable[float]):
+        scores = [float(s) for s in scores]
+        for chunk, score in zip(chunks, scores):
+            self._store_local((fingerprint, chunk.uuid, chunk.version), score)
+        if self.redis_enabled and chunks:
+            await self._redis_set(fingerprint, chunks, scores)
+
+    async def invalidate(self, uuids: Iterable[str]):
+        """Drop every cached score for the given chunks (deleted / re-ingested)"""
+        uuids = [str(u) for u in uuids]
+        for uuid in uuids:
+            for key in self._by_uuid.pop(uuid, ()):
+                self._local.pop(key, None)
+        if self.redis_enabled and uuids:
+            try:
+                redis_conn = await get_redis_client()
+                if redis_conn is not None:
+                    await redis_conn.delete(*[f"rerank:{uuid}" for uuid in uuids])
+            except Exception as e:
+                logger.warning(f"⚠️ Rerank score invalidation failed: {e}")
+        if uuids:
+            logger.info(f"🧹 Invalidated rerank scores for {len(uuids)} chunk(s)")
+
+    # ================= INTERNALS =================
+
+    def _store_local(self, key: _Key, score: float):
+        self._local[key] = score
+        self._local.move_to_end(key)
+        self._by_uuid[key[1]].add(key)
+        while len(self._local) > self.max_entries:
+            old_key, _ = self._local.popitem(last=False)
+            keys = self._by_uuid.get(old_key[1])
+            if keys is not None:
+                keys.discard(old_key)
+                if not keys:
+                    del self._by_uuid[old_key[1]]
+
+    async def _redis_get(self, fingerprint: str, chunks: List) -> List[Optional[float]]:
+        try:
+            redis_conn = await get_redis_client()
+            if redis_conn is None:
+                return [None] * len(chunks)
+            pipe = redis_conn.pipeline(transaction=False)
+            for chunk in chunks:
+                pipe.hget(f"rerank:{chunk.uuid}", f"{fingerprint}:{chunk.version}")
+            raw = await pipe.execute()
+            return [struct.unpack("<f", v)[0] if v else None for v in raw]
+        except Exception as e:
+            logger.warning(f"⚠️ Rerank score cache read failed: {e}")
+            return [None] * len(chunks)
+
+    async def _redis_set(self, fingerprint: str, chunks: List, scores: List[float]):
+        try:
+            redis_conn = await get_redis_client()
+            if redis_conn is None:
+                return
+            pipe = redis_conn.pipeline(transaction=False)
+            for chunk, score in zip(chunks, scores):
+                key = f"rerank:{chunk.uuid}"
+                pipe.hset(key, f"{fingerprint}:{chunk.version}", struct.pack("<f", score))
+                pipe.expire(key, self.redis_ttl)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"⚠️ Rerank score cache write failed: {e}")
+
+
+rerank_score_cache = RerankScoreCache(
+    max_entries=RERANK_SCORE_CACHE_CONFIG["max_entries"],
+    redis_enabled=RERANK_SCORE_CACHE_CONFIG["redis_enabled"],
+    redis_ttl=RERANK_SCORE_CACHE_CONFIG["redis_ttl"],
+)
@@ -0,0 +1,110 @@
+"""
+Compact record for a retrieved chunk.
+
+RetrievedChunk is the only type that flows through retrieval, reranking,
+prompt formatting and the chatbot. Unlike raw Weaviate `Object`s it is
+small (`__slots__`), has no client references, and round-trips through
+msgpack, so retrieved context can be cached in Redis.
+"""
+
+from typing import Any, Optional
+import msgpack
+
+# msgpack extension code reserved for RetrievedChunk
+_CHUNK_EXT_CODE = 1
+
+
+class RetrievedChunk:
+    __slots__ = (
+        "uuid",
+        "title",
+        "data",
+        "version",
+        "document_id",
+        "vector_score",
+        "rerank_score",
+    )
+
+    def __init__(
+        self,
+        uuid: str,
+        title: str = "",
+        data: str = "",
+        version: str = "",
+        document_id: str = "",
+        vector_score: Optional[float] = None,
+        rerank_score: Optional[float] = None,
+    ):
+        self.uuid = uuid
+        self.title = title
+        self.data = data
+        self.version = version
+        self.document_id = document_id
+        self.vector_score = vector_score
+        self.rerank_score = rerank_score
+
+    @classmethod
+    def from_weaviate(cls, obj) -> "RetrievedChunk":
+        """Build from a Weaviate v4 `Object` (org or law collection)"""
+        props = obj.properties or {}
+        # Org chunks keep their text in `data`, law chunks in `text`
+        data = props.get("data") or props.get("text") or ""
+        version = props.get("version") or props.get("version_number") or ""
+
+        vector_score = None
+        metadata = getattr(obj, "metadata", None)
+        if metadata is not None:
+            if getattr(metadata, "distance", None) is not None:
+                vector_score = 1.0 - float(metadata.distance)
+            elif getattr(metadata, "score", None) is not None:
+                vector_score = float(metadata.score)
+
+        return cls(
+            uuid=str(obj.uuid),
+            title=props.get("title") or "",
+            data=data,
+            version=str(version),
+            document_id=str(props.get("document_id") or ""),
+            vector_score=vector_score,
+        )
+
+    def to_tuple(self) -> tuple:
+        return tuple(getattr(self, field) for field in self.__slots__)
+
+    @classmethod
+    def from_tuple(cls, values) -> "RetrievedChunk":
+        return cls(*values)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, RetrievedChunk) and self.to_tuple() == other.to_tuple()
+
+    def __repr__(self) -> str:
+        return (
+            f"RetrievedChunk(uuid={self.uuid!r}, title={self.title!r}, "
+            f"version={self.version!r}, vector_score={self.vector_score}, "
+            f"rerank_score={self.rerank_score})"
+        )
+
+
+# ================= BINARY ENCODING =================
+
+def _default(obj: Any):
+    if isinstance(obj, RetrievedChunk):
+        return msgpack.ExtType(_CHUNK_EXT_CODE, msgpack.packb(obj.to_tuple(), use_bin_type=True))
+    raise TypeError(f"Cannot serialize {type(obj).__name__}")
+
+
+def _ext_hook(code: int, data: bytes):
+    if code == _CHUNK_EXT_CODE:
+        return RetrievedChunk.from_tuple(msgpack.unpackb(data, raw=False))
+    return msgpack.ExtType(code, data)
+
+
+def packb(value: Any) -> bytes:
+    """msgpack-encode a value that may contain RetrievedChunk instances"""
+    return msgpack.packb(value, default=_default, use_bin_type=True)
+
+
+def unpackb(payload: bytes) -> Any:
+    """Inverse of packb()"""
+    return msgpack.unpackb(payload, ext_hook=_ext_hook, raw=False)
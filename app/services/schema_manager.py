@@ -1,25 +1,21 @@
 
 # create schema for Weaviate v4.16.4
-from app.services.weaviate_client import get_weaviate_client
+from app.services import weaviate_store
 from weaviate.classes.config import Property, DataType, Configure, VectorDistances, Tokenization
 
 
 async def create_schema(organization: str):
     """Create PolicyDocuments schema with vectorizer configuration"""
 
-    client = get_weaviate_client()
     try:
-        if not client.is_connected():
-            client.connect()
-
         # Check if collection already exists
-        if client.collections.exists(organization):
+        if await weaviate_store.collection_exists(organization):
             print(f"{organization} schema already exists.")
             return {"status": "exists", "message": f"Collection '{organization}' already exists."}
         
         else:
-            client.collections.create(
-                name=organization,
+            await weaviate_store.create_collection(
+                organization,
                 # vector_config=Configure.Vectorizer.text2vec_openai(
                 #     model="text-embedding-3-small",
                 #     vectorize_collection_name=False,
@@ -83,6 +79,11 @@ async def create_schema(organization: str):
                         vectorize_property_name=False,
                         tokenization=Tokenization.WORD
                     ),
+                    Property(
+                        name="is_latest",
+                        data_type=DataType.BOOL,
+                        index_filterable=True
+                    ),
                     Property(name="created_at", data_type=DataType.DATE),
                     Property(name="last_updated", data_type=DataType.DATE)
                 ]
@@ -94,18 +95,11 @@ async def create_schema(organization: str):
         print(f"Error creating {organization} schema----------: {e}")
         raise e
         
-    finally:
-        if client.is_connected():
-            client.close()
 
 async def delete_schema(organization: str):
     print("Deleting schema...")
-    client = get_weaviate_client()
     try:
-        if not client.is_connected():
-            client.connect()
-
-        existing = client.collections.list_all()
+        existing = await weaviate_store.list_collections()
         if organization not in existing:
             print(f"{organization} schema does not exist.")
             return {
@@ -113,7 +107,7 @@ async def delete_schema(organization: str):
                 "message": f"Collection '{organization}' does not exist."
             }
 
-        client.collections.delete(organization)
+        await weaviate_store.delete_collection(organization)
         print(f"{organization} schema deleted.")
         return {
             "status": "deleted",
@@ -123,8 +117,5 @@ async def delete_schema(organization: str):
     except Exception as e:
         print(f"Error deleting {organization} schema: {e}")
         raise e
-    finally:
-        if client.is_connected():
-            client.close()
 
     
\ No newline at end of file
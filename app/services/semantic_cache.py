@@ -0,0 +1,128 @@
+"""
+Semantic query cache.
+
+Maps a question embedding to the context-cache key of an earlier question
+that was close enough (cosine similarity >= threshold), so paraphrases such
+as "What is our falls policy?" / "what's our falls policy" share one cached
+context.
+
+Embeddings are kept per (organization, question_type) scope in a
+preallocated float32 ring buffer of L2-normalized rows, so a lookup is a
+single matrix-vector product (`matrix @ query`) plus an argmax - well under
+a millisecond for tens of thousands of entries.
+"""
+
+import time
+import logging
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from app.core.metrics import metrics
+from app.config import SEMANTIC_CACHE_CONFIG
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Buffers start small and double up to max_entries
+_INITIAL_CAPACITY = 256
+
+
+class _ScopeIndex:
+    """Ring buffer of normalized embeddings for one (organization, question_type)"""
+
+    def __init__(self, dim: int, max_entries: int):
+        self.dim = dim
+        self.max_entries = max_entries
+        capacity = min(_INITIAL_CAPACITY, max_entries)
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.expires_at = np.zeros(capacity, dtype=np.float64)
+        self.keys: List[Optional[str]] = [None] * capacity
+        self.size = 0
+        self.next_slot = 0
+
+    def _grow(self):
+        capacity = min(len(self.keys) * 2, self.max_entries)
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[:self.size] = self.vectors[:self.size]
+        expires_at = np.zeros(capacity, dtype=np.float64)
+        expires_at[:self.size] = self.expires_at[:self.size]
+        self.vectors = vectors
+        self.expires_at = expires_at
+        self.keys.extend([None] * (capacity - len(self.keys)))
+
+    def add(self, vector: np.ndarray, key: str, expires_at: float):
+        if self.size == len(self.keys) and self.size < self.max_entries:
+            self._grow()
+        slot = self.next_slot
+        self.vectors[slot] = vector
+        self.expires_at[slot] = expires_at
+        self.keys[slot] = key
+        self.size = max(self.size, slot + 1)
+        # Once full, overwrite the oldest entry
+        self.next_slot = (slot + 1) % self.max_entries if self.size == self.max_entries else self.size
+
+    def best_match(self, vector: np.ndarray, now: float) -> Tuple[Optional[str], float]:
+        if self.size == 0:
+            return None, 0.0
+        similarities = self.vectors[:self.size] @ vector
+        similarities[self.expires_at[:self.size] <= now] = -1.0
+        idx = int(np.argmax(similarities))
+        return self.keys[idx], float(similarities[idx])
+
+
+class SemanticCache:
+    def __init__(self, threshold: float = 0.95, max_entries: int = 20000, ttl: int = 3600):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._scopes: Dict[Tuple[str, str], _ScopeIndex] = {}
+
+    @staticmethod
+    def _normalize(embedding) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return None
+        return vector / norm
+
+    def lookup(self, organization: str, question_type: str, embedding) -> Optional[str]:
+        """Cache key of the most similar recent question, if above threshold"""
+        index = self._scopes.get((organization, question_type))
+        vector = self._normalize(embedding)
+        if index is None or vector is None or vector.shape[0] != index.dim:
+            metrics.increment("semantic_cache_misses_total")
+            return None
+
+        start = time.perf_counter()
+        key, similarity = index.best_match(vector, time.time())
+        metrics.observe("semantic_cache_lookup_seconds", time.perf_counter() - start)
+
+        if key is not None and similarity >= self.threshold:
+            metrics.increment("semantic_cache_hits_total")
+            logger.info(f"🧠 Semantic cache hit (similarity={similarity:.3f})")
+            return key
+        metrics.increment("semantic_cache_misses_total")
+        return None
+
+    def add(self, organization: str, question_type: str, embedding, key: str):
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+        scope = (organization, question_type)
+        index = self._scopes.get(scope)
+        if index is None or index.dim != vector.shape[0]:
+            index = self._scopes[scope] = _ScopeIndex(vector.shape[0], self.max_entries)
+        index.add(vector, key, time.time() + self.ttl)
+
+    def clear(self, organization: Optional[str] = None):
+        if organization is None:
+            self._scopes.clear()
+            return
+        for scope in [s for s in self._scopes if s[0] == organization]:
+            del self._scopes[scope]
+
+
+semantic_cache = SemanticCache(
+    threshold=SEMANTIC_CACHE_CONFIG["similarity_threshold"],
+    max_entries=SEMANTIC_CACHE_CONFIG["max_entries_per_scope"],
+    ttl=SEMANTIC_CACHE_CONFIG["ttl"],
+)
@@ -2,6 +2,7 @@ from app.config import BACKEND_HISTORY_URL, BACKEND_DOC_READ_COUNT_URL
 from typing import List, Dict
 from app.services.fetch_history import get_http_session
 from app.services.store_used_token import used_token_store
+from app.core.executors import run_in_pool
 import aiohttp
 import asyncio
 
@@ -60,9 +61,8 @@ async def save_data_parallel(
     
     async def post_token():
         try:
-            loop = asyncio.get_event_loop()
-            resp = await loop.run_in_executor(
-                None, 
+            resp = await run_in_pool(
+                "io",
                 lambda: used_token_store(
                     type='chatbot', 
                     used_tokens=token_data['used_tokens'], 
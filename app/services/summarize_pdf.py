@@ -1,13 +1,38 @@
 import asyncio
 import sys
 import os
-from openai import AsyncOpenAI
+import time
+import zlib
 from dotenv import load_dotenv
 
 load_dotenv()
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 from app.services.extract_content import extract_content_from_pdf
+from app.services.llm_gateway import llm_gateway
+from app.services.llm_scheduler import count_tokens
+from app.services.llm_cache import LLMResponseCache, cache_key
+from app.core.metrics import metrics
+from app.core.executors import run_in_pool
+from app.config import SUMMARY_CONFIG, SUMMARY_CHUNK_CACHE_CONFIG, LLM_CACHE_CONFIG
+
+# Bump when the chunk prompt changes so stored chunk summaries are not reused
+CHUNK_PROMPT_VERSION = "v2"
+# A chunk may end after a sentence whose trailing words hash to 0 mod this
+# (~1 in 16 sentences), so boundaries follow the content, not word offsets
+_BOUNDARY_DIVISOR = 16
+_BOUNDARY_WINDOW_WORDS = 8
+_SENTENCE_END = (".", "!", "?", ";", ":")
+
+chunk_summary_cache = LLMResponseCache(
+    enabled=SUMMARY_CHUNK_CACHE_CONFIG["enabled"],
+    backend=LLM_CACHE_CONFIG["backend"],
+    ttl=SUMMARY_CHUNK_CACHE_CONFIG["ttl"],
+    disk_path=SUMMARY_CHUNK_CACHE_CONFIG["disk_path"],
+    max_disk_mb=SUMMARY_CHUNK_CACHE_CONFIG["max_disk_mb"],
+    max_entry_kb=LLM_CACHE_CONFIG["max_entry_kb"],
+    name="chunk_summary"
+)
 
 class RealFile:
     def __init__(self, filepath):
@@ -22,39 +47,86 @@ class RealFile:
     async def seek(self, position):
         pass  
 
-def chunk_text(text, max_chars=6000):
-    """Split text into chunks that fit within token limits"""
+def is_chunk_boundary(words):
+    """Content-defined cut point: a sentence end whose last few words hash to 0"""
+    if not words[-1].endswith(_SENTENCE_END):
+        return False
+    window = " ".join(words[-_BOUNDARY_WINDOW_WORDS:]).lower()
+    return zlib.crc32(window.encode()) % _BOUNDARY_DIVISOR == 0
+
+def chunk_text(text, max_tokens=SUMMARY_CONFIG["chunk_tokens"]):
+    """
+    Split text into chunks of at most `max_tokens` tokens, on word boundaries.
+    After half of `max_tokens` a chunk ends at the first content-defined
+    boundary, so an edit only changes the chunks around it and the rest of a
+    new document version maps to the same chunks (and cached summaries).
+    """
     words = text.split()
+    min_tokens = max_tokens // 2
     chunks = []
     current_chunk = []
-    current_length = 0
+    current_tokens = 0
     
     for word in words:
-        if current_length + len(word) + 1 > max_chars:
+        # Leading space: how the word is tokenized mid-sentence
+        word_tokens = count_tokens(" " + word, SUMMARY_CONFIG["model"])
+        if current_chunk and current_tokens + word_tokens > max_tokens:
             chunks.append(' '.join(current_chunk))
-            current_chunk = [word]
-            current_length = len(word)
-        else:
-            current_chunk.append(word)
-            current_length += len(word) + 1
+            current_chunk = []
+            current_tokens = 0
+        current_chunk.append(word)
+        current_tokens += word_tokens
+        if current_tokens >= min_tokens and is_chunk_boundary(current_chunk):
+            chunks.append(' '.join(current_chunk))
+            current_chunk = []
+            current_tokens = 0
     
     if current_chunk:
         chunks.append(' '.join(current_chunk))
     
     return chunks
 
+def chunk_summary_key(text_chunk):
+    """Chunk summaries are stored by chunk content, independent of its position"""
+    return cache_key({
+        "kind": "chunk_summary",
+        "version": CHUNK_PROMPT_VERSION,
+        "model": SUMMARY_CONFIG["model"],
+        "max_tokens": SUMMARY_CONFIG["chunk_summary_tokens"],
+        "text": " ".join(text_chunk.split()),
+    })
+
+def group_by_tokens(texts, max_tokens):
+    """Consecutive groups of texts whose combined size stays within `max_tokens`"""
+    groups = []
+    current, current_tokens = [], 0
+    for text in texts:
+        tokens = count_tokens(text, SUMMARY_CONFIG["model"])
+        if current and current_tokens + tokens > max_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
+
 async def summarize_chunk_with_gpt4(text_chunk, chunk_num, total_chunks, timeout=120):
-    """Summarize a single chunk of text with timeout"""
+    """
+    Summarize a single chunk of text with timeout. Returns (summary or None, used_tokens).
+    The prompt doesn't mention the chunk position, so the summary can be reused
+    for the same text wherever it appears in a later version of the document.
+    """
     
     api_key = os.getenv("OPENAI_API_KEY")
     
     if not api_key:
         print("Error: OPENAI_API_KEY not found in environment variables")
-        return None
+        return None, 0
     
     try:
         prompt = f"""
-        This is chunk {chunk_num} of {total_chunks} from a document. Please provide a concise summary of this section.
+        This is one section of a longer document. Please provide a concise summary of this section.
         
         Text chunk:
         {text_chunk}
@@ -62,27 +134,102 @@ async def summarize_chunk_with_gpt4(text_chunk, chunk_num, total_chunks, timeout
         Provide a brief summary focusing on the key points in this section.
         """
         
-        async with AsyncOpenAI(api_key=api_key, timeout=timeout) as client:
-            response = await asyncio.wait_for(
-                client.chat.completions.create(
-                    model="gpt-4",
-                    messages=[
-                        {"role": "system", "content": "You are a helpful assistant that creates clear, concise summaries."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    max_tokens=500,
-                    temperature=0.3
-                ),
+        response = await asyncio.wait_for(
+            llm_gateway.chat_completion(
+                priority="summarization",
+                model=SUMMARY_CONFIG["model"],
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant that creates clear, concise summaries."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=SUMMARY_CONFIG["chunk_summary_tokens"],
+                temperature=0.3,
                 timeout=timeout
-            )
-        return response.choices[0].message.content
+            ),
+            timeout=timeout
+        )
+        summary = response.choices[0].message.content
+        if summary and response.choices[0].finish_reason == "stop":
+            await chunk_summary_cache.set(chunk_summary_key(text_chunk), {
+                "summary": summary,
+                "usage": {"total_tokens": response.usage.total_tokens}
+            })
+        return summary, response.usage.total_tokens
         
     except asyncio.TimeoutError:
         print(f"Timeout error for chunk {chunk_num} after {timeout} seconds")
-        return None
+        return None, 0
     except Exception as e:
         print(f"Error calling GPT-4 API for chunk {chunk_num}: {e}")
-        return None
+        return None, 0
+
+async def combine_summaries_with_gpt4(summaries, title, group_num, total_groups, timeout=120):
+    """Reduce step: merge consecutive section summaries into one. Returns (summary or None, used_tokens)"""
+    combined = "\n\n".join(summaries)
+    prompt = f"""
+        These are consecutive section summaries (group {group_num} of {total_groups}) from the document titled "{title}".
+        Merge them into one concise summary that keeps every key point, requirement and responsibility.
+        
+        Section summaries:
+        {combined}
+        """
+    try:
+        response = await asyncio.wait_for(
+            llm_gateway.chat_completion(
+                priority="summarization",
+                cache=True,
+                model=SUMMARY_CONFIG["model"],
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant that creates clear, concise summaries."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=SUMMARY_CONFIG["chunk_summary_tokens"],
+                temperature=0.3,
+                timeout=timeout
+            ),
+            timeout=timeout
+        )
+        return response.choices[0].message.content, response.usage.total_tokens
+    except asyncio.TimeoutError:
+        print(f"Timeout error for reduce group {group_num} after {timeout} seconds")
+    except Exception as e:
+        print(f"Error calling GPT-4 API for reduce group {group_num}: {e}")
+    # Keep the unreduced summaries rather than losing the section
+    return combined, 0
+
+async def summarize_chunks(chunks, timeout=120):
+    """
+    Map step. Chunks whose text was summarized before (e.g. the unchanged
+    sections of a new document version) reuse the stored summary; only the
+    others go to the LLM. Returns a (summary or None, used_tokens) pair per
+    chunk plus the number of reused chunks.
+    """
+    stored = await asyncio.gather(*(chunk_summary_cache.get(chunk_summary_key(chunk)) for chunk in chunks))
+    results = [(entry["summary"], 0) if entry else None for entry in stored]
+    missing = [i for i, result in enumerate(results) if result is None]
+
+    fresh = await run_bounded(
+        [summarize_chunk_with_gpt4(chunks[i], i + 1, len(chunks), timeout=timeout) for i in missing],
+        SUMMARY_CONFIG["max_concurrency"]
+    )
+    for i, result in zip(missing, fresh):
+        results[i] = result
+
+    reused = len(chunks) - len(missing)
+    metrics.increment("summarize_chunks_total", reused, source="reused")
+    metrics.increment("summarize_chunks_total", len(missing), source="llm")
+    print(f"♻️ Reused {reused}/{len(chunks)} chunk summaries, summarizing {len(missing)} new chunk(s)")
+    return results, reused
+
+async def run_bounded(coroutines, limit):
+    """Run coroutines concurrently, at most `limit` at a time, preserving order"""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def bounded(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*(bounded(c) for c in coroutines))
 
 async def summarize_with_gpt4_with_retry(text, title, max_retries=3, base_timeout=120):
     """
@@ -119,7 +266,16 @@ async def summarize_with_gpt4_with_retry(text, title, max_retries=3, base_timeou
     }
 
 async def summarize_with_gpt4(text, title, timeout=300):
-    """Summarize the extracted text using GPT-4 with chunking for large documents"""
+    """
+    Map-reduce summary of the extracted text:
+    - map: token-sized chunks are summarized concurrently (max_concurrency at a time);
+      chunks summarized before, e.g. in a previous version, are taken from
+      chunk_summary_cache
+    - reduce: while the chunk summaries are too large for one prompt they are
+      merged group by group, level by level
+    - final: one executive summary from what is left
+    Per-stage timings and token usage are returned under "stats".
+    """
     
     api_key = os.getenv("OPENAI_API_KEY")
     
@@ -128,43 +284,67 @@ async def summarize_with_gpt4(text, title, timeout=300):
         print(f"Error: {error_msg}")
         return {"summary": None, "message": error_msg, "used_tokens": 0}
     
+    stats = {"chunks": 0, "reused_chunks": 0, "reduce_levels": 0, "stages": {}}
+
+    def record_stage(stage, started, tokens):
+        seconds = time.perf_counter() - started
+        stats["stages"][stage] = {"seconds": round(seconds, 2), "tokens": tokens}
+        metrics.observe("summarize_stage_seconds", seconds, stage=stage)
+        metrics.increment("summarize_stage_tokens_total", tokens, stage=stage)
+        print(f"⏱️ Summary {stage}: {seconds:.2f}s, {tokens} tokens")
+
     try:
         total_tokens = 0
+        # Tokenizing a long document takes a while; keep it off the event loop
+        document_tokens = await run_in_pool("io", count_tokens, text, SUMMARY_CONFIG["model"])
         
-        if len(text) > 6000:
-            print(f"Text is too long ({len(text)} characters). Splitting into chunks...")
+        if document_tokens > SUMMARY_CONFIG["chunk_tokens"]:
+            print(f"Text is too long ({document_tokens} tokens). Splitting into chunks...")
             
-            chunks = chunk_text(text)
+            chunks = await run_in_pool("io", chunk_text, text)
+            stats["chunks"] = len(chunks)
             print(f"Split into {len(chunks)} chunks")
             
-            chunk_summaries = []
-            failed_chunks = []
-            
-            # Process chunks with individual timeouts
-            for i, chunk in enumerate(chunks, 1):
-                print(f"Summarizing chunk {i}/{len(chunks)}...")
-                try:
-                    chunk_summary = await summarize_chunk_with_gpt4(
-                        chunk, i, len(chunks), timeout=timeout
-                    )
-                    if chunk_summary:
-                        chunk_summaries.append(chunk_summary)
-                    else:
-                        failed_chunks.append(i)
-                except Exception as e:
-                    print(f"Failed to summarize chunk {i}: {e}")
-                    failed_chunks.append(i)
+            # ================= MAP =================
+            started = time.perf_counter()
+            results, stats["reused_chunks"] = await summarize_chunks(chunks, timeout=timeout)
+            chunk_summaries = [summary for summary, _ in results if summary]
+            failed_chunks = [i for i, (summary, _) in enumerate(results, 1) if not summary]
+            map_tokens = sum(tokens for _, tokens in results)
+            total_tokens += map_tokens
+            record_stage("map", started, map_tokens)
             
             if not chunk_summaries:
                 return {
                     "summary": None,
                     "message": "All chunks failed to summarize",
-                    "used_tokens": 0
+                    "used_tokens": total_tokens
                 }
             
             if failed_chunks:
                 print(f"Warning: Failed to summarize chunks: {failed_chunks}")
             
+            # ================= REDUCE =================
+            started = time.perf_counter()
+            reduce_tokens = 0
+            while len(chunk_summaries) > 1:
+                groups = group_by_tokens(chunk_summaries, SUMMARY_CONFIG["reduce_input_tokens"])
+                if len(groups) == 1:
+                    break
+                stats["reduce_levels"] += 1
+                print(f"Reducing {len(chunk_summaries)} summaries in {len(groups)} groups (level {stats['reduce_levels']})...")
+                results = await run_bounded(
+                    [combine_summaries_with_gpt4(group, title, i, len(groups), timeout=timeout) for i, group in enumerate(groups, 1)],
+                    SUMMARY_CONFIG["max_concurrency"]
+                )
+                reduce_tokens += sum(tokens for _, tokens in results)
+                reduced = [summary for summary, _ in results]
+                if len(reduced) >= len(chunk_summaries):
+                    break  # no group could merge anything; stop instead of looping
+                chunk_summaries = reduced
+            total_tokens += reduce_tokens
+            record_stage("reduce", started, reduce_tokens)
+            
             combined_summaries = "\n\n".join(chunk_summaries)
             
             print("Creating final comprehensive summary...")
@@ -180,25 +360,8 @@ async def summarize_with_gpt4(text, title, timeout=300):
             Format the summary in a clear, structured manner.
             """
             
-            async with AsyncOpenAI(api_key=api_key, timeout=timeout) as client:
-                response = await asyncio.wait_for(
-                    client.chat.completions.create(
-                        model="gpt-4",
-                        messages=[
-                            {"role": "system", "content": "You are a helpful assistant that creates clear, concise summaries of documents."},
-                            {"role": "user", "content": final_prompt}
-                        ],
-                        max_tokens=1500,
-                        temperature=0.3
-                    ),
-                    timeout=timeout
-                )
-
-            summary_content = response.choices[0].message.content
-            total_tokens = response.usage.total_tokens
-
         else:
-            prompt = f"""
+            final_prompt = f"""
             Please provide a comprehensive summary of the following document titled "{title}".
             
             Document content:
@@ -211,28 +374,34 @@ async def summarize_with_gpt4(text, title, timeout=300):
             """
             
             print("Generating summary with GPT-4...")
-            
-            async with AsyncOpenAI(api_key=api_key, timeout=timeout) as client:
-                response = await asyncio.wait_for(
-                    client.chat.completions.create(
-                        model="gpt-4",
-                        messages=[
-                            {"role": "system", "content": "You are a helpful assistant that creates clear, concise summaries of documents."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        max_tokens=1500,
-                        temperature=0.3
-                    ),
-                    timeout=timeout
-                )
-            
-            summary_content = response.choices[0].message.content
-            total_tokens = response.usage.total_tokens
+        
+        # ================= FINAL =================
+        started = time.perf_counter()
+        response = await asyncio.wait_for(
+            llm_gateway.chat_completion(
+                priority="summarization",
+                cache=True,
+                model=SUMMARY_CONFIG["model"],
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant that creates clear, concise summaries of documents."},
+                    {"role": "user", "content": final_prompt}
+                ],
+                max_tokens=SUMMARY_CONFIG["final_summary_tokens"],
+                temperature=0.3,
+                timeout=timeout
+            ),
+            timeout=timeout
+        )
+        
+        summary_content = response.choices[0].message.content
+        total_tokens += response.usage.total_tokens
+        record_stage("final", started, response.usage.total_tokens)
 
         return {
             "summary": summary_content,
             "used_tokens": total_tokens,
-            "message": "Success"
+            "message": "Success",
+            "stats": stats
         }
 
     except asyncio.TimeoutError:
@@ -1,3 +1,9 @@
+from functools import lru_cache
+
+
+# Static per question type: memoized so every call returns the same string,
+# which keeps it a byte-identical prompt prefix for OpenAI prompt caching
+@lru_cache(maxsize=None)
 def build_system_prompt(question_type: str) -> str:
     """Build modular system prompt based on question type - Always human-like, never generic"""
     
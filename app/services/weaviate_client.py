@@ -1,9 +1,18 @@
 import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Optional
 import weaviate
 from weaviate.auth import AuthApiKey
-from app.config import WEAVIATE_API_KEY, WEAVIATE_HOST, OPENAI_API_KEY
+from app.config import WEAVIATE_API_KEY, WEAVIATE_HOST, OPENAI_API_KEY, WEAVIATE_POOL_CONFIG
 
-def get_weaviate_client():
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _connection_headers() -> Optional[dict]:
     if not WEAVIATE_API_KEY:
         raise ValueError("❌ WEAVIATE_API_KEY is not set in environment/config.")
     if not WEAVIATE_HOST:
@@ -12,10 +21,187 @@ def get_weaviate_client():
     headers = {}
     if OPENAI_API_KEY:
         headers["X-OpenAI-Api-Key"] = OPENAI_API_KEY
+    return headers if headers else None
 
+
+def create_weaviate_client():
+    """Open a brand-new Weaviate Cloud connection (caller owns its lifecycle)"""
+    headers = _connection_headers()
     client = weaviate.connect_to_weaviate_cloud(
         cluster_url=f"https://{WEAVIATE_HOST}",
         auth_credentials=AuthApiKey(WEAVIATE_API_KEY),
-        headers=headers if headers else None,
+        headers=headers,
     )
     return client
+
+
+def create_async_weaviate_client():
+    """Build a WeaviateAsyncClient for Weaviate Cloud (must be awaited .connect())"""
+    headers = _connection_headers()
+    return weaviate.use_async_with_weaviate_cloud(
+        cluster_url=f"https://{WEAVIATE_HOST}",
+        auth_credentials=AuthApiKey(WEAVIATE_API_KEY),
+        headers=headers,
+    )
+
+
+class WeaviateClientManager:
+    """
+    Process-wide owner of the Weaviate connections.
+
+    Hands out one shared client instead of opening a fresh cloud session per
+    call, so TLS and gRPC handshakes are paid once per worker. Clients are
+    health-checked at most every `health_check_interval` seconds and rebuilt
+    transparently when the check fails.
+
+    Two flavours are managed:
+    - the async client, used by every request path on the event loop
+    - the sync client, kept for code that runs inside worker threads
+    """
+
+    def __init__(self, health_check_interval: float = 30.0):
+        self.health_check_interval = health_check_interval
+        self._client = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self._async_client = None
+        self._async_last_check = 0.0
+        self._async_lock: Optional[asyncio.Lock] = None
+
+    def start(self):
+        """Connect the sync client eagerly"""
+        self.get_client()
+        logger.info("✅ Weaviate client manager started")
+
+    async def start_async(self):
+        """Connect the async client eagerly (called from the FastAPI lifespan)"""
+        await self.get_async_client()
+        logger.info("✅ Weaviate async client manager started")
+
+    # ---------------- async client ----------------
+
+    async def get_async_client(self):
+        """Return the shared, healthy async client, reconnecting if needed"""
+        client = self._async_client
+        if client is not None and time.monotonic() - self._async_last_check < self.health_check_interval:
+            return client
+
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+
+        async with self._async_lock:
+            if self._async_client is not None and await self._is_async_healthy(self._async_client):
+                self._async_last_check = time.monotonic()
+                return self._async_client
+            return await self._reconnect_async_locked()
+
+    async def reconnect_async(self):
+        """Force a fresh async connection (e.g. after a transport error)"""
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        async with self._async_lock:
+            return await self._reconnect_async_locked()
+
+    async def aclose(self):
+        """Close both clients (called on FastAPI shutdown)"""
+        if self._async_client is not None:
+            try:
+                await self._async_client.close()
+            except Exception as e:
+                logger.warning(f"⚠️ Weaviate async close failed: {e}")
+            self._async_client = None
+            logger.info("🔌 Weaviate async client closed")
+        self.close()
+
+    async def _is_async_healthy(self, client) -> bool:
+        try:
+            if not client.is_connected():
+                await client.connect()
+            return await client.is_ready()
+        except Exception as e:
+            logger.warning(f"⚠️ Weaviate async health check failed: {e}")
+            return False
+
+    async def _reconnect_async_locked(self):
+        if self._async_client is not None:
+            try:
+                await self._async_client.close()
+            except Exception:
+                pass
+            self._async_client = None
+
+        logger.info("🔗 Connecting async client to Weaviate...")
+        client = create_async_weaviate_client()
+        await client.connect()
+        self._async_client = client
+        self._async_last_check = time.monotonic()
+        return self._async_client
+
+    # ---------------- sync client ----------------
+
+    def get_client(self):
+        """Return the shared, healthy client, reconnecting if needed"""
+        client = self._client
+        if client is not None and not self._check_due():
+            return client
+
+        with self._lock:
+            if self._client is not None and self._is_healthy(self._client):
+                self._last_check = time.monotonic()
+                return self._client
+            return self._reconnect_locked()
+
+    def reconnect(self):
+        """Force a fresh connection (e.g. after a transport error)"""
+        with self._lock:
+            return self._reconnect_locked()
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                try:
+                    self._client.close()
+                except Exception as e:
+                    logger.warning(f"⚠️ Weaviate close failed: {e}")
+                self._client = None
+                logger.info("🔌 Weaviate client closed")
+
+    def _check_due(self) -> bool:
+        return time.monotonic() - self._last_check >= self.health_check_interval
+
+    def _is_healthy(self, client) -> bool:
+        try:
+            if not client.is_connected():
+                client.connect()
+            return client.is_ready()
+        except Exception as e:
+            logger.warning(f"⚠️ Weaviate health check failed: {e}")
+            return False
+
+    def _reconnect_locked(self):
+        if self._client is not None:
+            try:
+                self._client.close()
+            except Exception:
+                pass
+            self._client = None
+
+        logger.info("🔗 Connecting to Weaviate...")
+        self._client = create_weaviate_client()
+        self._last_check = time.monotonic()
+        return self._client
+
+
+weaviate_manager = WeaviateClientManager(
+    health_check_interval=WEAVIATE_POOL_CONFIG["health_check_interval"]
+)
+
+
+def get_weaviate_client():
+    """Shared sync Weaviate client. Do NOT close it - the app lifespan owns it."""
+    return weaviate_manager.get_client()
+
+
+async def get_async_weaviate_client():
+    """Shared async Weaviate client. Do NOT close it - the app lifespan owns it."""
+    return await weaviate_manager.get_async_client()
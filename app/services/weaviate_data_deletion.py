@@ -1,7 +1,9 @@
-from app.services.weaviate_client import get_weaviate_client
+from app.services import weaviate_store
 from weaviate.classes.query import Filter
 from app.services.s3_manager import S3Manager
 from app.utils.object_key_parser import parse_object_key
+from app.services.latest_version_index import refresh_latest_flags
+from app.services.rerank_score_cache import rerank_score_cache
 
 
 async def delete_weaviate_data(
@@ -9,13 +11,7 @@ async def delete_weaviate_data(
     document_id: str,
     version_id: str
 ):
-    client = get_weaviate_client()
     try:
-        if not client.is_connected():
-            client.connect()
-
-        collection = client.collections.use(organization)
-
         # Build combined filter
         metadata_filter = (
             Filter.by_property("document_id").equal(document_id)
@@ -23,7 +19,7 @@ async def delete_weaviate_data(
         )
 
         # Perform deletion and capture result
-        delete_result = collection.data.delete_many(where=metadata_filter)
+        delete_result = await weaviate_store.delete_many(organization, metadata_filter, verbose=True)
         print("delete_result:", delete_result)
 
         # Safely get count of deleted objects
@@ -40,6 +36,14 @@ async def delete_weaviate_data(
                 "message": f"No document found with document_id '{document_id}' and version '{version_id}'."
             }
 
+        # Deleted chunks must not be served cached rerank scores
+        await rerank_score_cache.invalidate(
+            obj.uuid for obj in (getattr(delete_result, "objects", None) or [])
+        )
+
+        # Promote the next highest remaining version if the latest was removed
+        await refresh_latest_flags(organization, document_id)
+
         # # Delete from S3 if present
         # try:
         #     s3 = S3Manager()
@@ -57,7 +61,4 @@ async def delete_weaviate_data(
         print(f"Error during deletion: {e}")
         return {"status": "error", "message": str(e)}
 
-    finally:
-        if client.is_connected():
-            client.close()
 
@@ -1,6 +1,6 @@
 from datetime import datetime, timezone
 import json
-from app.services.weaviate_client import get_weaviate_client
+from app.services import weaviate_store
 from app.services.extract_content import extract_content_from_pdf
 from app.services.s3_manager import S3Manager
 from fastapi.responses import JSONResponse
@@ -8,6 +8,7 @@ from uuid import uuid5, NAMESPACE_URL
 import os
 from weaviate.classes.query import Filter
 from app.services.extract_plain_text_from_html import extract_plain_text
+from app.services.latest_version_index import refresh_latest_flags
 
 s3 = S3Manager()
 
@@ -29,12 +30,11 @@ def chunk_text(text, max_chars=7000):
     return chunks
 
 
-async def get_next_version(client, collection_name, title):
+async def get_next_version(collection_name, title):
     """Get the next version number for a document with the given title"""
-    collection = client.collections.get(collection_name)
-    
     # Query for existing documents with the same title
-    results = collection.query.fetch_objects(
+    results = await weaviate_store.fetch_objects(
+        collection_name,
         filters=Filter.by_property("title").equal(title)
     )
     
@@ -62,16 +62,12 @@ async def get_next_version(client, collection_name, title):
 from weaviate.classes.query import Filter
 
 
-async def is_exist_document(client, collection_name, doc_db_id, version_id):
+async def is_exist_document(collection_name, doc_db_id, version_id):
     """Check if a document with the same doc_db_id and version_id exists"""
-    if not client.is_connected():
-        client.connect()
-    
-    collection = client.collections.get(collection_name)
-    
     # Query for existing documents with the same doc_db_id and version_id
     # Use & operator instead of .and_filter()
-    results = collection.query.fetch_objects(
+    results = await weaviate_store.fetch_objects(
+        collection_name,
         filters=(
             Filter.by_property("document_id").equal(str(doc_db_id)) &
             Filter.by_property("version_id").equal(version_id)
@@ -85,14 +81,13 @@ async def is_exist_document(client, collection_name, doc_db_id, version_id):
 
 from app.services.schema_manager import create_schema
 async def weaviate_insertion(organization, doc_db_id, document_type, content, category, title, version_id, version_number):
-    client = get_weaviate_client()
     try:
         # Ensure schema exists
         response = await create_schema(organization)
         print("Schema creation response:", response)
 
         # check existing document with same doc_db_id and version_id
-        exist = await is_exist_document(client, organization, doc_db_id, version_id)
+        exist = await is_exist_document(organization, doc_db_id, version_id)
         if exist:
             return JSONResponse(
                 status_code=200,
@@ -112,11 +107,8 @@ async def weaviate_insertion(organization, doc_db_id, document_type, content, ca
         # Insert new chunks
         for idx, chunk in enumerate(chunks):
             try:
-                if not client.is_connected():
-                    client.connect()
-                collection = client.collections.get(organization)
-
-                collection.data.insert(
+                await weaviate_store.insert(
+                    organization,
                     properties={
                         "document_id": str(doc_db_id),
                         "document_type": document_type,
@@ -125,6 +117,7 @@ async def weaviate_insertion(organization, doc_db_id, document_type, content, ca
                         "version_id": version_id,
                         "version_number": version_number,
                         "data": chunk,
+                        "is_latest": True,
                         "created_at": datetime.now(timezone.utc).isoformat(),
                         "last_updated": datetime.now(timezone.utc).isoformat()
                     }
@@ -132,6 +125,10 @@ async def weaviate_insertion(organization, doc_db_id, document_type, content, ca
             except Exception as e:
                 raise e
 
+        # New chunks go in flagged latest; older versions are demoted after
+        # (or the new ones, if an older version was uploaded late)
+        await refresh_latest_flags(organization, doc_db_id)
+
         return JSONResponse(
             status_code=201,
             content={
@@ -143,6 +140,4 @@ async def weaviate_insertion(organization, doc_db_id, document_type, content, ca
     except Exception as e:
         raise e
 
-    finally:
-        client.close()
 
@@ -1,23 +1,19 @@
 from warnings import filters
-from app.services.weaviate_client import get_weaviate_client
+from app.services.weaviate_client import get_weaviate_client, weaviate_manager
+from app.services import weaviate_store
 from weaviate.classes.query import MetadataQuery, Filter
 from fastapi.responses import JSONResponse
 from collections import OrderedDict
 
 class_name = "HomeCare"
-client = get_weaviate_client()
 
 #  Semantic Search - Text similarity based search
 async def semantic_search(query_text: str, limit: int = 5):
     """Search documents based on semantic similarity"""
     try:
-        if not client.is_connected():
-            client.connect()
-
-        collection = client.collections.get(class_name)
-
-        response = collection.query.near_text(
-            query=query_text,
+        response = await weaviate_store.near_text(
+            class_name,
+            query_text,
             limit=limit,
             return_metadata=MetadataQuery(distance=True, score=True)
         )
@@ -51,14 +47,9 @@ async def semantic_search(query_text: str, limit: int = 5):
 #  Get all documents (paginated)
 async def get_all_documents(limit: int = 20, offset: int = 0):
     """Get all documents with pagination"""
-    client = get_weaviate_client()
     try:
-        if not client.is_connected():
-            client.connect()
-        
-        collection = client.collections.get(class_name)
-        
-        response = collection.query.fetch_objects(
+        response = await weaviate_store.fetch_objects(
+            class_name,
             limit=limit,
             offset=offset
         )
@@ -102,15 +93,10 @@ async def get_all_documents(limit: int = 20, offset: int = 0):
 # Hybrid search (combines semantic and keyword search)
 async def hybrid_search(query_text: str, limit: int = 5, alpha: float = 0.5, offset: int = 0):
     """Hybrid search combining semantic and keyword search"""
-    client = get_weaviate_client()
     try:
-        if not client.is_connected():
-            client.connect()
-        
-        collection = client.collections.get(class_name)
-        
-        response = collection.query.hybrid(
-            query=query_text,
+        response = await weaviate_store.hybrid(
+            class_name,
+            query_text,
             alpha=alpha,  # 0.0 = pure keyword, 1.0 = pure semantic
             limit=limit,
             return_metadata=MetadataQuery(score=True)
@@ -153,15 +139,10 @@ async def hybrid_search(query_text: str, limit: int = 5, alpha: float = 0.5, off
         })
     
 async def hybrid_search_with_category(query_text: str, category: str, limit: int = 5, alpha: float = 0.7, offset: int = 0):
-    client = get_weaviate_client()
     try:
-        if not client.is_connected():
-            client.connect()
-        
-        collection = client.collections.get(class_name)
-        
-        response = collection.query.hybrid(
-            query=query_text,
+        response = await weaviate_store.hybrid(
+            class_name,
+            query_text,
             alpha=alpha,
             limit=100,  # Increase limit to allow room for filtering
             return_metadata=MetadataQuery(score=True)
@@ -276,9 +257,7 @@ def efficient_query(query_text: str, category: str, document_type: str,
     Step 2: Pick latest version per title
     Step 3: Do near_text (vector search) only on those UUIDs
     """
-
-    if not client.is_connected():
-        client.connect()
+    client = get_weaviate_client()
 
     collection = client.collections.get("HomeCare")
 
@@ -339,7 +318,7 @@ if __name__ == "__main__":
         )
         print(f"\nTotal results: {len(results)}")
     finally:
-        client.close()
+        weaviate_manager.close()
 
 
 
@@ -0,0 +1,188 @@
+"""
+Async data-access layer over the shared WeaviateAsyncClient.
+
+Every request path talks to Weaviate through these helpers so that:
+- no query blocks the event loop (the v4 async client is used end to end)
+- every call has a deadline (`timeout`), after which the in-flight request
+  is cancelled and `asyncio.TimeoutError` is raised to the caller
+- cancellation of the calling task (e.g. client disconnect) propagates
+  straight into the Weaviate request
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from app.services.weaviate_client import get_async_weaviate_client
+from app.config import WEAVIATE_POOL_CONFIG
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUERY_TIMEOUT = WEAVIATE_POOL_CONFIG["query_timeout"]
+WRITE_TIMEOUT = WEAVIATE_POOL_CONFIG["write_timeout"]
+
+
+async def _run(operation: str, call: Callable[[Any], Awaitable], timeout: Optional[float]):
+    """Run `call(client)` against the shared async client under a deadline"""
+    client = await get_async_weaviate_client()
+    try:
+        return await asyncio.wait_for(call(client), timeout=timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"⏱️ Weaviate {operation} timed out after {timeout}s")
+        raise
+
+
+# ================= SCHEMA =================
+
+async def collection_exists(name: str, timeout: Optional[float] = QUERY_TIMEOUT) -> bool:
+    return await _run(
+        f"exists({name})",
+        lambda client: client.collections.exists(name),
+        timeout
+    )
+
+
+async def list_collections(timeout: Optional[float] = QUERY_TIMEOUT) -> Dict:
+    return await _run(
+        "list_all",
+        lambda client: client.collections.list_all(),
+        timeout
+    )
+
+
+async def create_collection(name: str, timeout: Optional[float] = WRITE_TIMEOUT, **config):
+    return await _run(
+        f"create({name})",
+        lambda client: client.collections.create(name=name, **config),
+        timeout
+    )
+
+
+async def get_collection_config(name: str, timeout: Optional[float] = QUERY_TIMEOUT):
+    return await _run(
+        f"config.get({name})",
+        lambda client: client.collections.get(name).config.get(),
+        timeout
+    )
+
+
+async def add_property(name: str, prop, timeout: Optional[float] = WRITE_TIMEOUT):
+    return await _run(
+        f"config.add_property({name})",
+        lambda client: client.collections.get(name).config.add_property(prop),
+        timeout
+    )
+
+
+async def delete_collection(name: str, timeout: Optional[float] = WRITE_TIMEOUT):
+    return await _run(
+        f"delete({name})",
+        lambda client: client.collections.delete(name),
+        timeout
+    )
+
+
+# ================= QUERIES =================
+
+async def near_text(
+    collection_name: str,
+    query: str,
+    timeout: Optional[float] = QUERY_TIMEOUT,
+    **kwargs
+):
+    return await _run(
+        f"near_text({collection_name})",
+        lambda client: client.collections.get(collection_name).query.near_text(query=query, **kwargs),
+        timeout
+    )
+
+
+async def near_vector(
+    collection_name: str,
+    vector: List[float],
+    timeout: Optional[float] = QUERY_TIMEOUT,
+    **kwargs
+):
+    return await _run(
+        f"near_vector({collection_name})",
+        lambda client: client.collections.get(collection_name).query.near_vector(near_vector=vector, **kwargs),
+        timeout
+    )
+
+
+async def hybrid(
+    collection_name: str,
+    query: str,
+    timeout: Optional[float] = QUERY_TIMEOUT,
+    **kwargs
+):
+    return await _run(
+        f"hybrid({collection_name})",
+        lambda client: client.collections.get(collection_name).query.hybrid(query=query, **kwargs),
+        timeout
+    )
+
+
+async def fetch_objects(
+    collection_name: str,
+    timeout: Optional[float] = QUERY_TIMEOUT,
+    **kwargs
+):
+    return await _run(
+        f"fetch_objects({collection_name})",
+        lambda client: client.collections.get(collection_name).query.fetch_objects(**kwargs),
+        timeout
+    )
+
+
+# ================= WRITES =================
+
+async def insert(
+    collection_name: str,
+    properties: Dict,
+    timeout: Optional[float] = WRITE_TIMEOUT,
+    **kwargs
+):
+    return await _run(
+        f"insert({collection_name})",
+        lambda client: client.collections.get(collection_name).data.insert(properties=properties, **kwargs),
+        timeout
+    )
+
+
+async def update(
+    collection_name: str,
+    uuid,
+    properties: Dict,
+    timeout: Optional[float] = WRITE_TIMEOUT
+):
+    return await _run(
+        f"update({collection_name})",
+        lambda client: client.collections.get(collection_name).data.update(uuid=uuid, properties=properties),
+        timeout
+    )
+
+
+async def insert_many(
+    collection_name: str,
+    objects: List,
+    timeout: Optional[float] = WRITE_TIMEOUT
+):
+    return await _run(
+        f"insert_many({collection_name})",
+        lambda client: client.collections.get(collection_name).data.insert_many(objects),
+        timeout
+    )
+
+
+async def delete_many(
+    collection_name: str,
+    where,
+    timeout: Optional[float] = WRITE_TIMEOUT,
+    **kwargs
+):
+    return await _run(
+        f"delete_many({collection_name})",
+        lambda client: client.collections.get(collection_name).data.delete_many(where=where, **kwargs),
+        timeout
+    )
@@ -0,0 +1,114 @@
+"""
+Compare the PyTorch and ONNX Runtime reranker backends.
+
+Checks score parity and top-k ordering on the same query/document pairs,
+then measures latency for each backend. Exits non-zero if parity fails,
+so it can gate a switch to RERANKER_BACKEND=onnx.
+
+Usage:
+    python -m scripts.benchmark_reranker [--docs 20] [--runs 30] [--no-quantize] [--threads 0]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+import numpy as np
+from app.config import RAG_CONFIG, RERANKER_CONFIG
+from app.services.cross_encoder_model import LocalReranker, OnnxReranker
+
+QUERIES = [
+    "How do I report a near miss?",
+    "What are the requirements for restrictive practices under the Aged Care Act?",
+    "Who is responsible for infection control audits?",
+    "What is our falls prevention policy?",
+    "How long must incident records be kept?",
+]
+
+PASSAGES = [
+    "A near miss is an incident that could have caused harm but did not. Staff must complete an incident form within 24 hours and notify their supervisor.",
+    "Restrictive practices may only be used as a last resort, with informed consent, and must be documented in the behaviour support plan.",
+    "The infection prevention and control lead conducts monthly audits of hand hygiene, PPE use and environmental cleaning.",
+    "Residents assessed as high falls risk receive a falls management plan, hip protectors where appropriate, and regular review by a physiotherapist.",
+    "Incident records, including investigations and outcomes, are retained for at least seven years after the resident leaves the service.",
+    "Medication must be administered by staff who have completed the medication competency and are authorised by the registered nurse.",
+    "Complaints can be made verbally or in writing and are acknowledged within two business days.",
+    "Visitors must sign in at reception and follow any infection control directions displayed at the entrance.",
+    "Approved providers must comply with the Quality Standards and notify the Commission of reportable incidents under the SIRS.",
+    "Staff rosters are published two weeks in advance and shift swaps require manager approval.",
+]
+
+
+def build_pairs(query: str, n_docs: int):
+    return [[query, PASSAGES[i % len(PASSAGES)]] for i in range(n_docs)]
+
+
+def time_backend(reranker, pair_sets, runs: int):
+    # Warm-up run (graph optimisation, allocator)
+    reranker.score_pairs(pair_sets[0])
+    samples = []
+    for i in range(runs):
+        pairs = pair_sets[i % len(pair_sets)]
+        start = time.perf_counter()
+        reranker.score_pairs(pairs)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": statistics.median(samples),
+        "p95_ms": samples[int(0.95 * (len(samples) - 1))],
+        "mean_ms": statistics.mean(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=20, help="documents per query (RAG_INITIAL_LIMIT)")
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--top-k", type=int, default=RAG_CONFIG["rerank_top_k"])
+    parser.add_argument("--threads", type=int, default=RERANKER_CONFIG["intra_op_threads"])
+    parser.add_argument("--no-quantize", action="store_true")
+    parser.add_argument("--max-abs-diff", type=float, default=None,
+                        help="score tolerance (default 1e-3 fp32, 0.05 int8)")
+    args = parser.parse_args()
+
+    quantize = not args.no_quantize
+    tolerance = args.max_abs_diff if args.max_abs_diff is not None else (0.05 if quantize else 1e-3)
+
+    print("📦 Loading PyTorch backend...")
+    torch_reranker = LocalReranker(RERANKER_CONFIG["model_name"])
+    print("⚡ Loading ONNX backend...")
+    onnx_reranker = OnnxReranker(RERANKER_CONFIG["model_name"], quantize=quantize, intra_op_threads=args.threads)
+
+    pair_sets = [build_pairs(q, args.docs) for q in QUERIES]
+
+    # ================= PARITY =================
+    ok = True
+    worst_diff = 0.0
+    for pairs in pair_sets:
+        expected = torch_reranker.score_pairs(pairs)
+        actual = onnx_reranker.score_pairs(pairs)
+        worst_diff = max(worst_diff, float(np.max(np.abs(expected - actual))))
+
+        expected_top = list(np.argsort(-expected, kind="stable")[:args.top_k])
+        actual_top = list(np.argsort(-actual, kind="stable")[:args.top_k])
+        if expected_top != actual_top:
+            ok = False
+            print(f"❌ Top-{args.top_k} order differs for '{pairs[0][0]}': {expected_top} vs {actual_top}")
+
+    if worst_diff > tolerance:
+        ok = False
+    print(f"{'✅' if ok else '❌'} Parity: max |Δscore| = {worst_diff:.5f} (tolerance {tolerance})")
+
+    # ================= LATENCY =================
+    torch_stats = time_backend(torch_reranker, pair_sets, args.runs)
+    onnx_stats = time_backend(onnx_reranker, pair_sets, args.runs)
+    label = "onnx-int8" if quantize else "onnx-fp32"
+    for name, stats in (("torch", torch_stats), (label, onnx_stats)):
+        print(f"⏱️ {name:<10} p50={stats['p50_ms']:.1f}ms p95={stats['p95_ms']:.1f}ms mean={stats['mean_ms']:.1f}ms ({args.docs} docs)")
+    print(f"🚀 Speedup (p50): {torch_stats['p50_ms'] / onnx_stats['p50_ms']:.2f}x")
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
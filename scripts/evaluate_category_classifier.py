@@ -0,0 +1,116 @@
+"""
+Offline evaluation of the local category classifier against LLM labels.
+
+Reads historical gpt-4 labels as JSONL, one {"summary": ..., "category": ...}
+per line. Records written via CATEGORY_CLASSIFIER_RECORD_PATH have this format;
+set CATEGORY_CLASSIFIER_MIN_CONFIDENCE=1.1 for a while to send (and record)
+every document through the LLM. For each temperature / min-confidence pair it
+reports:
+
+- coverage: share of documents the classifier answers locally
+- local accuracy: agreement with the LLM label on those documents
+- top-1 accuracy: agreement over all documents, ignoring the threshold
+
+With --build, prototypes are built from a training split of the labels and
+evaluated on the held-out rest; --save then writes prototypes built from all
+labels to CATEGORY_PROTOTYPES_PATH for production.
+
+Usage:
+    python -m scripts.evaluate_category_classifier labels.jsonl [--build] [--holdout 0.3] [--save]
+        [--temperature 0.02 0.03] [--min-confidence 0.5 0.6 0.7]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+from collections import Counter
+from app.config import CATEGORY_CLASSIFIER_CONFIG
+from app.services.category_classifier import CategoryClassifier, CATEGORY_DESCRIPTIONS
+from app.services.llm_gateway import llm_gateway
+
+
+def load_labels(path: str):
+    examples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            summary, category = record.get("summary"), record.get("category")
+            if summary and category:
+                examples.append((summary, category))
+    return examples
+
+
+def evaluate(classifier: CategoryClassifier, vectors, labels, temperature: float, min_confidence: float):
+    results = classifier.score(vectors, temperature=temperature)
+    confident = [(r, label) for r, label in zip(results, labels) if r["confidence"] >= min_confidence]
+    return {
+        "coverage": len(confident) / len(labels) if labels else 0.0,
+        "local_accuracy": sum(r["category"] == label for r, label in confident) / len(confident) if confident else 0.0,
+        "top1_accuracy": sum(r["category"] == label for r, label in zip(results, labels)) / len(labels) if labels else 0.0,
+        "confusions": Counter((label, r["category"]) for r, label in confident if r["category"] != label),
+    }
+
+
+async def run(args):
+    examples = load_labels(args.labels)
+    print(f"📄 Loaded {len(examples)} labelled summaries")
+    unknown = Counter(category for _, category in examples if category not in CATEGORY_DESCRIPTIONS)
+    if unknown:
+        print(f"⚠️ Labels without a prototype (always a local miss): {dict(unknown)}")
+
+    classifier = CategoryClassifier(enabled=True, model=args.model, prototypes_path="")
+    train, test = [], examples
+    if args.build:
+        shuffled = list(examples)
+        random.Random(args.seed).shuffle(shuffled)
+        cut = int(len(shuffled) * (1 - args.holdout))
+        train, test = shuffled[:cut], shuffled[cut:]
+    print(f"🧭 Prototypes from descriptions + {len(train)} example(s), evaluating on {len(test)}")
+    classifier.use_prototypes(await classifier.build_prototypes(train))
+
+    vectors, used_tokens = await classifier.embed([summary for summary, _ in test], priority="ingestion")
+    labels = [category for _, category in test]
+    print(f"🔢 Embedded {len(test)} summaries with {args.model}: {used_tokens} tokens ({used_tokens / max(len(test), 1):.0f} per document)")
+
+    print(f"{'temp':>6} {'min conf':>9} {'coverage':>9} {'local acc':>10} {'top-1 acc':>10}")
+    for temperature, min_confidence in itertools.product(args.temperature, args.min_confidence):
+        result = evaluate(classifier, vectors, labels, temperature, min_confidence)
+        print(
+            f"{temperature:>6.3f} {min_confidence:>9.2f} {result['coverage']:>9.0%} "
+            f"{result['local_accuracy']:>10.1%} {result['top1_accuracy']:>10.1%}"
+        )
+
+    result = evaluate(classifier, vectors, labels, args.temperature[0], args.min_confidence[0])
+    if result["confusions"]:
+        print(f"\nMost common local errors (temp {args.temperature[0]}, min conf {args.min_confidence[0]}):")
+        for (expected, predicted), count in result["confusions"].most_common(args.top_errors):
+            print(f"  {count:>3} x {expected} -> {predicted}")
+
+    if args.save:
+        data = await classifier.build_prototypes(examples)
+        classifier.save_prototypes(data, CATEGORY_CLASSIFIER_CONFIG["prototypes_path"])
+
+    await llm_gateway.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("labels", help="JSONL of {summary, category} labelled by the LLM")
+    parser.add_argument("--build", action="store_true", help="Build prototypes from a training split of the labels")
+    parser.add_argument("--holdout", type=float, default=0.3, help="Share of labels held out for evaluation with --build")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", action="store_true", help="Save prototypes built from all labels for production")
+    parser.add_argument("--model", default=CATEGORY_CLASSIFIER_CONFIG["model"])
+    parser.add_argument("--temperature", type=float, nargs="+", default=[CATEGORY_CLASSIFIER_CONFIG["temperature"]])
+    parser.add_argument("--min-confidence", type=float, nargs="+", default=[CATEGORY_CLASSIFIER_CONFIG["min_confidence"]])
+    parser.add_argument("--top-errors", type=int, default=10)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Offline evaluation of confidence-gated reranking.
+
+Replays candidate sets recorded by the chatbot (set
+RERANK_GATING_RECORD_PATH=/path/to/candidates.jsonl) and, for each one,
+compares the gated path against a full cross-encoder pass:
+
+- latency of full reranking vs. the gated path (skip / short / full)
+- top-k overlap between the gated result and the full-rerank result
+
+Thresholds can be swept to pick RERANK_GATING_SKIP_GAP /
+RERANK_GATING_SHORT_ENTROPY for production.
+
+Usage:
+    python -m scripts.evaluate_rerank_gating candidates.jsonl [--skip-gap 0.08 0.05] [--short-entropy 0.8 0.7]
+"""
+
+import argparse
+import itertools
+import json
+import statistics
+import time
+from collections import Counter
+from app.config import RERANK_GATING_CONFIG
+from app.services.cross_encoder_model import create_reranker, make_pairs
+from app.services.retrieved_chunk import RetrievedChunk
+from app.services.rerank_gating import RerankGate, sort_by_vector_score, SKIP
+
+
+def load_records(path: str):
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            record["candidates"] = [
+                RetrievedChunk(
+                    uuid=c["uuid"],
+                    title=c.get("title", ""),
+                    data=c.get("data", ""),
+                    version=c.get("version", ""),
+                    vector_score=c.get("vector_score"),
+                )
+                for c in record["candidates"]
+            ]
+            records.append(record)
+    return records
+
+
+def top_uuids(documents, scores, top_k):
+    order = sorted(range(len(documents)), key=lambda i: scores[i], reverse=True)[:top_k]
+    return [documents[i].uuid for i in order]
+
+
+def evaluate(reranker, records, gate: RerankGate):
+    full_ms, gated_ms, overlaps = [], [], []
+    paths = Counter()
+
+    for record in records:
+        query, top_k = record["query"], record["top_k"]
+        ranked = sort_by_vector_score(record["candidates"])
+        if not ranked:
+            continue
+
+        start = time.perf_counter()
+        full_scores = reranker.score_pairs(make_pairs(query, ranked))
+        full_ms.append((time.perf_counter() - start) * 1000)
+        expected = set(top_uuids(ranked, full_scores, top_k))
+
+        start = time.perf_counter()
+        path, n_rerank = gate.decide([d.vector_score for d in ranked], top_k)
+        if path == SKIP:
+            actual = [d.uuid for d in ranked[:top_k]]
+        else:
+            head = ranked[:n_rerank]
+            actual = top_uuids(head, reranker.score_pairs(make_pairs(query, head)), top_k)
+        gated_ms.append((time.perf_counter() - start) * 1000)
+
+        paths[path] += 1
+        overlaps.append(len(expected & set(actual)) / max(min(top_k, len(ranked)), 1))
+
+    return {
+        "queries": len(full_ms),
+        "paths": dict(paths),
+        "full_ms": statistics.mean(full_ms) if full_ms else 0.0,
+        "gated_ms": statistics.mean(gated_ms) if gated_ms else 0.0,
+        "overlap": statistics.mean(overlaps) if overlaps else 0.0,
+        "exact": sum(1 for o in overlaps if o == 1.0) / len(overlaps) if overlaps else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("records", help="JSONL written via RERANK_GATING_RECORD_PATH")
+    parser.add_argument("--skip-gap", type=float, nargs="+", default=[RERANK_GATING_CONFIG["skip_gap"]])
+    parser.add_argument("--short-entropy", type=float, nargs="+", default=[RERANK_GATING_CONFIG["short_entropy"]])
+    parser.add_argument("--temperature", type=float, default=RERANK_GATING_CONFIG["temperature"])
+    parser.add_argument("--short-factor", type=int, default=RERANK_GATING_CONFIG["short_candidates_factor"])
+    args = parser.parse_args()
+
+    records = load_records(args.records)
+    print(f"📄 Loaded {len(records)} recorded candidate sets")
+    reranker = create_reranker()
+    # Warm-up so the first query doesn't skew latency
+    if records and records[0]["candidates"]:
+        reranker.score_pairs(make_pairs(records[0]["query"], records[0]["candidates"][:2]))
+
+    print(f"{'skip_gap':>9} {'entropy':>8} {'full ms':>8} {'gated ms':>9} {'saved':>6} {'overlap':>8} {'exact':>6}  paths")
+    for skip_gap, short_entropy in itertools.product(args.skip_gap, args.short_entropy):
+        gate = RerankGate(
+            enabled=True,
+            skip_gap=skip_gap,
+            short_entropy=short_entropy,
+            temperature=args.temperature,
+            short_candidates_factor=args.short_factor,
+        )
+        result = evaluate(reranker, records, gate)
+        saved = 1 - result["gated_ms"] / result["full_ms"] if result["full_ms"] else 0.0
+        print(
+            f"{skip_gap:>9.3f} {short_entropy:>8.2f} {result['full_ms']:>8.1f} {result['gated_ms']:>9.1f} "
+            f"{saved:>6.0%} {result['overlap']:>8.3f} {result['exact']:>6.0%}  {result['paths']}"
+        )
+
+
+if __name__ == "__main__":
+    main()